@@ -0,0 +1,54 @@
+# backends/base.py
+
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List
+from engine.columnar import ColumnarSnapshot
+from engine.cube import AggregateCube
+
+
+class StorageBackend(ABC):
+    """
+    Origen de datos detrás de `Database`. Todos los backends entregan las
+    dimensiones y el snapshot columnar de `persons`; solo los que tienen
+    `supports_sql` exponen además un pool para las consultas SQL directas.
+    """
+
+    name: str = ""
+    supports_sql: bool = False
+
+    def __init__(self):
+        # Corutinas a invocar cuando el backend pasa a una nueva versión de los datos
+        self.listeners: List[Callable[[], Awaitable[None]]] = []
+
+    @abstractmethod
+    async def connect(self) -> None:
+        ...
+
+    @abstractmethod
+    async def disconnect(self) -> None:
+        ...
+
+    @abstractmethod
+    async def dimension_rows(self) -> Dict[str, List[Any]]:
+        """Filas (pk, code, name) de species, strata y genders, por tabla."""
+
+    @abstractmethod
+    async def load_snapshot(self, snapshot: ColumnarSnapshot) -> None:
+        """Llena `snapshot` con las columnas de `persons`."""
+
+    async def load_cube(self, cube: AggregateCube) -> bool:
+        """Llena `cube` con agregados precalculados; False si el backend no los tiene."""
+        return False
+
+    def start_watch(self, interval: float) -> None:
+        """Empieza a vigilar nuevas versiones de los datos (no aplica a todos los backends)."""
+
+    async def stop_watch(self) -> None:
+        ...
+
+    def get_pool(self):
+        raise RuntimeError(f"El backend '{self.name}' no admite consultas SQL")
+
+    def get_read_pool(self):
+        """Pool para consultas de solo lectura; sin réplicas es el mismo de get_pool()."""
+        return self.get_pool()
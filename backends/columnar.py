@@ -0,0 +1,281 @@
+# backends/columnar.py
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+from backends.base import StorageBackend
+from engine.columnar import COLUMN_FILES, ColumnarSnapshot
+from engine.cube import AggregateCube
+from engine.dimensions import TABLES
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+DIMENSIONS_FILE = "dimensions.json"
+CUBE_FILE = "cube.json"
+# Puntero a la versión vigente dentro del directorio raíz (ver publish)
+CURRENT_FILE = "CURRENT"
+FORMAT_VERSION = 1
+
+
+def file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def verify_checksums(directory: str, manifest: Dict[str, Any]) -> None:
+    """Compara cada archivo con el SHA-256 del manifiesto; los manifiestos sin checksums no se verifican."""
+    for name, expected in manifest.get("checksums", {}).items():
+        if file_checksum(os.path.join(directory, name)) != expected:
+            raise RuntimeError(f"Checksum inválido en {os.path.join(directory, name)}")
+
+
+def write_files(
+    directory: str,
+    dimensions: Dict[str, List[Any]],
+    snapshot: Optional[ColumnarSnapshot],
+    cube: Optional[AggregateCube] = None,
+) -> None:
+    """
+    Guarda el snapshot (un .npy por columna) si está cargado, las tablas de
+    dimensión, el cubo si se indica y un manifiesto con la fecha de corte (las
+    edades quedan calculadas a ese día) y el SHA-256 de cada archivo.
+    """
+    os.makedirs(directory, exist_ok=True)
+    has_columns = snapshot is not None and snapshot.ready
+    if has_columns:
+        snapshot.save(directory)
+    rows = {
+        table: [{"pk": row["pk"], "code": row["code"], "name": row["name"]} for row in dimensions[table]]
+        for table in TABLES
+    }
+    with open(os.path.join(directory, DIMENSIONS_FILE), "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False)
+    if cube is not None:
+        with open(os.path.join(directory, CUBE_FILE), "w", encoding="utf-8") as f:
+            json.dump(cube.dump(), f)
+    columns = (snapshot.species, snapshot.strata, snapshot.gender, snapshot.age) if has_columns else ()
+    manifest = {
+        "format": FORMAT_VERSION,
+        "rows": snapshot.total if has_columns else (cube.total if cube is not None else 0),
+        "as_of": datetime.date.today().isoformat(),
+        "columns": {name: str(column.dtype) for name, column in zip(COLUMN_FILES, columns)},
+        "checksums": {
+            name: file_checksum(os.path.join(directory, name))
+            for name in sorted(os.listdir(directory))
+            if name != MANIFEST_FILE
+        },
+    }
+    # El manifiesto va al final: si existe, el resto de los archivos ya está escrito
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def publish(
+    root: str,
+    dimensions: Dict[str, List[Any]],
+    snapshot: ColumnarSnapshot,
+    cube: Optional[AggregateCube] = None,
+    keep: int = 2,
+) -> str:
+    """
+    Escribe una versión nueva en `root/<versión>` y recién entonces cambia
+    `root/CURRENT` con os.replace, que es atómico: los workers ven la versión
+    anterior completa o la nueva completa, nunca una a medio escribir.
+    Conserva las `keep` versiones más recientes.
+    """
+    os.makedirs(root, exist_ok=True)
+    version = datetime.datetime.now().strftime("v%Y%m%dT%H%M%S%f")
+    write_files(os.path.join(root, version), dimensions, snapshot, cube)
+    pending = os.path.join(root, CURRENT_FILE + ".tmp")
+    with open(pending, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pending, os.path.join(root, CURRENT_FILE))
+    prune(root, keep)
+    return version
+
+
+def prune(root: str, keep: int) -> None:
+    """
+    Borra las versiones más antiguas. Un worker que todavía tenga mapeada una
+    versión borrada sigue leyéndola sin problemas: el archivo existe mientras
+    haya un mapeo abierto, hasta que el worker pase a la versión nueva.
+    """
+    versions = sorted(
+        name for name in os.listdir(root)
+        if name.startswith("v") and os.path.isdir(os.path.join(root, name))
+    )
+    for name in versions[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def current_version(root: str) -> Tuple[Optional[str], str]:
+    """(versión, directorio) vigentes; sin CURRENT el propio `root` es la única versión."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None, root
+    return version, os.path.join(root, version)
+
+
+class ColumnarFileBackend(StorageBackend):
+    """
+    Backend de solo lectura sobre archivos locales: columnas de `persons`
+    mapeadas en memoria y dimensiones en JSON. Pensado para réplicas de borde
+    sin acceso a la BD; /v1/info, /v1/stats y /v1/persons/export se sirven
+    desde memoria y lo que requiere SQL responde 500.
+
+    Con varios workers de uvicorn todos mapean los mismos archivos, así que
+    las páginas quedan una sola vez en la caché del sistema operativo y la
+    memoria no crece con la cantidad de workers. Un único proceso cargador
+    (`python -m backends.columnar publish`) genera versiones nuevas y cada
+    worker pasa a la vigente al detectar el cambio de CURRENT.
+    """
+
+    name = "columnar"
+    supports_sql = False
+
+    def __init__(self, root: str, verify: bool = False):
+        super().__init__()
+        self.root = root
+        # Verificar los checksums al abrir cada versión (lee los archivos completos)
+        self.verify = verify
+        self.version: Optional[str] = None
+        self.directory = root
+        self.manifest: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> None:
+        self._open(*current_version(self.root))
+
+    def _open(self, version: Optional[str], directory: str) -> None:
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT_VERSION:
+            raise RuntimeError(f"Formato de archivos columnar no soportado: {manifest.get('format')}")
+        if self.verify:
+            verify_checksums(directory, manifest)
+        if manifest["as_of"] != datetime.date.today().isoformat():
+            logger.warning("Los archivos columnar son del %s; las edades pueden estar desfasadas", manifest["as_of"])
+        self.version, self.directory, self.manifest = version, directory, manifest
+
+    async def disconnect(self) -> None:
+        await self.stop_watch()
+        self.manifest = {}
+
+    async def dimension_rows(self) -> Dict[str, List[Dict[str, Any]]]:
+        with open(os.path.join(self.directory, DIMENSIONS_FILE), encoding="utf-8") as f:
+            return json.load(f)
+
+    async def load_snapshot(self, snapshot: ColumnarSnapshot) -> None:
+        if not self.manifest.get("columns"):
+            raise RuntimeError(f"No hay columnas de persons en {self.directory}")
+        snapshot.open(self.directory)
+
+    async def load_cube(self, cube: AggregateCube) -> bool:
+        path = os.path.join(self.directory, CUBE_FILE)
+        if not os.path.exists(path):
+            return False
+        with open(path, encoding="utf-8") as f:
+            cube.restore(json.load(f))
+        return True
+
+    # -------------------- CAMBIO DE VERSIÓN --------------------
+
+    def start_watch(self, interval: float) -> None:
+        if interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch_loop(interval))
+
+    async def stop_watch(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                version, directory = current_version(self.root)
+                if version == self.version:
+                    continue
+                self._open(version, directory)
+                logger.info("Datos columnar en la versión %s", version)
+                for listener in self.listeners:
+                    await listener()
+            except Exception:
+                # Se sigue sirviendo la versión ya mapeada hasta el próximo intento
+                logger.exception("No se pudo pasar a la nueva versión de los archivos columnar")
+
+
+# -------------------- PROCESO CARGADOR --------------------
+
+async def read_postgres() -> Tuple[Dict[str, List[Any]], ColumnarSnapshot, AggregateCube]:
+    """Lee dimensiones y `persons` desde Postgres (config por entorno) y arma el cubo."""
+    from backends.postgres import PostgresBackend
+
+    source = PostgresBackend()
+    await source.connect()
+    try:
+        dimensions = await source.dimension_rows()
+        snapshot = ColumnarSnapshot()
+        await source.load_snapshot(snapshot)
+    finally:
+        await source.disconnect()
+    cube = AggregateCube()
+    cube.build_from_columns(snapshot.species, snapshot.strata, snapshot.gender, snapshot.age, snapshot.age_null)
+    return dimensions, snapshot, cube
+
+
+async def export(directory: str) -> None:
+    """Genera los archivos del backend columnar en `directory`, sin versionar."""
+    dimensions, snapshot, cube = await read_postgres()
+    write_files(directory, dimensions, snapshot, cube)
+    print(f"{snapshot.total} filas escritas en {directory}")
+
+
+async def publish_loop(root: str, interval: float, keep: int) -> None:
+    """Publica una versión nueva cada `interval` segundos (una sola vez si es 0)."""
+    while True:
+        dimensions, snapshot, cube = await read_postgres()
+        version = publish(root, dimensions, snapshot, cube, keep)
+        print(f"{snapshot.total} filas publicadas en {root} ({version})")
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m backends.columnar",
+        description="Archivos locales para STORAGE_BACKEND=columnar",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Exportar persons y dimensiones desde Postgres")
+    export_parser.add_argument("directory", help="Directorio destino (p. ej. data/columnar)")
+    publish_parser = commands.add_parser("publish", help="Publicar versiones para workers que comparten los archivos")
+    publish_parser.add_argument("root", help="Directorio raíz (COLUMNAR_PATH de los workers)")
+    publish_parser.add_argument("--interval", type=float, default=0, help="segundos entre versiones; 0 = una vez")
+    publish_parser.add_argument("--keep", type=int, default=2, help="versiones a conservar")
+    args = parser.parse_args()
+    if args.command == "export":
+        asyncio.run(export(args.directory))
+    elif args.command == "publish":
+        asyncio.run(publish_loop(args.root, args.interval, args.keep))
+
+
+if __name__ == "__main__":
+    main()
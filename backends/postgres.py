@@ -0,0 +1,516 @@
+# backends/postgres.py
+
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncpg
+from backends.base import StorageBackend
+from config import settings
+from engine.columnar import ColumnarSnapshot
+from engine.cube import AggregateCube
+from queries import hot_statements
+from utils.deadlines import has_deadline, remaining, watch_disconnect
+from utils.metrics import (
+    db_pool_acquire_wait, db_query_duration, db_query_errors, db_rows_fetched, http_requests_cancelled,
+)
+from utils.profiling import RequestProfile, current_profile
+
+logger = logging.getLogger(__name__)
+
+def query_timeout(timeout: Optional[float]) -> Optional[float]:
+    """
+    Timeout efectivo: el explícito, o lo que le queda al plazo de la petición
+    (sin superar DB_COMMAND_TIMEOUT). None deja el command_timeout del pool.
+    """
+    if timeout is not None:
+        return timeout
+    left = remaining()
+    if left is None or settings.db_command_timeout is None:
+        return left
+    return min(left, settings.db_command_timeout)
+
+
+# Errores que indican que el servidor no responde (no errores de la consulta en sí)
+CONNECTION_ERRORS = (OSError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError)
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    """
+    True si `exc` es una conexión perdida. Desde Python 3.11 asyncio.TimeoutError
+    es el TimeoutError nativo, subclase de OSError: un timeout de sentencia, de
+    espera del pool o DeadlineExceeded es una consulta lenta, no un servidor caído.
+    """
+    return isinstance(exc, CONNECTION_ERRORS) and not isinstance(exc, asyncio.TimeoutError)
+
+# Segundos de retraso de una réplica respecto del primario (0 si no es réplica o está al día)
+REPLICA_LAG_QUERY = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END::float8"
+)
+
+
+class InstrumentedPool:
+    """
+    Envoltura de asyncpg.Pool con la misma interfaz (fetch, fetchrow, fetchval,
+    execute, acquire) que lleva la cuenta de cuántos esperan una conexión y
+    cuánto tardan en obtenerla, y mide la duración y filas de cada consulta.
+    Sin timeout explícito aplica el plazo de la petición (ver utils/deadlines.py).
+    `on_connection_error` se llama cuando falla la conexión con el servidor.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, on_connection_error: Optional[Callable[[], None]] = None):
+        self._pool = pool
+        self.on_connection_error = on_connection_error
+        self.waiters = 0
+        self.acquires = 0
+        self.acquire_wait_total = 0.0
+        self.acquire_wait_max = 0.0
+
+    @asynccontextmanager
+    async def acquire(self, timeout: Optional[float] = None):
+        self.waiters += 1
+        start = time.perf_counter()
+        try:
+            conn = await self._pool.acquire(timeout=query_timeout(timeout))
+        except Exception as exc:
+            if is_connection_error(exc):
+                self._connection_failed()
+            raise
+        finally:
+            self.waiters -= 1
+            waited = time.perf_counter() - start
+            self.acquires += 1
+            self.acquire_wait_total += waited
+            self.acquire_wait_max = max(self.acquire_wait_max, waited)
+            db_pool_acquire_wait.observe(waited)
+        try:
+            yield conn
+        finally:
+            await self._pool.release(conn)
+
+    async def _timed(self, operation: str, call: Awaitable, conn=None, query: str = "", args: tuple = ()) -> Any:
+        """
+        Registra duración, errores y filas retornadas de una consulta (sin contar la espera del pool).
+        Si la petición se está perfilando y se pasa `conn`, adjunta además el plan de la consulta.
+        """
+        start = time.perf_counter()
+        try:
+            with watch_disconnect():
+                result = await call
+        except Exception as exc:
+            db_query_errors.inc(operation)
+            # El timeout primero: TimeoutError también es OSError (ver is_connection_error)
+            if isinstance(exc, asyncio.TimeoutError):
+                if has_deadline():
+                    http_requests_cancelled.inc("deadline")
+            elif is_connection_error(exc):
+                self._connection_failed()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            db_query_duration.observe(elapsed, operation)
+        if operation == "fetch":
+            db_rows_fetched.inc(operation, amount=len(result))
+        elif operation in ("fetchrow", "fetchval") and result is not None:
+            db_rows_fetched.inc(operation)
+        if conn is not None:
+            profile = current_profile()
+            if profile is not None:
+                await self._explain(profile, conn, operation, query, args, elapsed)
+        return result
+
+    async def _explain(
+        self, profile: RequestProfile, conn, operation: str, query: str, args: tuple, elapsed: float
+    ) -> None:
+        """
+        Registra la consulta en el perfil con su plan real. EXPLAIN ANALYZE la
+        vuelve a ejecutar, por eso corre en una transacción de solo lectura:
+        una sentencia que escribe falla en vez de aplicarse dos veces.
+        """
+        entry = profile.add_query(operation, query, args, elapsed)
+        if not profile.explain:
+            return
+        try:
+            async with conn.transaction(readonly=True):
+                plan = await conn.fetchval(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", *args, timeout=query_timeout(None)
+                )
+        except (asyncpg.PostgresError, asyncio.TimeoutError) as exc:
+            entry["explain_error"] = str(exc) or type(exc).__name__
+            return
+        # asyncpg entrega el json como texto: [{"Plan": ..., "Planning Time": ms, "Execution Time": ms}]
+        plan = json.loads(plan)[0]
+        entry["plan"] = plan
+        entry["server_seconds"] = round((plan.get("Planning Time", 0) + plan.get("Execution Time", 0)) / 1000, 6)
+
+    def _connection_failed(self) -> None:
+        if self.on_connection_error is not None:
+            self.on_connection_error()
+
+    @property
+    def load(self) -> float:
+        """Fracción de la capacidad ocupada (conexiones en uso más los que esperan), para elegir réplica."""
+        in_use = self._pool.get_size() - self._pool.get_idle_size()
+        return (in_use + self.waiters) / max(self._pool.get_max_size(), 1)
+
+    async def fetch(self, query: str, *args, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await self._timed(
+                "fetch", conn.fetch(query, *args, timeout=query_timeout(timeout)), conn, query, args
+            )
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await self._timed(
+                "fetchrow", conn.fetchrow(query, *args, timeout=query_timeout(timeout)), conn, query, args
+            )
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await self._timed(
+                "fetchval", conn.fetchval(query, *args, column=column, timeout=query_timeout(timeout)),
+                conn, query, args,
+            )
+
+    async def execute(self, query: str, *args, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await self._timed("execute", conn.execute(query, *args, timeout=query_timeout(timeout)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Indicadores del pool para dimensionarlo contra el tráfico real."""
+        size = self._pool.get_size()
+        idle = self._pool.get_idle_size()
+        return {
+            "min_size": self._pool.get_min_size(),
+            "max_size": self._pool.get_max_size(),
+            "size": size,
+            "in_use": size - idle,
+            "idle": idle,
+            "waiters": self.waiters,
+            "acquires": self.acquires,
+            "acquire_wait_seconds_total": round(self.acquire_wait_total, 6),
+            "acquire_wait_seconds_max": round(self.acquire_wait_max, 6),
+        }
+
+    def __getattr__(self, name: str):
+        # close(), get_size(), etc. se delegan al pool real
+        return getattr(self._pool, name)
+
+
+class WarmConnection(asyncpg.Connection):
+    """
+    Conexión con sentencias preparadas al abrirse (Connection.prepare).
+    fetchrow, que es como se ejecutan las de /v1/stats, usa la preparada
+    cuando el texto coincide; el resto de las consultas sigue por la caché
+    de sentencias de asyncpg.
+    """
+
+    _prepared: Dict[str, asyncpg.prepared_stmt.PreparedStatement] = {}
+
+    async def prepare_statements(self, statements: List[str]) -> None:
+        prepared = {}
+        for query in statements:
+            try:
+                prepared[query] = await self.prepare(query)
+            except asyncpg.PostgresError:
+                # Sin preparar igual funciona: la consulta se prepara al usarse y ahí falla con su error
+                logger.warning("No se pudo preparar la sentencia: %s", query, exc_info=True)
+        self._prepared = prepared
+
+    async def fetchrow(self, query, *args, timeout=None, record_class=None):
+        statement = self._prepared.get(query)
+        if statement is None or record_class is not None:
+            return await super().fetchrow(query, *args, timeout=timeout, record_class=record_class)
+        return await statement.fetchrow(*args, timeout=timeout)
+
+
+def connection_options(host: Optional[str] = None, port: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Parámetros de conexión comunes al pool y a las conexiones sueltas (ver config.py).
+    `host` y `port` reemplazan los del primario para conectar a una réplica.
+    """
+    return {
+        "host": host or settings.db_host,
+        "port": port or settings.db_port,
+        "user": settings.db_user,
+        "password": settings.db_password,
+        "database": settings.db_name,
+        "statement_cache_size": settings.db_statement_cache_size,
+        "command_timeout": settings.db_command_timeout,
+        "server_settings": settings.db_session_settings,
+    }
+
+
+def parse_replicas(spec: str) -> List[tuple]:
+    """Convierte "host[:puerto];host[:puerto]" (DB_REPLICAS) en pares (host, puerto)."""
+    replicas = []
+    for item in spec.split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        replicas.append((host, int(port) if port else settings.db_port))
+    return replicas
+
+
+class Replica:
+    """
+    Pool de una réplica de lectura con su estado de salud. Se expulsa con el
+    primer fallo de conexión de una consulta o tras DB_REPLICA_MAX_FAILURES
+    fallos seguidos de la verificación periódica, y se readmite con la
+    primera verificación exitosa. Aunque esté sana, se salta si su retraso
+    supera DB_REPLICA_MAX_LAG.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.name = f"{host}:{port}"
+        self.host = host
+        self.port = port
+        self.pool: Optional[InstrumentedPool] = None
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.failures = 0
+        self.ejections = 0
+        self.reads = 0
+        self.primary_retries = 0
+
+    @property
+    def available(self) -> bool:
+        return (
+            self.pool is not None
+            and self.healthy
+            and self.lag is not None
+            and self.lag <= settings.db_replica_max_lag
+        )
+
+    def mark_failure(self) -> None:
+        self.failures += 1
+        if self.healthy and self.failures >= settings.db_replica_max_failures:
+            self.healthy = False
+            self.ejections += 1
+            logger.warning("Réplica %s expulsada tras %d fallos de conexión", self.name, self.failures)
+
+    def mark_unhealthy(self) -> None:
+        """Expulsa la réplica sin esperar más fallos (una consulta perdió la conexión)."""
+        self.failures += 1
+        if self.healthy:
+            self.healthy = False
+            self.ejections += 1
+            logger.warning("Réplica %s expulsada: falló la conexión durante una consulta", self.name)
+
+    def mark_success(self, lag: float) -> None:
+        self.failures = 0
+        self.lag = lag
+        if not self.healthy:
+            self.healthy = True
+            logger.info("Réplica %s admitida (retraso %.3fs)", self.name, lag)
+
+    async def check(self, timeout: float) -> None:
+        """Mide el retraso con el pool asyncpg directo, fuera de las métricas de consultas."""
+        try:
+            lag = await self.pool._pool.fetchval(REPLICA_LAG_QUERY, timeout=timeout)
+        except (*CONNECTION_ERRORS, asyncio.TimeoutError, asyncpg.PostgresError):
+            self.mark_failure()
+        else:
+            self.mark_success(float(lag))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "available": self.available,
+            "lag_seconds": self.lag,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "reads": self.reads,
+            "primary_retries": self.primary_retries,
+            "pool": self.pool.stats() if self.pool is not None else None,
+        }
+
+
+class ReplicaPool(InstrumentedPool):
+    """
+    InstrumentedPool de una réplica. Una lectura (fetch, fetchrow, fetchval)
+    que pierde la conexión, o que termina cuando la réplica ya quedó fuera
+    (la verificación la expulsó o su retraso pasó DB_REPLICA_MAX_LAG), se
+    repite una vez en el primario. Un timeout se propaga sin repetir ni
+    expulsar la réplica. execute() y acquire() no se repiten: la sentencia
+    podría no ser de solo lectura, o el cursor ya entregó filas.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, replica: Replica, primary: Callable[[], InstrumentedPool]):
+        super().__init__(pool, on_connection_error=replica.mark_unhealthy)
+        self.replica = replica
+        self.primary = primary
+
+    async def _read(self, read: Callable[..., Awaitable], method: str, query: str, args: tuple, kwargs: dict):
+        try:
+            result = await read(query, *args, **kwargs)
+        except Exception as exc:
+            # Un timeout no se repite: la misma consulta lenta solo cargaría también al primario
+            if not is_connection_error(exc):
+                raise
+        else:
+            if self.replica.available:
+                return result
+        self.replica.primary_retries += 1
+        return await getattr(self.primary(), method)(query, *args, **kwargs)
+
+    async def fetch(self, query: str, *args, timeout: Optional[float] = None):
+        return await self._read(super().fetch, "fetch", query, args, {"timeout": timeout})
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float] = None):
+        return await self._read(super().fetchrow, "fetchrow", query, args, {"timeout": timeout})
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: Optional[float] = None):
+        return await self._read(super().fetchval, "fetchval", query, args, {"column": column, "timeout": timeout})
+
+
+class PostgresBackend(StorageBackend):
+    """Backend original: pool asyncpg contra Postgres, con SQL disponible para todos los routers."""
+
+    name = "postgres"
+    supports_sql = True
+
+    def __init__(self, init: Optional[Callable[[asyncpg.Connection], Awaitable[None]]] = None):
+        super().__init__()
+        self._init = init
+        self._pool: Optional[InstrumentedPool] = None
+        # DB_STATEMENT_CACHE_SIZE=0 indica que no se pueden usar sentencias con nombre
+        # (p. ej. pgbouncer en modo transacción): tampoco se preparan estas
+        prepare = settings.db_prepare_statements and settings.db_statement_cache_size > 0
+        self._statements = hot_statements() if prepare else []
+        self.replicas: List[Replica] = []
+        self.primary_reads = 0
+        self._health_task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> None:
+        # Crea un pool de conexiones al arrancar, configurado por entorno (ver config.py).
+        # Los parámetros de sesión van en server_settings y no con SET en `init`,
+        # porque el pool ejecuta RESET ALL al devolver cada conexión.
+        pool = await asyncpg.create_pool(
+            **connection_options(),
+            min_size=settings.db_pool_min_size,
+            max_size=settings.db_pool_max_size,
+            max_inactive_connection_lifetime=settings.db_max_inactive_lifetime,
+            connection_class=WarmConnection,
+            init=self._setup_connection,
+        )
+        self._pool = InstrumentedPool(pool)
+        await self.warm_up()
+        await self.connect_replicas()
+
+    async def _setup_connection(self, conn: WarmConnection) -> None:
+        """
+        Corre al abrir cada conexión del pool: los hooks de Database y la
+        preparación de las sentencias calientes, para que la primera petición
+        que use la conexión no pague el Parse/Describe.
+        """
+        if self._init is not None:
+            await self._init(conn)
+        await conn.prepare_statements(self._statements)
+
+    async def open_connection(self) -> asyncpg.Connection:
+        """
+        Conexión propia fuera del pool, para usos de larga duración como LISTEN
+        (el pool haría UNLISTEN/RESET ALL al devolverla y restaría capacidad).
+        """
+        return await asyncpg.connect(**connection_options())
+
+    async def warm_up(self) -> None:
+        """Toma min_size conexiones a la vez y hace un viaje de ida y vuelta con cada una."""
+        async def ping():
+            async with self._pool.acquire() as conn:
+                await conn.execute("SELECT 1")
+
+        await asyncio.gather(*(ping() for _ in range(settings.db_pool_min_size)))
+
+    # -------------------- RÉPLICAS --------------------
+
+    async def connect_replicas(self) -> None:
+        """
+        Abre un pool por réplica de DB_REPLICAS. Una réplica caída no impide
+        arrancar: su pool se crea sin conexiones y queda fuera hasta que la
+        verificación periódica la encuentre sana.
+        """
+        for host, port in parse_replicas(settings.db_replicas):
+            replica = Replica(host, port)
+            options = dict(
+                **connection_options(host, port),
+                max_size=settings.db_pool_max_size,
+                max_inactive_connection_lifetime=settings.db_max_inactive_lifetime,
+                connection_class=WarmConnection,
+                init=self._setup_connection,
+            )
+            try:
+                pool = await asyncpg.create_pool(min_size=settings.db_pool_min_size, **options)
+            except (*CONNECTION_ERRORS, asyncio.TimeoutError):
+                logger.warning("Réplica %s no disponible al arrancar", replica.name)
+                pool = await asyncpg.create_pool(min_size=0, **options)
+            replica.pool = ReplicaPool(pool, replica, self.get_pool)
+            self.replicas.append(replica)
+        if self.replicas:
+            await self.check_replicas()
+            self._health_task = asyncio.create_task(self._health_loop(settings.db_health_check_seconds))
+
+    async def check_replicas(self) -> None:
+        timeout = settings.db_health_check_seconds
+        await asyncio.gather(*(replica.check(timeout) for replica in self.replicas))
+
+    async def _health_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.check_replicas()
+
+    def get_read_pool(self) -> InstrumentedPool:
+        """La réplica disponible menos cargada; el primario si no hay ninguna."""
+        available = [replica for replica in self.replicas if replica.available]
+        if not available:
+            self.primary_reads += 1
+            return self.get_pool()
+        replica = min(available, key=lambda replica: replica.pool.load)
+        replica.reads += 1
+        return replica.pool
+
+    def replica_stats(self) -> Dict[str, Any]:
+        return {replica.name: replica.stats() for replica in self.replicas}
+
+    async def disconnect(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for replica in self.replicas:
+            await replica.pool.close()
+        self.replicas = []
+        if self._pool:
+            await self._pool.close()
+            self._pool = None
+
+    def get_pool(self) -> InstrumentedPool:
+        if self._pool is None:
+            raise RuntimeError("Conexión a BD no inicializada")
+        return self._pool
+
+    async def dimension_rows(self) -> Dict[str, List[asyncpg.Record]]:
+        pool = self.get_read_pool()
+        return {
+            "species": await pool.fetch("SELECT pk, code, name FROM species"),
+            "strata": await pool.fetch("SELECT pk, code, name FROM strata"),
+            "genders": await pool.fetch("SELECT pk, code, name FROM genders"),
+        }
+
+    async def load_snapshot(self, snapshot: ColumnarSnapshot) -> None:
+        await snapshot.load(self.get_read_pool())
+
+    async def load_cube(self, cube: AggregateCube) -> bool:
+        # Una pasada GROUP BY por combinación fina y edad (CUBE_QUERY), con el
+        # rollup a las demás celdas en Python; luego /v1/stats no consulta la BD.
+        # Desde el primario: el feed de cambios aplica deltas sobre esta lectura
+        await cube.load(self.get_pool())
+        return True
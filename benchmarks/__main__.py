@@ -0,0 +1,113 @@
+# benchmarks/__main__.py
+"""
+Benchmark reproducible de la API.
+
+    # API en proceso contra los motores en memoria (sin base de datos)
+    python -m benchmarks --rows 1000000 --engine cube --duration 10
+
+    # Cargar datos sintéticos en un Postgres local y medir un servidor corriendo
+    python -m benchmarks --load-postgres postgresql://localhost/isekai_bench --rows 10000000
+    python -m benchmarks --url http://localhost:8000 --duration 30
+
+    # Comparar contra una línea base (sale con código 1 si hay regresión)
+    python -m benchmarks --baseline benchmarks/baselines/standin-cube.json
+    python -m benchmarks --baseline benchmarks/baselines/standin-cube.json --update-baseline
+"""
+
+import argparse
+import asyncio
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark de la API")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="filas sintéticas de persons")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=("columnar", "cube"), default="cube",
+                        help="motor en memoria para la API en proceso")
+    parser.add_argument("--response-cache", action="store_true",
+                        help="mantener la caché HTTP de respuestas (deshabilitada por defecto)")
+    parser.add_argument("--url", help="medir un servidor ya levantado en vez de la API en proceso")
+    parser.add_argument("--load-postgres", metavar="DSN", help="solo generar y cargar los datos en este Postgres")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos de carga")
+    parser.add_argument("--requests", type=int, help="detenerse tras N peticiones")
+    parser.add_argument("--output", type=Path, help="guardar el reporte JSON en esta ruta")
+    parser.add_argument("--baseline", type=Path, help="línea base JSON contra la cual comparar")
+    parser.add_argument("--update-baseline", action="store_true", help="reemplazar la línea base con este resultado")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="regresión tolerada (fracción)")
+    return parser.parse_args(argv)
+
+
+async def main(args) -> int:
+    from benchmarks import datagen, report
+
+    if args.load_postgres:
+        start = time.perf_counter()
+        await datagen.load_postgres(args.load_postgres, args.rows, seed=args.seed)
+        print(f"{args.rows} filas cargadas en {time.perf_counter() - start:.1f}s")
+        return 0
+
+    import httpx
+    from benchmarks.load import run_load
+
+    meta = {
+        "rows": args.rows,
+        "engine": args.engine,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "response_cache": args.response_cache,
+        "target": args.url or "in-process",
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30.0)
+    else:
+        # La configuración se lee al importar la app
+        os.environ["STATS_ENGINE"] = args.engine
+        if args.response_cache:
+            os.environ.setdefault("RESPONSE_CACHE_TTL", "30")
+        else:
+            os.environ["RESPONSE_CACHE_TTL"] = "0"
+        from main import app
+
+        start = time.perf_counter()
+        rows, cells = datagen.load_standin(datagen.generate(args.rows, seed=args.seed))
+        print(f"stand-in: {rows} filas, {cells} celdas en {time.perf_counter() - start:.1f}s")
+        # ASGITransport no ejecuta los eventos de arranque: no se abre el pool de Postgres
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    async with client:
+        result = await run_load(client, args.concurrency, args.duration, args.requests, args.seed)
+
+    summary = report.summarize(result, meta)
+    total = summary["total"]
+    print(f"{total['requests']} peticiones, {total['rps']} req/s, "
+          f"p50 {total['p50_ms']} ms, p95 {total['p95_ms']} ms, p99 {total['p99_ms']} ms")
+    for group, stats in summary["groups"].items():
+        print(f"  {group:9} {stats['requests']:7} req  p50 {stats['p50_ms']:>8} ms  "
+              f"p95 {stats['p95_ms']:>8} ms  p99 {stats['p99_ms']:>8} ms  {stats['statuses']}")
+
+    if args.output:
+        report.save(summary, args.output)
+    if args.baseline:
+        if args.update_baseline or not args.baseline.exists():
+            report.save(summary, args.baseline)
+            print(f"línea base guardada en {args.baseline}")
+        else:
+            regressions = report.compare(summary, report.load(args.baseline), args.tolerance)
+            for line in regressions:
+                print(f"REGRESIÓN {line}")
+            if regressions:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
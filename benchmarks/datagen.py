@@ -0,0 +1,152 @@
+# benchmarks/datagen.py
+
+import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+# Dimensiones sintéticas: (code, name, peso relativo, edad máxima)
+SPECIES = [
+    ("HU", "Humano", 0.55, 100),
+    ("EL", "Elfo", 0.12, 900),
+    ("EN", "Enano", 0.10, 350),
+    ("OR", "Orco", 0.10, 60),
+    ("HO", "Hobbit", 0.08, 130),
+    ("DR", "Dragón", 0.05, 2000),
+]
+STRATA = [(code, f"Estrato {code}", weight) for code, weight in enumerate((0.05, 0.1, 0.2, 0.3, 0.2, 0.1, 0.05))]
+GENDERS = [("F", "Femenino", 0.49), ("M", "Masculino", 0.49), ("X", "No binario", 0.02)]
+
+
+def dimension_rows() -> Dict[str, List[dict]]:
+    """Filas (pk, code, name) de species, strata y genders; los pk empiezan en 1."""
+    return {
+        "species": [{"pk": i + 1, "code": code, "name": name} for i, (code, name, _, _) in enumerate(SPECIES)],
+        "strata": [{"pk": i + 1, "code": code, "name": name} for i, (code, name, _) in enumerate(STRATA)],
+        "genders": [{"pk": i + 1, "code": code, "name": name} for i, (code, name, _) in enumerate(GENDERS)],
+    }
+
+
+def ages_from_birthdates(birthdates: np.ndarray, today: datetime.date) -> np.ndarray:
+    """Equivalente vectorizado de date_part('year', age(birthdate)) a la fecha `today`."""
+    years = birthdates.astype("datetime64[Y]").astype(np.int64) + 1970
+    months = birthdates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    days = (birthdates - birthdates.astype("datetime64[M]")).astype(np.int64) + 1
+    before_birthday = (today.month < months) | ((today.month == months) & (today.day < days))
+    return today.year - years - before_birthday
+
+
+def persons_chunks(
+    rows: int,
+    chunk_size: int = 1_000_000,
+    seed: int = 0,
+    today: Optional[datetime.date] = None,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Genera `persons` por bloques (memoria acotada aun con decenas de millones
+    de filas). Cada bloque trae pk, species_fk, strata_fk, gender_fk,
+    birthdate (datetime64[D]) y age ya calculada a la fecha `today`.
+    """
+    rng = np.random.default_rng(seed)
+    today = today or datetime.date.today()
+    today64 = np.datetime64(today, "D")
+    species_p = np.array([w for _, _, w, _ in SPECIES]) / sum(w for _, _, w, _ in SPECIES)
+    strata_p = np.array([w for _, _, w in STRATA]) / sum(w for _, _, w in STRATA)
+    gender_p = np.array([w for _, _, w in GENDERS]) / sum(w for _, _, w in GENDERS)
+    max_days = np.array([max_age * 365 for _, _, _, max_age in SPECIES])
+
+    for start in range(0, rows, chunk_size):
+        n = min(chunk_size, rows - start)
+        species = rng.choice(len(SPECIES), size=n, p=species_p)
+        # Edad uniforme dentro del rango de vida de cada especie
+        birthdates = today64 - (rng.random(n) * max_days[species]).astype(np.int64)
+        yield {
+            "pk": np.arange(start + 1, start + n + 1, dtype=np.int64),
+            "species_fk": species + 1,
+            "strata_fk": rng.choice(len(STRATA), size=n, p=strata_p) + 1,
+            "gender_fk": rng.choice(len(GENDERS), size=n, p=gender_p) + 1,
+            "birthdate": birthdates,
+            "age": ages_from_birthdates(birthdates, today),
+        }
+
+
+def generate(rows: int, seed: int = 0, today: Optional[datetime.date] = None) -> Dict[str, np.ndarray]:
+    """Genera `persons` completo en memoria (columnas concatenadas)."""
+    chunks = list(persons_chunks(rows, seed=seed, today=today))
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+
+# -------------------- CARGA --------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS species (pk serial PRIMARY KEY, code text UNIQUE NOT NULL, name text NOT NULL);
+CREATE TABLE IF NOT EXISTS strata (pk serial PRIMARY KEY, code integer UNIQUE NOT NULL, name text NOT NULL);
+CREATE TABLE IF NOT EXISTS genders (pk serial PRIMARY KEY, code text UNIQUE NOT NULL, name text NOT NULL);
+CREATE TABLE IF NOT EXISTS persons (
+    pk bigserial PRIMARY KEY,
+    species_fk integer REFERENCES species (pk),
+    strata_fk integer REFERENCES strata (pk),
+    gender_fk integer REFERENCES genders (pk),
+    species_fl text,
+    strata_fl integer,
+    gender_fl text,
+    birthdate date
+);
+"""
+
+
+async def load_postgres(dsn: str, rows: int, seed: int = 0, chunk_size: int = 1_000_000) -> None:
+    """Crea el esquema en un Postgres local (vacío) y lo llena con COPY por bloques."""
+    import asyncpg
+
+    dims = dimension_rows()
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(SCHEMA)
+        await conn.execute("TRUNCATE persons, species, strata, genders RESTART IDENTITY CASCADE")
+        for table in ("species", "strata", "genders"):
+            await conn.copy_records_to_table(
+                table,
+                records=[(row["pk"], row["code"], row["name"]) for row in dims[table]],
+                columns=("pk", "code", "name"),
+            )
+        species_codes = np.array([row["code"] for row in dims["species"]], dtype=object)
+        strata_codes = np.array([row["code"] for row in dims["strata"]], dtype=object)
+        gender_codes = np.array([row["code"] for row in dims["genders"]], dtype=object)
+        for chunk in persons_chunks(rows, chunk_size=chunk_size, seed=seed):
+            records = zip(
+                chunk["pk"].tolist(),
+                chunk["species_fk"].tolist(),
+                chunk["strata_fk"].tolist(),
+                chunk["gender_fk"].tolist(),
+                species_codes[chunk["species_fk"] - 1].tolist(),
+                strata_codes[chunk["strata_fk"] - 1].tolist(),
+                gender_codes[chunk["gender_fk"] - 1].tolist(),
+                chunk["birthdate"].astype(datetime.date).tolist(),
+            )
+            await conn.copy_records_to_table(
+                "persons",
+                records=records,
+                columns=("pk", "species_fk", "strata_fk", "gender_fk",
+                         "species_fl", "strata_fl", "gender_fl", "birthdate"),
+            )
+        await conn.execute("SELECT setval('persons_pk_seq', (SELECT MAX(pk) FROM persons))")
+        await conn.execute("ANALYZE")
+    finally:
+        await conn.close()
+
+
+def load_standin(data: Dict[str, np.ndarray]) -> Tuple[int, int]:
+    """
+    Carga los datos en los motores en memoria de la API (registro de
+    dimensiones, snapshot columnar y cubo) para medirla sin base de datos.
+    Retorna (filas, celdas del cubo).
+    """
+    from engine.columnar import snapshot
+    from engine.cube import cube
+    from engine.dimensions import registry
+
+    dims = dimension_rows()
+    registry.set_rows(dims["species"], dims["strata"], dims["genders"])
+    snapshot.set_columns(data["species_fk"], data["strata_fk"], data["gender_fk"], data["age"])
+    cube.build_from_columns(snapshot.species, snapshot.strata, snapshot.gender, snapshot.age, snapshot.age_null)
+    return snapshot.total, len(cube.cells)
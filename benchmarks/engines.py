@@ -0,0 +1,177 @@
+# benchmarks/engines.py
+"""
+Verifica que los motores en memoria (cubo y snapshot columnar) den los mismos
+desgloses de /v1/stats/count/by y /v1/stats/age/by que SQL, incluido el
+grupo `null` de las filas con fk NULL y las edades negativas (fechas de
+nacimiento futuras), que cuentan como cualquier otra edad.
+
+    # Datos sintéticos con fk NULL y edades negativas o desconocidas; la referencia es un GROUP BY en Python
+    python -m benchmarks.engines --rows 200000
+
+    # Contra un Postgres: la referencia son las consultas SQL de los desgloses
+    python -m benchmarks.engines --dsn postgresql://localhost/isekai_bench
+"""
+
+import argparse
+import asyncio
+import math
+import sys
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+DIMENSIONS = ("species_fk", "strata_fk", "gender_fk")
+
+# Filtros (species_pk, strata_pk, gender_pk) con que se compara cada desglose
+FILTERS = [(None, None, None), (1, None, None), (None, 3, 2)]
+
+# Grupo -> métricas: (count,) o (min, max, mean, stddev) redondeadas como en la API
+Groups = Dict[Tuple[Optional[int], ...], Tuple]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.engines", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=200_000, help="filas sintéticas (sin --dsn)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--nulls", type=float, default=0.01,
+                        help="fracción de fk NULL, edades NULL y edades negativas (sin --dsn)")
+    parser.add_argument("--dsn", help="comparar contra las consultas SQL en este Postgres")
+    return parser.parse_args(argv)
+
+
+def rounded(stats) -> Tuple:
+    """min, max, mean y stddev redondeados a 4 decimales, igual que routers.stats.age_payload."""
+    return tuple(None if value is None else round(value, 4) for value in stats)
+
+
+def synthetic(rows: int, seed: int, nulls: float):
+    """
+    Columnas de datagen con una fracción de fk NULL (-1, como en el snapshot),
+    de edades negativas y de edades desconocidas. Retorna (species, strata,
+    gender, age, known).
+    """
+    from benchmarks import datagen
+
+    data = datagen.generate(rows, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    columns = [data[name].astype(np.int64) for name in DIMENSIONS]
+    for column in columns:
+        column[rng.random(rows) < nulls] = -1
+    age = data["age"].astype(np.int64)
+    age[rng.random(rows) < nulls] *= -1
+    known = rng.random(rows) >= nulls
+    return (*columns, age, known)
+
+
+def reference(columns, dims: List[int], pks: Tuple) -> Tuple[Groups, Groups]:
+    """GROUP BY con la semántica de SQL: el fk NULL es un grupo más y los NULL de edad no cuentan."""
+    *keys, age, known = columns
+    mask = np.ones(len(age), dtype=bool)
+    for column, pk in zip(keys, pks):
+        if pk is not None:
+            mask &= column == pk
+    counts: Dict[Tuple, int] = {}
+    ages: Dict[Tuple, List[int]] = {}
+    selected = [keys[d][mask].tolist() for d in dims]
+    for key, value, has_age in zip(zip(*selected), age[mask].tolist(), known[mask].tolist()):
+        key = tuple(None if fk < 0 else fk for fk in key)
+        counts[key] = counts.get(key, 0) + 1
+        if has_age:
+            ages.setdefault(key, []).append(value)
+    count_groups = {key: (counts[key],) for key in counts}
+    age_groups = {}
+    for key, values in ages.items():
+        n, mean = len(values), sum(values) / len(values)
+        stddev = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1)) if n > 1 else None
+        age_groups[key] = rounded((min(values), max(values), mean, stddev))
+    return count_groups, age_groups
+
+
+async def from_sql(pool, dims: List[int], pks: Tuple) -> Tuple[Groups, Groups]:
+    """Los mismos grupos que arma routers.stats con SQL."""
+    from queries import age_by_query, count_by_query
+
+    names = [DIMENSIONS[d] for d in dims]
+    sql, args = count_by_query(names, pks)
+    count_groups = {
+        tuple(row[name] for name in names): (row["count"],)
+        for row in await pool.fetch(sql, *args)
+        if not row["grouping"] and row["count"]
+    }
+    sql, args = age_by_query(names, pks)
+    age_groups = {
+        tuple(row[name] for name in names): rounded((row["min"], row["max"], row["mean"], row["stddev"]))
+        for row in await pool.fetch(sql, *args)
+        if row["min"] is not None
+    }
+    return count_groups, age_groups
+
+
+def from_engine(engine, dims: List[int], pks: Tuple) -> Tuple[Groups, Groups]:
+    """Los mismos grupos que arma routers.stats con un motor en memoria."""
+    from engine.cube import NULL_KEY
+
+    count_groups, age_groups = {}, {}
+    for key, cell in engine.breakdown(dims, pks):
+        group = tuple(None if key[d] == NULL_KEY else key[d] for d in dims)
+        count_groups[group] = (cell.count,)
+        stats = cell.age_stats()
+        if stats is not None:
+            age_groups[group] = rounded((stats["min"], stats["max"], stats["mean"], stats["stddev"]))
+    return count_groups, age_groups
+
+
+def compare(name: str, expected: Groups, actual: Groups) -> int:
+    """Cantidad de grupos que difieren (faltantes, sobrantes o con otras métricas)."""
+    errors = 0
+    for key in sorted(set(expected) | set(actual), key=lambda key: [(v is None, v or 0) for v in key]):
+        if expected.get(key) != actual.get(key):
+            print(f"ERROR {name} grupo {key}: se esperaba {expected.get(key)}, se obtuvo {actual.get(key)}")
+            errors += 1
+    return errors
+
+
+async def main(args) -> int:
+    from engine.columnar import NULL_AGE, ColumnarSnapshot
+    from engine.cube import AggregateCube
+
+    snapshot, cube = ColumnarSnapshot(), AggregateCube()
+    pool = None
+    if args.dsn:
+        import asyncpg
+
+        pool = await asyncpg.create_pool(args.dsn, min_size=1, max_size=2)
+        await snapshot.load(pool)
+        await cube.load(pool)
+        target = "SQL"
+    else:
+        columns = synthetic(args.rows, args.seed, args.nulls)
+        *keys, age, known = columns
+        snapshot.set_columns(*keys, np.where(known, age, NULL_AGE))
+        cube.build_from_columns(snapshot.species, snapshot.strata, snapshot.gender, snapshot.age, snapshot.age_null)
+        target = "GROUP BY en Python"
+
+    errors = checks = 0
+    try:
+        for size in (1, 2, 3):
+            for dims in combinations(range(3), size):
+                for pks in FILTERS:
+                    if pool is not None:
+                        expected = await from_sql(pool, list(dims), pks)
+                    else:
+                        expected = reference(columns, list(dims), pks)
+                    for name, engine in (("cubo", cube), ("columnar", snapshot)):
+                        actual = from_engine(engine, list(dims), pks)
+                        label = f"{name} by={[DIMENSIONS[d] for d in dims]} filtros={pks}"
+                        errors += compare(f"count {label}", expected[0], actual[0])
+                        errors += compare(f"age {label}", expected[1], actual[1])
+                        checks += 2
+    finally:
+        if pool is not None:
+            await pool.close()
+    print(f"{checks} desgloses comparados contra {target}: {errors} grupos distintos")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,89 @@
+# benchmarks/load.py
+
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import httpx
+from benchmarks.datagen import GENDERS, SPECIES, STRATA
+
+# (grupo, peso) de la mezcla de tráfico; los grupos son los que se reportan
+MIX = [
+    ("info", 0.25),
+    ("count", 0.35),
+    ("age", 0.30),
+    ("count_by", 0.05),
+    ("age_by", 0.05),
+]
+
+
+def random_filters(rng: random.Random) -> Dict[str, str]:
+    """Filtros realistas: cada uno presente con probabilidad 1/2 y ~2% de códigos inválidos."""
+    params = {}
+    if rng.random() < 0.5:
+        params["speciesCode"] = rng.choice(SPECIES)[0]
+    if rng.random() < 0.5:
+        params["strataCode"] = str(rng.choice(STRATA)[0])
+    if rng.random() < 0.5:
+        params["genderCode"] = rng.choice(GENDERS)[0]
+    if rng.random() < 0.02:
+        params["speciesCode"] = "ZZ"
+    return params
+
+
+def next_request(rng: random.Random) -> Tuple[str, str, Dict[str, str]]:
+    """Retorna (grupo, path, query) según la mezcla MIX."""
+    group = rng.choices([name for name, _ in MIX], weights=[weight for _, weight in MIX])[0]
+    if group == "info":
+        return group, f"/v1/info/{rng.choice(['species', 'strata', 'genders'])}", {}
+    if group == "count":
+        return group, "/v1/stats/count", random_filters(rng)
+    if group == "age":
+        return group, "/v1/stats/age", random_filters(rng)
+    by = rng.choice(["species", "strata", "gender", "species,gender"])
+    path = "/v1/stats/count/by" if group == "count_by" else "/v1/stats/age/by"
+    return group, path, {"by": by, **random_filters(rng)}
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    concurrency: int = 32,
+    duration: float = 10.0,
+    requests: Optional[int] = None,
+    seed: int = 0,
+) -> Dict[str, object]:
+    """
+    Lanza `concurrency` clientes que envían peticiones hasta agotar `duration`
+    segundos (o `requests` peticiones). Retorna latencias por grupo y errores.
+    """
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    failures: Dict[str, int] = defaultdict(int)
+    sent = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int):
+        nonlocal sent
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline and (requests is None or sent < requests):
+            sent += 1
+            group, path, params = next_request(rng)
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+            except httpx.HTTPError:
+                failures[group] += 1
+                continue
+            latencies[group].append(time.perf_counter() - start)
+            statuses[group][response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "elapsed": elapsed,
+        "latencies": dict(latencies),
+        "statuses": {group: dict(codes) for group, codes in statuses.items()},
+        "failures": dict(failures),
+    }
@@ -0,0 +1,93 @@
+# benchmarks/partitions.py
+"""
+Aceleración de la agregación por particiones (STATS_PARTITIONS) de
+/v1/stats/count y /v1/stats/age al aumentar el número de particiones.
+
+    # Snapshot columnar en memoria, un rango de filas por hilo
+    python -m benchmarks.partitions --rows 20000000 --partitions 1,2,4,8
+
+    # Rangos de pk contra un Postgres cargado con `python -m benchmarks --load-postgres`
+    python -m benchmarks.partitions --dsn postgresql://localhost/isekai_bench --partitions 1,2,4,8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, List
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.partitions", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10_000_000, help="filas sintéticas (solo en memoria)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dsn", help="medir rangos de pk en este Postgres en vez del snapshot en memoria")
+    parser.add_argument("--partitions", default=f"1,2,4,{os.cpu_count() or 8}",
+                        help="números de particiones a medir, separados por comas")
+    parser.add_argument("--repeat", type=int, default=5, help="mediciones por caso (se reporta la mediana)")
+    parser.add_argument("--filter", nargs=3, type=int, metavar=("SPECIES", "STRATA", "GENDER"),
+                        help="pks de filtro (0 = sin filtro); por defecto sin filtros")
+    return parser.parse_args(argv)
+
+
+async def measure(call: Callable[[], Awaitable], repeat: int) -> float:
+    """Mediana en segundos de `repeat` ejecuciones, tras una de calentamiento."""
+    await call()
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await call()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+async def main(args) -> int:
+    from engine.partitioned import aggregate_snapshot, aggregate_sql
+
+    counts = [int(value) for value in args.partitions.split(",") if value.strip()]
+    pks = tuple(pk or None for pk in args.filter) if args.filter else (None, None, None)
+
+    if args.dsn:
+        import asyncpg
+
+        pool = await asyncpg.create_pool(args.dsn, min_size=max(counts), max_size=max(counts))
+        target = "postgres"
+        aggregate = lambda partitions: aggregate_sql(pool, pks, partitions)
+    else:
+        from benchmarks import datagen
+        from engine.columnar import snapshot
+
+        pool = None
+        start = time.perf_counter()
+        data = datagen.generate(args.rows, seed=args.seed)
+        snapshot.set_columns(data["species_fk"], data["strata_fk"], data["gender_fk"], data["age"])
+        print(f"snapshot: {snapshot.total} filas en {time.perf_counter() - start:.1f}s")
+        target = "memoria"
+        aggregate = lambda partitions: aggregate_snapshot(snapshot, pks, partitions)
+
+    try:
+        reference = None
+        baseline = None
+        print(f"{'particiones':>11}  {'mediana ms':>10}  {'aceleración':>11}  ({target}, filtros {pks})")
+        for partitions in counts:
+            seconds = await measure(lambda: aggregate(partitions), args.repeat)
+            total, cell = await aggregate(partitions)
+            result = (total, cell.count, cell.n, cell.sum, cell.sumsq, cell.min, cell.max)
+            # La combinación es exacta: todas las particiones deben dar lo mismo
+            if reference is None:
+                reference = result
+            elif result != reference:
+                print(f"ERROR: {partitions} particiones dan {result}, se esperaba {reference}")
+                return 1
+            baseline = baseline or seconds
+            print(f"{partitions:>11}  {seconds * 1000:>10.1f}  {baseline / seconds:>10.2f}x")
+    finally:
+        if pool is not None:
+            await pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,69 @@
+# benchmarks/report.py
+
+import json
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+# p99 se reporta pero no se compara: con corridas cortas es demasiado ruidoso
+COMPARED_PERCENTILES = (50, 95)
+
+
+def summarize(result: Dict[str, object], meta: Dict[str, object]) -> Dict[str, object]:
+    """p50/p95/p99 (ms) y peticiones por segundo, global y por grupo de endpoints."""
+    elapsed = result["elapsed"]
+    groups = {}
+    all_latencies: List[float] = []
+    for group, values in sorted(result["latencies"].items()):
+        all_latencies.extend(values)
+        groups[group] = _stats(values, elapsed)
+        groups[group]["statuses"] = {str(code): n for code, n in sorted(result["statuses"][group].items())}
+    return {
+        "meta": meta,
+        "total": _stats(all_latencies, elapsed),
+        "groups": groups,
+        "failures": result["failures"],
+    }
+
+
+def _stats(values: List[float], elapsed: float) -> Dict[str, float]:
+    if not values:
+        return {"requests": 0, "rps": 0.0, **{f"p{p}_ms": None for p in PERCENTILES}}
+    ms = np.asarray(values) * 1000.0
+    return {
+        "requests": len(values),
+        "rps": round(len(values) / elapsed, 1),
+        **{f"p{p}_ms": round(float(np.percentile(ms, p)), 3) for p in PERCENTILES},
+    }
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object], tolerance: float) -> List[str]:
+    """
+    Regresiones respecto de la línea base: latencias que suben o rps que bajan
+    más que `tolerance` (fracción, p. ej. 0.2 = 20 %).
+    """
+    regressions = []
+    sections = [("total", current["total"], baseline["total"])]
+    sections += [
+        (group, stats, baseline["groups"][group])
+        for group, stats in current["groups"].items()
+        if group in baseline["groups"]
+    ]
+    for name, now, before in sections:
+        for p in COMPARED_PERCENTILES:
+            key = f"p{p}_ms"
+            if now[key] is not None and before[key] and now[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {before[key]} -> {now[key]}")
+        if before["rps"] and now["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name} rps: {before['rps']} -> {now['rps']}")
+    return regressions
+
+
+def save(report: Dict[str, object], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def load(path: Path) -> Dict[str, object]:
+    return json.loads(path.read_text(encoding="utf-8"))
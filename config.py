@@ -0,0 +1,134 @@
+# config.py
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+def _env(name: str, default: str) -> str:
+    return os.getenv(name, default)
+
+
+def _env_optional_float(name: str) -> Optional[float]:
+    value = os.getenv(name, "")
+    return float(value) if value else None
+
+
+def _env_pairs(name: str, default: str) -> Dict[str, str]:
+    """Lee pares `clave=valor` separados por `;` (p. ej. DB_SESSION_SETTINGS)."""
+    pairs = {}
+    for item in _env(name, default).split(";"):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            pairs[key.strip()] = value.strip()
+    return pairs
+
+
+@dataclass
+class Settings:
+    # Conexión a Postgres
+    db_host: str = field(default_factory=lambda: _env("DB_HOST", "159.223.200.213"))
+    db_port: int = field(default_factory=lambda: int(_env("DB_PORT", "5432")))
+    db_user: str = field(default_factory=lambda: _env("DB_USER", "isekai"))
+    db_password: str = field(default_factory=lambda: _env("DB_PASSWORD", "Fr9tL28mQxD7vKcp"))
+    db_name: str = field(default_factory=lambda: _env("DB_NAME", "isekaidb"))
+    # Pool de conexiones (ver asyncpg.create_pool)
+    db_pool_min_size: int = field(default_factory=lambda: int(_env("DB_POOL_MIN_SIZE", "1")))
+    db_pool_max_size: int = field(default_factory=lambda: int(_env("DB_POOL_MAX_SIZE", "5")))
+    db_statement_cache_size: int = field(default_factory=lambda: int(_env("DB_STATEMENT_CACHE_SIZE", "100")))
+    db_max_inactive_lifetime: float = field(default_factory=lambda: float(_env("DB_MAX_INACTIVE_LIFETIME", "300")))
+    db_command_timeout: Optional[float] = field(default_factory=lambda: _env_optional_float("DB_COMMAND_TIMEOUT"))
+    # Prepara las sentencias de /v1/stats en cada conexión nueva (ver queries.hot_statements)
+    db_prepare_statements: bool = field(default_factory=lambda: _env("DB_PREPARE_STATEMENTS", "1") == "1")
+    # Parámetros de sesión de cada conexión, p. ej. "application_name=isekai-api;work_mem=16MB"
+    db_session_settings: Dict[str, str] = field(
+        default_factory=lambda: _env_pairs("DB_SESSION_SETTINGS", "application_name=isekai-api")
+    )
+    # Réplicas de lectura "host[:puerto];host[:puerto]" con las mismas credenciales que DB_HOST.
+    # Las consultas de solo lectura (stats, catálogos, persons) van a la réplica menos cargada
+    db_replicas: str = field(default_factory=lambda: _env("DB_REPLICAS", ""))
+    # Retraso máximo (segundos) de replicación tolerado antes de saltarse una réplica
+    db_replica_max_lag: float = field(default_factory=lambda: float(_env("DB_REPLICA_MAX_LAG", "5")))
+    # Cada cuánto se verifica salud y retraso de las réplicas, y verificaciones fallidas seguidas para
+    # expulsarlas (una consulta que pierde la conexión la expulsa de inmediato y se repite en el primario)
+    db_health_check_seconds: float = field(default_factory=lambda: float(_env("DB_HEALTH_CHECK_SECONDS", "5")))
+    db_replica_max_failures: int = field(default_factory=lambda: int(_env("DB_REPLICA_MAX_FAILURES", "3")))
+    # Motor que responde /v1/stats: "sql" (consulta directa a Postgres),
+    # "columnar" (snapshot de `persons` en memoria cargado al arrancar)
+    # o "cube" (agregados precalculados species × strata × gender)
+    stats_engine: str = field(default_factory=lambda: _env("STATS_ENGINE", "sql"))
+    # Origen de los datos: "postgres" (pool asyncpg) o "columnar" (archivos locales
+    # generados con `python -m backends.columnar export`, solo lectura y sin BD)
+    storage_backend: str = field(default_factory=lambda: _env("STORAGE_BACKEND", "postgres"))
+    columnar_path: str = field(default_factory=lambda: _env("COLUMNAR_PATH", "data/columnar"))
+    # Segundos entre revisiones de COLUMNAR_PATH/CURRENT en busca de una versión nueva; 0 = nunca
+    columnar_poll_seconds: float = field(default_factory=lambda: float(_env("COLUMNAR_POLL_SECONDS", "10")))
+    # Snapshot local de dimensiones y agregados para arrancar sin esperar a la BD
+    # (mismo formato versionado que COLUMNAR_PATH, con checksums); vacío = apagado
+    warm_start_path: str = field(default_factory=lambda: _env("WARM_START_PATH", ""))
+    warm_start_keep: int = field(default_factory=lambda: int(_env("WARM_START_KEEP", "2")))
+    # Cambios de `persons` aplicados como deltas al cubo (STATS_ENGINE=cube con Postgres):
+    # "listen" (trigger de sql/persons_changes.sql), "poll" (marca de agua por pk: solo ve inserciones,
+    # los UPDATE y DELETE se corrigen en la verificación de deriva) o vacío = apagado
+    change_feed: str = field(default_factory=lambda: _env("CHANGE_FEED", ""))
+    change_feed_interval: float = field(default_factory=lambda: float(_env("CHANGE_FEED_INTERVAL", "1")))
+    # Segundos entre verificaciones de totales contra la BD (reconstrucción si difieren); 0 = nunca
+    change_feed_drift_seconds: float = field(default_factory=lambda: float(_env("CHANGE_FEED_DRIFT_SECONDS", "300")))
+    # Segundos entre recargas de species/strata/genders en memoria; 0 = solo al arrancar
+    dimensions_refresh_seconds: float = field(default_factory=lambda: float(_env("DIMENSIONS_REFRESH_SECONDS", "300")))
+    # Particiones en que se divide `persons` para agregar /v1/stats/count y /v1/stats/age
+    # en paralelo (rangos de pk en conexiones del pool, o de filas en hilos con el
+    # snapshot columnar); 1 = una sola pasada
+    stats_partitions: int = field(default_factory=lambda: int(_env("STATS_PARTITIONS", "1")))
+    # Agrupa consultas idénticas concurrentes de /v1/stats en una sola (single-flight)
+    stats_coalescing: bool = field(default_factory=lambda: _env("STATS_COALESCING", "1") == "1")
+    # Máximo de combinaciones de filtros aceptadas por POST /v1/stats/batch
+    batch_max_items: int = field(default_factory=lambda: int(_env("BATCH_MAX_ITEMS", "100")))
+    # Tamaño de página por defecto y máximo de GET /v1/persons (también tope de ids=)
+    persons_page_size: int = field(default_factory=lambda: int(_env("PERSONS_PAGE_SIZE", "100")))
+    persons_max_page_size: int = field(default_factory=lambda: int(_env("PERSONS_MAX_PAGE_SIZE", "1000")))
+    # Filas por bloque al exportar `persons` con un cursor del servidor
+    export_chunk_size: int = field(default_factory=lambda: int(_env("EXPORT_CHUNK_SIZE", "5000")))
+    # Caché HTTP de respuestas (ETag/304) para los GET bajo estos prefijos; opcional: TTL 0 = deshabilitada.
+    # Se invalida al recargar los datos o aplicar cambios del feed; escrituras directas a la BD fuera
+    # del servicio solo se ven al vencer el TTL
+    response_cache_ttl: float = field(default_factory=lambda: float(_env("RESPONSE_CACHE_TTL", "0")))
+    response_cache_max_entries: int = field(default_factory=lambda: int(_env("RESPONSE_CACHE_MAX_ENTRIES", "1024")))
+    response_cache_prefixes: tuple = field(
+        default_factory=lambda: tuple(_env("RESPONSE_CACHE_PREFIXES", "/v1/info,/v1/stats").split(","))
+    )
+    # Respuestas de /v1/info y /v1/stats serializadas con orjson si está instalado (o ya pre-serializadas)
+    # sin revalidar contra response_model; ver utils/responses.py
+    fast_responses: bool = field(default_factory=lambda: _env("FAST_RESPONSES", "0") == "1")
+    # Control de admisión: "prefijo=concurrencia:cola;..." para las rutas que usan el pool
+    # (las demás, como /v1/info, no esperan); vacío = deshabilitado. Ver utils/admission.py
+    admission_limits: Dict[str, str] = field(
+        default_factory=lambda: _env_pairs("ADMISSION_LIMITS", "/v1/stats=3:32;/v1/persons/export=1:4;/v1/persons=1:16")
+    )
+    # Segundos máximos en cola antes de responder 503; también es el Retry-After sugerido
+    admission_queue_timeout: float = field(default_factory=lambda: float(_env("ADMISSION_QUEUE_TIMEOUT", "2")))
+    # Plazo en segundos por prefijo de ruta ("prefijo=segundos;..."; 0 = sin plazo). Se aplica
+    # como timeout de cada consulta y vencido responde 504; ver utils/deadlines.py
+    request_deadlines: Dict[str, str] = field(
+        default_factory=lambda: _env_pairs("REQUEST_DEADLINES", "/v1/stats=10;/v1/persons/export=0;/v1/persons=10")
+    )
+    # Middleware de latencias por ruta y exposición en /metrics (formato Prometheus)
+    metrics_enabled: bool = field(default_factory=lambda: _env("METRICS_ENABLED", "1") == "1")
+    # Token esperado en X-Admin-Token para /v1/admin/*; vacío = endpoints deshabilitados
+    admin_token: str = field(default_factory=lambda: _env("ADMIN_TOKEN", ""))
+    # Perfilado por petición (ver utils/profiling.py): con PROFILING=1 se perfilan las peticiones
+    # con X-Profile: 1 y un X-Admin-Token válido, más todas las de PROFILING_PREFIXES
+    profiling_enabled: bool = field(default_factory=lambda: _env("PROFILING", "0") == "1")
+    profiling_prefixes: tuple = field(
+        default_factory=lambda: tuple(p for p in _env("PROFILING_PREFIXES", "").split(",") if p)
+    )
+    # Segundos entre muestras de la pila del event loop
+    profiling_interval: float = field(default_factory=lambda: float(_env("PROFILING_INTERVAL", "0.001")))
+    # Perfiles que se conservan en memoria para /v1/admin/profiles
+    profiling_keep: int = field(default_factory=lambda: int(_env("PROFILING_KEEP", "20")))
+    # Adjuntar el plan EXPLAIN (ANALYZE, BUFFERS) de cada consulta de una petición perfilada
+    profiling_explain: bool = field(default_factory=lambda: _env("PROFILING_EXPLAIN", "1") == "1")
+
+
+# Instancia global, igual que `db` en database.py
+settings = Settings()
@@ -1,38 +1,123 @@
 # crud.py
 
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 import asyncpg
 
+# Columnas de `persons` expuestas hacia afuera (species, strata, gender, age)
+PERSONS_COLUMNS = (
+    "species_fl  AS species, "
+    "strata_fl   AS strata, "
+    "gender_fl   AS gender, "
+    "date_part('year', age(birthdate))::int AS age"
+)
+PERSONS_FIELDS = ("species", "strata", "gender", "age")
+
+# Columnas fk que filtran los endpoints por speciesCode/strataCode/genderCode
+FILTER_COLUMNS = ("species_fk", "strata_fk", "gender_fk")
+
+def pk_conditions(pks: Tuple, args: list) -> List[str]:
+    """Condiciones `columna = $n` para los filtros usados, agregando los pks a `args`."""
+    conditions = []
+    for column, pk in zip(FILTER_COLUMNS, pks):
+        if pk is not None:
+            args.append(pk)
+            conditions.append(f"{column} = ${len(args)}")
+    return conditions
+
+def where_clause(conditions: Sequence[str]) -> str:
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
 async def get_all_persons(conn: asyncpg.Pool, table: str) -> List[Dict[str, Any]]:
     """
     Recupera todas las filas de la tabla `persons`, mapeando fields a
     species, strata, gender y calculando age en años.
     """
-    query = (
-        f"SELECT "
-        f"species_fl  AS species, "
-        f"strata_fl   AS strata, "
-        f"gender_fl   AS gender, "
-        f"date_part('year', age(birthdate))::int AS age "
-        f"FROM {table}"
-    )
+    query = f"SELECT {PERSONS_COLUMNS} FROM {table}"
     rows = await conn.fetch(query)
     return [dict(row) for row in rows]
 
+async def stream_persons(
+    pool: asyncpg.Pool,
+    table: str,
+    pks: Tuple = (None, None, None),
+    chunk_size: int = 5000,
+) -> AsyncIterator[Sequence[asyncpg.Record]]:
+    """
+    Igual que get_all_persons pero por bloques de `chunk_size` filas usando un
+    cursor del servidor, filtrando por (species_pk, strata_pk, gender_pk).
+    La conexión queda tomada solo mientras se consume el iterador.
+    """
+    args: list = []
+    conditions = pk_conditions(pks, args)
+    query = f"SELECT {PERSONS_COLUMNS} FROM {table}{where_clause(conditions)}"
+    async with pool.acquire() as conn:
+        async with conn.transaction(readonly=True):
+            cursor = await conn.cursor(query, *args)
+            while True:
+                rows = await cursor.fetch(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
 # -------------------- LECTURA GENERAL --------------------
 
-async def get_all(conn: asyncpg.Pool, table: str) -> List[Dict[str, Any]]:
+async def get_all(conn: asyncpg.Pool, table: str, key: str = "id") -> List[Dict[str, Any]]:
     """
-    Recupera todas las filas de cualquier tabla (ordenadas por id).
+    Recupera todas las filas de cualquier tabla (ordenadas por `key`).
     """
-    query = f"SELECT * FROM {table} ORDER BY id"
+    query = f"SELECT * FROM {table} ORDER BY {key}"
     rows = await conn.fetch(query)
     return [dict(row) for row in rows]
 
-async def get_by_id(conn: asyncpg.Pool, table: str, id: int) -> Optional[Dict[str, Any]]:
+async def get_by_id(conn: asyncpg.Pool, table: str, id: int, key: str = "id") -> Optional[Dict[str, Any]]:
     """
     Recupera una fila por su id de cualquier tabla.
     """
-    query = f"SELECT * FROM {table} WHERE id = $1"
+    query = f"SELECT * FROM {table} WHERE {key} = $1"
     row = await conn.fetchrow(query, id)
     return dict(row) if row else None
+
+async def get_page(
+    conn: asyncpg.Pool,
+    table: str,
+    limit: int,
+    after: Optional[int] = None,
+    key: str = "id",
+    columns: str = "*",
+    conditions: Sequence[str] = (),
+    args: Sequence[Any] = (),
+) -> List[Dict[str, Any]]:
+    """
+    Página de hasta `limit` filas con `key` > `after`, ordenadas por `key`
+    (paginación por keyset). A diferencia de OFFSET, recorre el índice de
+    `key` desde el último visto, así que el costo no crece con la profundidad.
+    `conditions` usa los parámetros $1..$n de `args`.
+    """
+    args = list(args)
+    conditions = list(conditions)
+    if after is not None:
+        args.append(after)
+        conditions.append(f"{key} > ${len(args)}")
+    args.append(limit)
+    query = f"SELECT {columns} FROM {table}{where_clause(conditions)} ORDER BY {key} LIMIT ${len(args)}"
+    rows = await conn.fetch(query, *args)
+    return [dict(row) for row in rows]
+
+async def get_by_ids(
+    conn: asyncpg.Pool,
+    table: str,
+    ids: Sequence[int],
+    key: str = "id",
+    columns: str = "*",
+    conditions: Sequence[str] = (),
+    args: Sequence[Any] = (),
+) -> List[Dict[str, Any]]:
+    """
+    Igual que get_by_id para varios ids en un solo viaje (`key` = ANY($n)),
+    ordenadas por `key`; los ids inexistentes se omiten.
+    """
+    args = [*args, list(ids)]
+    conditions = [*conditions, f"{key} = ANY(${len(args)})"]
+    query = f"SELECT {columns} FROM {table}{where_clause(conditions)} ORDER BY {key}"
+    rows = await conn.fetch(query, *args)
+    return [dict(row) for row in rows]
@@ -1,33 +1,67 @@
 # database.py
 
+from typing import Awaitable, Callable, List, Optional
 import asyncpg
-from typing import Optional
+from backends.base import StorageBackend
+from backends.columnar import ColumnarFileBackend
+from backends.postgres import InstrumentedPool, PostgresBackend
+from config import settings
+
+
+def create_backend(name: str, init: Callable[[asyncpg.Connection], Awaitable[None]]) -> StorageBackend:
+    """Backend según STORAGE_BACKEND: "postgres" o "columnar" (archivos locales, sin BD)."""
+    if name == "postgres":
+        return PostgresBackend(init=init)
+    if name == "columnar":
+        return ColumnarFileBackend(settings.columnar_path)
+    raise ValueError(f"STORAGE_BACKEND desconocido: {name}")
+
 
 class Database:
     def __init__(self):
-        self._pool: Optional[asyncpg.Pool] = None
+        self.backend: Optional[StorageBackend] = None
+        # Corutinas extra a ejecutar en cada conexión nueva del pool
+        self.init_hooks: List[Callable[[asyncpg.Connection], Awaitable[None]]] = []
+
+    async def _init_connection(self, conn: asyncpg.Connection) -> None:
+        for hook in self.init_hooks:
+            await hook(conn)
+
+    @property
+    def supports_sql(self) -> bool:
+        return self.backend is not None and self.backend.supports_sql
+
+    @property
+    def stats_engine(self) -> str:
+        """
+        Motor efectivo de /v1/stats: STATS_ENGINE, salvo que "sql" con un
+        backend sin SQL (p. ej. STORAGE_BACKEND=columnar) se sirve del snapshot
+        columnar. La configuración no se modifica.
+        """
+        if settings.stats_engine == "sql" and self.backend is not None and not self.supports_sql:
+            return "columnar"
+        return settings.stats_engine
 
     async def connect(self):
-        # Crea un pool de conexiones al arrancar
-        self._pool = await asyncpg.create_pool(
-            host="159.223.200.213",
-            port=5432,
-            user="isekai",
-            password="Fr9tL28mQxD7vKcp",
-            database="isekaidb",
-            min_size=1,
-            max_size=5,
-        )
+        backend = create_backend(settings.storage_backend, self._init_connection)
+        await backend.connect()
+        self.backend = backend
 
     async def disconnect(self):
-        if self._pool:
-            await self._pool.close()
-            self._pool = None
+        if self.backend:
+            await self.backend.disconnect()
+            self.backend = None
+
+    def get_connection(self) -> InstrumentedPool:
+        if self.backend is None:
+            raise RuntimeError("Conexión a BD no inicializada")
+        return self.backend.get_pool()
 
-    def get_connection(self) -> asyncpg.Pool:
-        if self._pool is None:
+    def get_read_connection(self) -> InstrumentedPool:
+        """Pool para consultas de solo lectura: una réplica si hay alguna disponible (ver DB_REPLICAS)."""
+        if self.backend is None:
             raise RuntimeError("Conexión a BD no inicializada")
-        return self._pool
+        return self.backend.get_read_pool()
 
 # Instancia global que importas en main.py y en tus routers
 db = Database()
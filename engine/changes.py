@@ -0,0 +1,262 @@
+# engine/changes.py
+
+import asyncio
+import datetime
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncpg
+from engine.cube import NULL_KEY, AggregateCube, CellKey, cube
+
+logger = logging.getLogger(__name__)
+
+# Canal alimentado por el trigger de sql/persons_changes.sql
+CHANNEL = "persons_changes"
+
+# Filas nuevas desde la marca de agua. Solo detecta inserciones (`persons` no tiene updated_at):
+# los UPDATE y DELETE los encuentra la verificación de deriva, que reconstruye el cubo
+POLL_QUERY = (
+    "SELECT pk, species_fk, strata_fk, gender_fk, birthdate "
+    "FROM persons WHERE pk > $1 ORDER BY pk LIMIT $2"
+)
+POLL_BATCH = 10_000
+
+# Filas cuya edad cambió entre dos días, ya agrupadas: el cumpleaños mueve filas de una edad a otra
+ROLLOVER_QUERY = (
+    "SELECT species_fk, strata_fk, gender_fk, "
+    "date_part('year', age($2::date, birthdate))::int AS old_age, "
+    "date_part('year', age($1::date, birthdate))::int AS new_age, "
+    "COUNT(*) AS count "
+    "FROM persons "
+    "WHERE date_part('year', age($1::date, birthdate)) <> date_part('year', age($2::date, birthdate)) "
+    "GROUP BY 1, 2, 3, 4, 5"
+)
+
+# Totales de control por combinación fina, con las edades al día del cubo. Por celda y no solo
+# la raíz: un UPDATE que mueve una fila de especie, estrato o género no cambia los totales
+DRIFT_QUERY = (
+    "SELECT species_fk, strata_fk, gender_fk, "
+    "COUNT(*) AS count, COUNT(age) AS n, COALESCE(SUM(age), 0)::bigint AS sum "
+    "FROM (SELECT species_fk, strata_fk, gender_fk, "
+    "date_part('year', age($1::date, birthdate))::bigint AS age FROM persons) p "
+    "GROUP BY 1, 2, 3"
+)
+
+# Combinación fina -> (count, n, Σedad), ver AggregateCube.fine_totals
+Totals = Dict[CellKey, Tuple[int, int, int]]
+
+
+async def drift_totals(pool, day: datetime.date) -> Totals:
+    """Totales de control de `persons` en la BD con las edades a `day`, con las claves del cubo."""
+    return {
+        tuple(NULL_KEY if row[column] is None else row[column] for column in ("species_fk", "strata_fk", "gender_fk")):
+            (row["count"], row["n"], row["sum"])
+        for row in await pool.fetch(DRIFT_QUERY, day)
+    }
+
+
+def drifted(expected: Totals, actual: Totals) -> List[CellKey]:
+    """Combinaciones finas cuyos totales difieren."""
+    return [key for key in expected.keys() | actual.keys() if expected.get(key) != actual.get(key)]
+
+
+def age_on(birthdate: Optional[datetime.date], day: datetime.date) -> Optional[int]:
+    """
+    Años cumplidos a `day`, igual que date_part('year', age(day, birthdate)):
+    con una fecha futura el intervalo es negativo y se trunca hacia cero.
+    """
+    if birthdate is None:
+        return None
+    if birthdate > day:
+        return -age_on(day, birthdate)
+    return day.year - birthdate.year - ((day.month, day.day) < (birthdate.month, birthdate.day))
+
+
+class ChangeFeed:
+    """
+    Mantiene el cubo de agregados al día aplicando los cambios de `persons`
+    como deltas (±1 fila en count, momentos e histograma de edad), sin releer
+    la tabla. Los cambios llegan por LISTEN/NOTIFY (mode="listen") o
+    consultando filas con pk mayor a una marca de agua (mode="poll").
+
+    Además corre el paso de edad al cambiar el día (solo las filas que
+    cumplen años) y compara periódicamente los totales de cada combinación
+    fina con la BD: si no coinciden (notificaciones perdidas durante una
+    reconexión, o UPDATE y DELETE en modo "poll") reconstruye el cubo.
+    """
+
+    def __init__(self, cube: AggregateCube):
+        self.cube = cube
+        # Callbacks a invocar tras aplicar cambios (p. ej. invalidar la caché HTTP)
+        self.listeners: List[Callable[[], Any]] = []
+        self.mode = ""
+        self.day: Optional[datetime.date] = None
+        self.watermark = 0
+        self.applied = 0
+        self.rollovers = 0
+        self.rebuilds = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        # Serializa los pasos del feed con las reconstrucciones pedidas desde afuera
+        self._lock = asyncio.Lock()
+
+    # -------------------- CICLO DE VIDA --------------------
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self, backend, mode: str, interval: float, drift_interval: float) -> None:
+        """Empieza a seguir los cambios. El cubo ya debe estar cargado desde `backend`."""
+        pool = backend.get_pool()
+        self.mode = mode
+        self.day = await pool.fetchval("SELECT current_date")
+        if mode == "listen":
+            self._connection = await backend.open_connection()
+            await self._connection.add_listener(CHANNEL, self._on_notify)
+        elif mode == "poll":
+            if drift_interval <= 0:
+                logger.warning("CHANGE_FEED=poll sin CHANGE_FEED_DRIFT_SECONDS no detecta UPDATE ni DELETE de persons")
+            self.watermark = await pool.fetchval("SELECT COALESCE(MAX(pk), 0) FROM persons")
+        else:
+            raise ValueError(f"CHANGE_FEED desconocido: {mode}")
+        self._task = asyncio.create_task(self._run(pool, interval, drift_interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        self._pending.append(json.loads(payload))
+
+    async def _run(self, pool, interval: float, drift_interval: float) -> None:
+        since_drift_check = 0.0
+        while True:
+            await asyncio.sleep(interval)
+            since_drift_check += interval
+            try:
+                async with self._lock:
+                    changed = await self.step(pool)
+                    if drift_interval > 0 and since_drift_check >= drift_interval:
+                        since_drift_check = 0.0
+                        changed = await self.check_drift(pool) or changed
+                if changed:
+                    for listener in self.listeners:
+                        listener()
+            except Exception:
+                # Lo que no se aplicó lo corrige la próxima verificación de totales
+                logger.exception("Error aplicando cambios de persons")
+
+    # -------------------- DELTAS --------------------
+
+    async def step(self, pool) -> bool:
+        """Aplica los cambios pendientes y el paso de edad si cambió el día; True si hubo cambios."""
+        changed = False
+        if self.mode == "listen":
+            pending, self._pending = self._pending, []
+            for change in pending:
+                self.apply_change(change.get("old"), change.get("new"))
+            changed = bool(pending)
+        elif self.mode == "poll":
+            changed = await self.poll(pool)
+        today = await pool.fetchval("SELECT current_date")
+        if today != self.day:
+            await self.roll_over(pool, today)
+            changed = True
+        return changed
+
+    def apply_change(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        """Resta la versión anterior de la fila (UPDATE/DELETE) y suma la nueva (INSERT/UPDATE)."""
+        for row, rows in ((old, -1), (new, 1)):
+            if row is None:
+                continue
+            birthdate = row["birthdate"]
+            if isinstance(birthdate, str):
+                birthdate = datetime.date.fromisoformat(birthdate)
+            key = (row["species_fk"], row["strata_fk"], row["gender_fk"])
+            self.cube.apply(key, age_on(birthdate, self.day), rows)
+        self.applied += 1
+
+    async def poll(self, pool) -> bool:
+        """Suma las filas insertadas desde la marca de agua."""
+        changed = False
+        while True:
+            rows = await pool.fetch(POLL_QUERY, self.watermark, POLL_BATCH)
+            for row in rows:
+                self.apply_change(None, row)
+            if rows:
+                self.watermark = rows[-1]["pk"]
+                changed = True
+            if len(rows) < POLL_BATCH:
+                return changed
+
+    async def roll_over(self, pool, today: datetime.date) -> None:
+        """Mueve de edad solo las filas que cumplieron años entre self.day y `today`."""
+        rows = await pool.fetch(ROLLOVER_QUERY, today, self.day)
+        for row in rows:
+            key = (row["species_fk"], row["strata_fk"], row["gender_fk"])
+            self.cube.apply(key, row["old_age"], -row["count"])
+            self.cube.apply(key, row["new_age"], row["count"])
+        self.day = today
+        self.rollovers += 1
+
+    # -------------------- DERIVA --------------------
+
+    async def check_drift(self, pool) -> bool:
+        """
+        Compara count, n y Σedad de cada combinación fina con el cubo; si
+        alguna difiere, reconstruye. True si reconstruyó.
+        """
+        cells = drifted(await drift_totals(pool, self.day), self.cube.fine_totals())
+        if not cells:
+            return False
+        logger.warning("%d celdas de persons no coinciden con la BD; se reconstruye el cubo", len(cells))
+        await self._rebuild(pool)
+        return True
+
+    async def rebuild(self, pool) -> None:
+        """
+        Reconstrucción completa desde la BD pedida desde afuera (admin, arranque
+        en caliente): espera a que termine el paso en curso, así ningún delta se
+        aplica sobre el cubo a medio reemplazar.
+        """
+        async with self._lock:
+            await self._rebuild(pool)
+
+    async def _rebuild(self, pool) -> None:
+        """
+        Relee el cubo y reinicia la posición del feed (marca de agua y día).
+        Los cambios pendientes ya están incluidos en la relectura; los que
+        lleguen durante ella se aplican después y, si alguno quedara contado
+        dos veces, lo corrige la siguiente verificación.
+        """
+        self._pending = []
+        if self.mode == "poll":
+            self.watermark = await pool.fetchval("SELECT COALESCE(MAX(pk), 0) FROM persons")
+        await self.cube.load(pool)
+        self.day = await pool.fetchval("SELECT current_date")
+        self.rebuilds += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "day": self.day.isoformat() if self.day else None,
+            "watermark": self.watermark,
+            "applied": self.applied,
+            "pending": len(self._pending),
+            "rollovers": self.rollovers,
+            "rebuilds": self.rebuilds,
+        }
+
+
+# Instancia global, se inicia en el arranque si CHANGE_FEED está configurado
+feed = ChangeFeed(cube)
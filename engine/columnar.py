@@ -0,0 +1,224 @@
+# engine/columnar.py
+
+import os
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Tuple
+import asyncpg
+import numpy as np
+from engine.cube import AggregateCube, Cell
+
+# Los NULL se codifican con un centinela para poder usar enteros compactos
+NULL_FK = -1
+# Edad desconocida (birthdate NULL) al cargar; las edades negativas (fechas
+# futuras) son valores válidos, igual que para AVG/MIN/MAX en SQL
+NULL_AGE = int(np.iinfo(np.int32).min)
+
+PERSONS_QUERY = (
+    "SELECT "
+    f"COALESCE(species_fk, {NULL_FK}), "
+    f"COALESCE(strata_fk, {NULL_FK}), "
+    f"COALESCE(gender_fk, {NULL_FK}), "
+    f"COALESCE(date_part('year', age(birthdate))::int, {NULL_AGE}) "
+    "FROM persons"
+)
+
+CHUNK_SIZE = 50_000
+
+# Un archivo .npy por columna al guardar el snapshot en disco
+COLUMN_FILES = ("species_fk", "strata_fk", "gender_fk", "age")
+
+
+def smallest_int(max_value: int) -> np.dtype:
+    """Entero con signo más pequeño capaz de guardar `max_value` (y el centinela -1)."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def age_dtype(min_age: int, max_age: int) -> np.dtype:
+    """Entero más pequeño para las edades reservando su máximo como NULL; sin signo si no hay negativas."""
+    candidates = (np.uint8, np.uint16, np.uint32) if min_age >= 0 else (np.int8, np.int16, np.int32)
+    for dtype in candidates:
+        info = np.iinfo(dtype)
+        if info.min <= min_age and max_age < info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class ColumnarSnapshot:
+    """
+    Copia en memoria de `persons` en columnas NumPy compactas
+    (species_fk, strata_fk, gender_fk y age). Responde las mismas preguntas
+    que /v1/stats/count y /v1/stats/age con máscaras vectorizadas sobre los
+    pks ya resueltos por el registro de dimensiones.
+    """
+
+    def __init__(self):
+        self.species: Optional[np.ndarray] = None
+        self.strata: Optional[np.ndarray] = None
+        self.gender: Optional[np.ndarray] = None
+        self.age: Optional[np.ndarray] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.age is not None
+
+    @property
+    def total(self) -> int:
+        return 0 if self.age is None else len(self.age)
+
+    @property
+    def age_null(self) -> int:
+        return int(np.iinfo(self.age.dtype).max)
+
+    # -------------------- CARGA --------------------
+
+    async def load(self, pool: asyncpg.Pool) -> None:
+        """Carga las columnas de `persons` leyendo por bloques con un cursor."""
+        chunks: List[np.ndarray] = []
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                cursor = await conn.cursor(PERSONS_QUERY)
+                while True:
+                    rows = await cursor.fetch(CHUNK_SIZE)
+                    if not rows:
+                        break
+                    flat = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=4 * len(rows))
+                    # Bloques intermedios en int32 para acotar la memoria durante la carga
+                    chunks.append(flat.reshape(-1, 4).astype(np.int32))
+
+        data = np.concatenate(chunks) if chunks else np.empty((0, 4), dtype=np.int32)
+        self.set_columns(data[:, 0], data[:, 1], data[:, 2], data[:, 3])
+
+    def set_columns(self, species, strata, gender, age) -> None:
+        """Reemplaza las columnas reduciéndolas al tipo entero más pequeño posible."""
+        columns = []
+        for values in (species, strata, gender):
+            values = np.asarray(values)
+            top = int(values.max()) if len(values) else 0
+            columns.append(values.astype(smallest_int(top)))
+
+        age = np.asarray(age)
+        unknown = age == NULL_AGE
+        known = age[~unknown]
+        dtype = age_dtype(int(known.min()) if len(known) else 0, int(known.max()) if len(known) else 0)
+        compact = np.where(unknown, np.iinfo(dtype).max, age).astype(dtype)
+
+        self.species, self.strata, self.gender = columns
+        self.age = compact
+
+    def replace(self, other: "ColumnarSnapshot") -> None:
+        """Toma las columnas de `other` de una vez (las lecturas ven las anteriores o las nuevas)."""
+        self.species, self.strata, self.gender, self.age = other.species, other.strata, other.gender, other.age
+
+    def save(self, directory: str) -> None:
+        """Escribe cada columna como .npy en `directory` (se leen luego con open)."""
+        os.makedirs(directory, exist_ok=True)
+        for name, column in zip(COLUMN_FILES, (self.species, self.strata, self.gender, self.age)):
+            np.save(os.path.join(directory, f"{name}.npy"), column)
+
+    def open(self, directory: str) -> None:
+        """
+        Mapea en memoria (solo lectura) las columnas guardadas con save. No se
+        copia nada al arrancar: el sistema operativo carga las páginas a demanda.
+        """
+        columns = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in COLUMN_FILES]
+        self.species, self.strata, self.gender, self.age = columns
+
+    # -------------------- CONSULTAS --------------------
+
+    def _mask(self, species_pk, strata_pk, gender_pk, rows: slice = slice(None)) -> Optional[np.ndarray]:
+        """Máscara booleana de los filtros dados sobre las filas `rows`; None si no hay filtros."""
+        mask = None
+        for column, pk in ((self.species, species_pk), (self.strata, strata_pk), (self.gender, gender_pk)):
+            if pk is None:
+                continue
+            column = column[rows]
+            info = np.iinfo(column.dtype)
+            if not info.min <= pk <= info.max:
+                # Un pk fuera del rango de la columna no puede coincidir con ninguna fila
+                return np.zeros(len(column), dtype=bool)
+            if mask is None:
+                mask = column == pk
+            else:
+                mask &= column == pk
+        return mask
+
+    def count(self, species_pk=None, strata_pk=None, gender_pk=None) -> Tuple[int, int]:
+        """Retorna (conteo filtrado, total de filas)."""
+        mask = self._mask(species_pk, strata_pk, gender_pk)
+        count = self.total if mask is None else int(np.count_nonzero(mask))
+        return count, self.total
+
+    def breakdown(self, dims, pks):
+        """Agrupa las filas filtradas armando un cubo temporal sobre ellas (ver AggregateCube.breakdown)."""
+        mask = self._mask(*pks)
+        columns = [self.species, self.strata, self.gender, self.age]
+        if mask is not None:
+            columns = [column[mask] for column in columns]
+        partial = AggregateCube()
+        partial.build_from_columns(*columns, self.age_null, histograms=False)
+        return partial.breakdown(dims, (None, None, None))
+
+    def chunks(self, pks, chunk_size: int) -> Iterator[Tuple[np.ndarray, ...]]:
+        """Columnas (species, strata, gender, age) de las filas filtradas, por bloques de `chunk_size`."""
+        mask = self._mask(*pks)
+        rows = np.arange(self.total) if mask is None else np.flatnonzero(mask)
+        for start in range(0, len(rows), chunk_size):
+            index = rows[start:start + chunk_size]
+            yield self.species[index], self.strata[index], self.gender[index], self.age[index]
+
+    def partial(self, start: int, stop: int, species_pk=None, strata_pk=None, gender_pk=None) -> Cell:
+        """
+        Momentos de la edad de las filas [start, stop) que cumplen los filtros
+        (`count` son las filas filtradas). Se combinan con Cell.merge; NumPy
+        libera el GIL en estas operaciones, así que los rangos corren en paralelo en hilos.
+        """
+        rows = slice(start, stop)
+        mask = self._mask(species_pk, strata_pk, gender_pk, rows)
+        ages = self.age[rows]
+        cell = Cell(count=stop - start if mask is None else int(np.count_nonzero(mask)))
+        if mask is not None:
+            ages = ages[mask]
+        ages = ages[ages != self.age_null].astype(np.int64)
+        if len(ages):
+            cell.n = len(ages)
+            cell.sum = int(ages.sum())
+            cell.sumsq = int(np.dot(ages, ages))
+            cell.min = int(ages.min())
+            cell.max = int(ages.max())
+        return cell
+
+    def age_histogram(self, species_pk=None, strata_pk=None, gender_pk=None) -> Dict[int, int]:
+        """Histograma edad -> filas de las filas filtradas con edad conocida."""
+        mask = self._mask(species_pk, strata_pk, gender_pk)
+        ages = self.age if mask is None else self.age[mask]
+        ages = ages[ages != self.age_null].astype(np.int64)
+        if len(ages) == 0:
+            return {}
+        # bincount no admite negativos: se cuenta desde la edad mínima
+        low = int(ages.min())
+        counts = np.bincount(ages - low)
+        return {int(age) + low: int(counts[age]) for age in np.flatnonzero(counts)}
+
+    def age_stats(self, species_pk=None, strata_pk=None, gender_pk=None) -> Optional[Dict[str, Optional[float]]]:
+        """
+        min, max, mean y stddev (muestral, como STDDEV de Postgres) de la edad.
+        Retorna None si no hay edades para los filtros.
+        """
+        mask = self._mask(species_pk, strata_pk, gender_pk)
+        ages = self.age if mask is None else self.age[mask]
+        ages = ages[ages != self.age_null]
+        if len(ages) == 0:
+            return None
+        return {
+            "min": float(ages.min()),
+            "max": float(ages.max()),
+            "mean": float(ages.mean(dtype=np.float64)),
+            "stddev": float(ages.std(dtype=np.float64, ddof=1)) if len(ages) > 1 else None,
+        }
+
+
+# Instancia global, se carga en el arranque si STATS_ENGINE=columnar
+snapshot = ColumnarSnapshot()
@@ -0,0 +1,274 @@
+# engine/cube.py
+
+import asyncio
+import math
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import asyncpg
+import numpy as np
+
+# Clave de una celda: (species_pk, strata_pk, gender_pk), con None = "todos"
+CellKey = Tuple[Optional[int], Optional[int], Optional[int]]
+
+# Filas por combinación fina y edad: alcanza para armar momentos e histogramas de
+# todas las celdas, y son pocas (species × strata × gender × edades distintas)
+CUBE_QUERY = (
+    "SELECT "
+    "species_fk, strata_fk, gender_fk, "
+    "date_part('year', age(birthdate))::int AS age, "
+    "COUNT(*) AS count "
+    "FROM persons "
+    "GROUP BY 1, 2, 3, 4"
+)
+
+# Los fk NULL se representan con este valor en las claves (None ya significa "todos");
+# sus celdas son el grupo `null` de los desgloses, igual que el GROUP BY de SQL
+NULL_KEY = -1
+
+
+@dataclass
+class Cell:
+    """Momentos de la edad para una combinación de filtros."""
+    count: int = 0      # filas (COUNT(*))
+    n: int = 0          # filas con edad no nula
+    sum: int = 0
+    sumsq: int = 0
+    min: Optional[int] = None
+    max: Optional[int] = None
+    # Histograma exacto edad -> filas; permite restar filas sin perder min y max
+    ages: Dict[int, int] = field(default_factory=dict)
+
+    def merge(self, other: "Cell") -> None:
+        self.count += other.count
+        self.n += other.n
+        self.sum += other.sum
+        self.sumsq += other.sumsq
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        for age, rows in other.ages.items():
+            self.ages[age] = self.ages.get(age, 0) + rows
+
+    def add(self, age: Optional[int], rows: int = 1) -> None:
+        """Suma (`rows` > 0) o resta (`rows` < 0) filas con esa edad; None = edad desconocida."""
+        self.count += rows
+        if age is None:
+            return
+        self.n += rows
+        self.sum += rows * age
+        self.sumsq += rows * age * age
+        left = self.ages.get(age, 0) + rows
+        if left > 0:
+            self.ages[age] = left
+            self.min = age if self.min is None else min(self.min, age)
+            self.max = age if self.max is None else max(self.max, age)
+            return
+        self.ages.pop(age, None)
+        if age == self.min or age == self.max:
+            # Se vació un extremo: se recalcula desde el histograma
+            self.min = min(self.ages) if self.ages else None
+            self.max = max(self.ages) if self.ages else None
+
+    def age_stats(self) -> Optional[Dict[str, Optional[float]]]:
+        """min, max, mean y stddev muestral derivados de los momentos almacenados."""
+        if self.n == 0:
+            return None
+        stddev = None
+        if self.n > 1:
+            # Varianza exacta en enteros: (n·Σx² - (Σx)²) / (n·(n-1))
+            numerator = self.n * self.sumsq - self.sum * self.sum
+            stddev = math.sqrt(numerator / (self.n * (self.n - 1)))
+        return {
+            "min": float(self.min),
+            "max": float(self.max),
+            "mean": self.sum / self.n,
+            "stddev": stddev,
+        }
+
+
+def rollups(key: Tuple[int, int, int]):
+    """Las 8 celdas (incluyendo niveles "todos") a las que contribuye una celda fina."""
+    return product(*((value, None) for value in key))
+
+
+def rollup_cells(fine: Iterable[Tuple[CellKey, Cell]]) -> Dict[CellKey, Cell]:
+    """Acumula las celdas finas en los 8 niveles; los fk NULL (NULL_KEY) forman su propio grupo."""
+    cells: Dict[CellKey, Cell] = {}
+    for key, cell in fine:
+        for rolled in rollups(key):
+            target = cells.setdefault(rolled, Cell())
+            target.merge(cell)
+    cells.setdefault((None, None, None), Cell())
+    return cells
+
+
+class AggregateCube:
+    """
+    Cubo precalculado species × strata × gender con count, Σedad, Σedad²,
+    min y max por celda, incluyendo el nivel "todos" de cada dimensión.
+    Las estadísticas se responden con una búsqueda en diccionario.
+    """
+
+    def __init__(self):
+        self.cells: Dict[CellKey, Cell] = {}
+        self.ready = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def total(self) -> int:
+        cell = self.cells.get((None, None, None))
+        return cell.count if cell else 0
+
+    # -------------------- CONSTRUCCIÓN --------------------
+
+    async def load(self, pool: asyncpg.Pool) -> None:
+        """Construye el cubo con una sola pasada GROUP BY sobre `persons` (celdas finas por edad)."""
+        async with self._lock:
+            rows = await pool.fetch(CUBE_QUERY)
+
+            fine: Dict[CellKey, Cell] = {}
+            for row in rows:
+                key = tuple(
+                    NULL_KEY if row[column] is None else row[column]
+                    for column in ("species_fk", "strata_fk", "gender_fk")
+                )
+                fine.setdefault(key, Cell()).add(row["age"], row["count"])
+            self._swap(rollup_cells(fine.items()))
+
+    def build_from_columns(self, species, strata, gender, age, age_null: int, histograms: bool = True) -> None:
+        """
+        Construye el cubo desde columnas en memoria (p. ej. el snapshot columnar).
+        Agrega primero las celdas finas con NumPy y luego las acumula en los 8 niveles.
+        `age_null` es el centinela de edad desconocida y los fk negativos son NULL.
+        Con `histograms=False` se omiten los histogramas de edad (desgloses temporales).
+        """
+        keys = np.stack([np.asarray(species), np.asarray(strata), np.asarray(gender)], axis=1).astype(np.int64)
+        ages = np.asarray(age).astype(np.int64)
+        known = ages != age_null
+        fine, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        groups = len(fine)
+
+        counts = np.bincount(inverse, minlength=groups)
+        ns = np.bincount(inverse[known], minlength=groups)
+        sums = np.bincount(inverse[known], weights=ages[known], minlength=groups)
+        sumsqs = np.bincount(inverse[known], weights=ages[known] ** 2, minlength=groups)
+        mins = np.full(groups, np.iinfo(np.int64).max)
+        maxs = np.full(groups, np.iinfo(np.int64).min)
+        np.minimum.at(mins, inverse[known], ages[known])
+        np.maximum.at(maxs, inverse[known], ages[known])
+
+        cells = [
+            Cell(
+                count=int(counts[i]),
+                n=int(ns[i]),
+                sum=int(sums[i]),
+                sumsq=int(sumsqs[i]),
+                min=int(mins[i]) if ns[i] else None,
+                max=int(maxs[i]) if ns[i] else None,
+            )
+            for i in range(groups)
+        ]
+        if histograms:
+            # Pares (celda fina, edad) codificados en un entero para contarlos de una vez;
+            # las edades se desplazan desde la mínima porque pueden ser negativas
+            low = int(ages[known].min()) if known.any() else 0
+            span = int(ages[known].max()) - low + 1 if known.any() else 1
+            pairs, rows = np.unique(inverse[known] * span + (ages[known] - low), return_counts=True)
+            for pair, n in zip(pairs.tolist(), rows.tolist()):
+                cells[pair // span].ages[pair % span + low] = n
+        self._swap(rollup_cells(zip(map(tuple, fine.tolist()), cells)))
+
+    def dump(self) -> List[list]:
+        """
+        Celdas como listas [species, strata, gender, count, n, sum, sumsq, min, max, ages]
+        (None = "todos"; ages como pares [edad, filas]).
+        """
+        return [
+            [*key, cell.count, cell.n, cell.sum, cell.sumsq, cell.min, cell.max, sorted(cell.ages.items())]
+            for key, cell in self.cells.items()
+        ]
+
+    def restore(self, rows: Sequence[Sequence]) -> None:
+        """Reemplaza las celdas por las guardadas con dump (p. ej. por el proceso cargador)."""
+        self._swap({
+            tuple(row[:3]): Cell(*row[3:9], ages={age: n for age, n in row[9]} if len(row) > 9 else {})
+            for row in rows
+        })
+
+    # -------------------- CAMBIOS INCREMENTALES --------------------
+
+    def apply(self, key: CellKey, age: Optional[int], rows: int) -> None:
+        """
+        Suma o resta `rows` filas con esa edad en la combinación fina `key`
+        (fk NULL = None) y en todos sus niveles agregados. Las celdas que quedan
+        vacías se eliminan, salvo la raíz.
+        """
+        fine = tuple(NULL_KEY if value is None else value for value in key)
+        for rolled in rollups(fine):
+            cell = self.cells.get(rolled)
+            if cell is None:
+                cell = self.cells[rolled] = Cell()
+            cell.add(age, rows)
+            if cell.count <= 0 and rolled != (None, None, None):
+                del self.cells[rolled]
+
+    def fine_totals(self) -> Dict[CellKey, Tuple[int, int, int]]:
+        """(count, n, Σedad) de cada combinación fina no vacía, para comparar con la BD (ver engine/changes.py)."""
+        return {key: (cell.count, cell.n, cell.sum) for key, cell in self.cells.items() if None not in key}
+
+    def replace(self, other: "AggregateCube") -> None:
+        """Toma las celdas de `other`, cargado aparte (ver main.reload_data)."""
+        self._swap(other.cells)
+
+    def _swap(self, cells: Dict[CellKey, Cell]) -> None:
+        # Reemplazo atómico: las lecturas concurrentes ven el cubo anterior o el nuevo
+        self.cells = cells
+        self.ready = True
+
+    # -------------------- CONSULTAS --------------------
+
+    def count(self, species_pk=None, strata_pk=None, gender_pk=None) -> Tuple[int, int]:
+        """Retorna (conteo filtrado, total de filas)."""
+        cell = self.cells.get((species_pk, strata_pk, gender_pk))
+        return (cell.count if cell else 0), self.total
+
+    def age_stats(self, species_pk=None, strata_pk=None, gender_pk=None) -> Optional[Dict[str, Optional[float]]]:
+        cell = self.cells.get((species_pk, strata_pk, gender_pk))
+        return cell.age_stats() if cell else None
+
+    def age_histogram(self, species_pk=None, strata_pk=None, gender_pk=None) -> Optional[Dict[int, int]]:
+        """
+        Histograma edad -> filas de la celda (vacío si no hay filas). None si el
+        cubo se restauró sin histogramas y no puede responder.
+        """
+        cell = self.cells.get((species_pk, strata_pk, gender_pk))
+        if cell is None:
+            return {}
+        if sum(cell.ages.values()) != cell.n:
+            return None
+        return cell.ages
+
+    def breakdown(self, dims: Sequence[int], pks: CellKey) -> List[Tuple[CellKey, Cell]]:
+        """
+        Celdas agrupadas por las posiciones `dims` (0 = species, 1 = strata,
+        2 = gender) que cumplen los filtros `pks`; un filtro sobre una
+        dimensión agrupada deja solo ese grupo, como el WHERE de SQL.
+        Ordenadas como el ORDER BY de SQL: el grupo NULL (NULL_KEY) al final.
+        """
+        groups = []
+        for key, cell in self.cells.items():
+            if all(
+                key[position] is not None and pks[position] in (None, key[position])
+                if position in dims else key[position] == pks[position]
+                for position in range(3)
+            ):
+                groups.append((key, cell))
+        groups.sort(key=lambda group: tuple((group[0][p] == NULL_KEY, group[0][p]) for p in dims))
+        return groups
+
+
+# Instancia global, se construye en el arranque si STATS_ENGINE=cube
+cube = AggregateCube()
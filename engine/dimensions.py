@@ -0,0 +1,126 @@
+# engine/dimensions.py
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncpg
+from utils.responses import dumps
+
+logger = logging.getLogger(__name__)
+
+TABLES = ("species", "strata", "genders")
+
+
+class Dimension:
+    """Filas (pk, code, name) de una tabla de dimensión, indexadas por código."""
+
+    def __init__(self, rows: List[asyncpg.Record], key=lambda code: code):
+        self._key = key
+        # Mismo orden que `SELECT code, name ... ORDER BY code`; CodeInfo.code es
+        # texto, así que los códigos numéricos (strata) se exponen como str
+        ordered = sorted(rows, key=lambda row: row["code"])
+        self.items: List[Dict[str, Any]] = [{"code": str(row["code"]), "name": row["name"]} for row in ordered]
+        self.pks: Dict[Any, int] = {key(row["code"]): row["pk"] for row in ordered}
+        self.codes: Dict[int, Any] = {row["pk"]: row["code"] for row in ordered}
+        # Filas originales, para guardarlas en el snapshot de arranque (ver engine/warmstart.py)
+        self.rows: List[Dict[str, Any]] = [{"pk": row["pk"], "code": row["code"], "name": row["name"]} for row in ordered]
+        # Listado ya serializado, para responder /v1/info/* sin codificar en cada petición
+        self.body: bytes = dumps(self.items)
+
+    def pk(self, code: str) -> Optional[int]:
+        try:
+            return self.pks.get(self._key(code))
+        except ValueError:
+            return None
+
+
+class DimensionRegistry:
+    """
+    Copia en memoria de `species`, `strata` y `genders` (code, name, pk).
+    Resuelve códigos sin ir a la BD y sirve los listados de /v1/info/*.
+    Se recarga periódicamente o a pedido desde /v1/admin/dimensions/refresh.
+    """
+
+    def __init__(self):
+        self.species = Dimension([])
+        # Los códigos de estrato son numéricos, igual que en get_strata_pk
+        self.strata = Dimension([], key=int)
+        self.genders = Dimension([])
+        self.ready = False
+        # Callbacks a invocar tras cada recarga (p. ej. invalidar la caché HTTP)
+        self.listeners: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self, backend) -> None:
+        """Recarga las tres tablas desde el backend de almacenamiento (ver backends/)."""
+        rows = await backend.dimension_rows()
+        self.set_rows(rows["species"], rows["strata"], rows["genders"])
+
+    def set_rows(self, species, strata, genders) -> None:
+        """
+        Reemplaza las tres dimensiones de una vez (las lecturas ven la versión
+        anterior o la nueva). Los listeners solo se llaman si alguna fila cambió:
+        el refresco periódico casi siempre trae lo mismo.
+        """
+        dimensions = (Dimension(species), Dimension(strata, key=int), Dimension(genders))
+        changed = any(new.rows != old.rows for new, old in zip(dimensions, (self.species, self.strata, self.genders)))
+        self.species, self.strata, self.genders = dimensions
+        self.ready = True
+        if changed:
+            for listener in self.listeners:
+                listener()
+
+    def rows(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Filas (pk, code, name) de las tres tablas, con la forma de StorageBackend.dimension_rows."""
+        return {table: self.get(table).rows for table in TABLES}
+
+    def get(self, table: str) -> Dimension:
+        return {"species": self.species, "strata": self.strata, "genders": self.genders}[table]
+
+    def resolve(self, speciesCode, strataCode, genderCode) -> Optional[Tuple]:
+        """
+        Retorna la tupla (species_pk, strata_pk, gender_pk), con None en los
+        filtros no usados, o None si algún código no existe.
+        """
+        pks = []
+        for code, dimension in (
+            (speciesCode, self.species),
+            (strataCode, self.strata),
+            (genderCode, self.genders),
+        ):
+            if code is None:
+                pks.append(None)
+                continue
+            pk = dimension.pk(code)
+            if pk is None:
+                return None
+            pks.append(pk)
+        return tuple(pks)
+
+    # -------------------- REFRESCO PERIÓDICO --------------------
+
+    def start_refresh(self, backend, interval: float) -> None:
+        if interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(backend, interval))
+
+    async def stop_refresh(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self, backend, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load(backend)
+            except Exception:
+                # Se conserva la versión anterior hasta el próximo intento
+                logger.exception("No se pudieron refrescar las dimensiones")
+
+
+# Instancia global, se carga en el arranque
+registry = DimensionRegistry()
@@ -0,0 +1,62 @@
+# engine/histogram.py
+
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Sequence
+
+# Un histograma de edad es un dict edad -> filas (el mismo que guardan las celdas
+# del cubo, que se combinan sumando): de él salen intervalos y cuantiles exactos.
+Histogram = Dict[int, int]
+
+
+def buckets(histogram: Histogram, width: int) -> List[Dict[str, int]]:
+    """Intervalos [lower, upper) de `width` años entre la edad mínima y la máxima, incluidos los vacíos."""
+    counts: Dict[int, int] = {}
+    for age, rows in histogram.items():
+        lower = age // width * width
+        counts[lower] = counts.get(lower, 0) + rows
+    if not counts:
+        return []
+    return [
+        {"lower": lower, "upper": lower + width, "count": counts.get(lower, 0)}
+        for lower in range(min(counts), max(counts) + 1, width)
+    ]
+
+
+def quantiles(histogram: Histogram, qs: Sequence[float]) -> List[float]:
+    """
+    Cuantiles exactos con interpolación lineal entre filas vecinas, igual que
+    percentile_cont de Postgres sobre las edades sin agrupar.
+    """
+    ages = sorted(histogram)
+    # cumulative[i] = filas con edad <= ages[i]
+    cumulative = list(accumulate(histogram[age] for age in ages))
+    n = cumulative[-1]
+
+    def value_at(row: int) -> int:
+        """Edad de la fila `row` (base 0) en el orden ascendente."""
+        return ages[bisect_right(cumulative, row)]
+
+    values = []
+    for q in qs:
+        position = q * (n - 1)
+        lower = int(position)
+        fraction = position - lower
+        low = value_at(lower)
+        high = value_at(lower + 1) if fraction else low
+        values.append(low + fraction * (high - low))
+    return values
+
+
+def distribution(histogram: Histogram, width: int, qs: Sequence[float]) -> Optional[Dict[str, Any]]:
+    """Filas, min, max, intervalos y cuantiles del histograma; None si no hay edades."""
+    histogram = {age: rows for age, rows in histogram.items() if rows > 0}
+    if not histogram:
+        return None
+    return {
+        "count": sum(histogram.values()),
+        "min": float(min(histogram)),
+        "max": float(max(histogram)),
+        "buckets": buckets(histogram, width),
+        "quantiles": [{"q": q, "value": round(value, 4)} for q, value in zip(qs, quantiles(histogram, qs))],
+    }
@@ -0,0 +1,89 @@
+# engine/partitioned.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Iterable, List, Optional, Tuple
+from engine.columnar import ColumnarSnapshot
+from engine.cube import Cell
+from queries import partial_query
+
+# Extremos de pk de `persons` (índice de la clave primaria: no recorre la tabla)
+PK_BOUNDS_QUERY = "SELECT MIN(pk) AS low, MAX(pk) AS high FROM persons"
+
+# Hilos para agregar el snapshot en memoria; se crea con la primera consulta
+_executor: Optional[ThreadPoolExecutor] = None
+_workers = 0
+
+
+def split_range(low: int, high: int, partitions: int) -> List[Tuple[int, int]]:
+    """Divide [low, high) en hasta `partitions` rangos contiguos de tamaño parecido."""
+    size = high - low
+    partitions = max(1, min(partitions, size))
+    bounds = [low + size * i // partitions for i in range(partitions + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+async def gather_partitions(partitions: Iterable[Awaitable[Any]]) -> List[Any]:
+    """
+    Como asyncio.gather, pero al primer error cancela las particiones que
+    siguen en curso (y espera a que devuelvan sus conexiones al pool) antes
+    de relanzarlo tal cual, no como ExceptionGroup: el handler lo sigue
+    mapeando a 504 o 500.
+    """
+    async def run(partition: Awaitable[Any]) -> Any:
+        return await partition
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(run(partition)) for partition in partitions]
+    except BaseExceptionGroup as errors:
+        raise errors.exceptions[0] from None
+    return [task.result() for task in tasks]
+
+
+def merge(partials: Iterable[Cell]) -> Cell:
+    """Combina los parciales: las sumas son enteras, así que el resultado es exacto."""
+    cell = Cell()
+    for partial in partials:
+        cell.merge(partial)
+    return cell
+
+
+async def aggregate_sql(pool, pks: Tuple, partitions: int) -> Tuple[int, Cell]:
+    """
+    Total de filas de `persons` y momentos de la edad de las que cumplen los
+    filtros, agregando cada rango de pk en su propia conexión del pool a la vez
+    (la concurrencia real la acota el tamaño del pool).
+    """
+    bounds = await pool.fetchrow(PK_BOUNDS_QUERY)
+    if bounds["low"] is None:
+        return 0, Cell()
+    ranges = split_range(bounds["low"], bounds["high"] + 1, partitions)
+    queries = [partial_query(pks, start, stop) for start, stop in ranges]
+    rows = await gather_partitions(pool.fetchrow(sql, *args) for sql, args in queries)
+    total = sum(row["total"] for row in rows)
+    return total, merge(
+        Cell(count=row["count"], n=row["n"], sum=row["sum"], sumsq=row["sumsq"], min=row["min"], max=row["max"])
+        for row in rows
+    )
+
+
+def executor(workers: int) -> ThreadPoolExecutor:
+    global _executor, _workers
+    if _executor is None or _workers != workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="partition")
+        _workers = workers
+    return _executor
+
+
+async def aggregate_snapshot(snapshot: ColumnarSnapshot, pks: Tuple, partitions: int) -> Tuple[int, Cell]:
+    """Lo mismo que aggregate_sql sobre el snapshot columnar, con un rango de filas por hilo."""
+    loop = asyncio.get_running_loop()
+    pool = executor(partitions)
+    partials = await gather_partitions(
+        loop.run_in_executor(pool, snapshot.partial, start, stop, *pks)
+        for start, stop in split_range(0, snapshot.total, partitions)
+    )
+    return snapshot.total, merge(partials)
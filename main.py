@@ -1,12 +1,33 @@
 # main.py
 
+import asyncio
+import logging
+from typing import Optional, Tuple
 from fastapi import FastAPI
+from config import settings
 from database import db
+from engine.changes import feed
+from engine.columnar import ColumnarSnapshot, snapshot
+from engine.cube import AggregateCube, cube
+from engine.dimensions import registry
+from engine.warmstart import warm_start
+from routers.health import router as health_router
+from routers.persons import router as persons_router
+from routers.admin import is_admin, router as admin_router
+from routers.metrics import router as metrics_router
+from utils.admission import AdmissionMiddleware, gates
+from utils.cache import ResponseCacheMiddleware, response_cache
+from utils.deadlines import DeadlineMiddleware, parse_deadlines
+from utils.health import readiness
+from utils.metrics import MetricsMiddleware
+from utils.profiling import ProfilingMiddleware, profiler
 from routers.genders import router as genders_router
 from routers.species import router as species_router
 from routers.strata import router as strata_router
 from routers.stats import router as stats_router
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="Un API de otro mundo",
     description=(
@@ -22,18 +43,167 @@ app = FastAPI(
     },
 )
 
+async def build_memory_engines() -> Tuple[Optional[ColumnarSnapshot], Optional[AggregateCube]]:
+    """
+    Carga desde el backend, en instancias nuevas, el motor en memoria de
+    /v1/stats (ver db.stats_engine). No toca `snapshot` ni `cube`: si la carga
+    falla a medias se sigue sirviendo la versión anterior completa.
+    """
+    engine = db.stats_engine
+    new_snapshot = new_cube = None
+    if engine == "columnar" or not db.supports_sql:
+        # Carga única de `persons` en columnas NumPy; sin SQL (p. ej. STORAGE_BACKEND=columnar)
+        # mapear las columnas no copia datos y además sirve /v1/persons/export
+        new_snapshot = ColumnarSnapshot()
+        await db.backend.load_snapshot(new_snapshot)
+    if engine == "cube":
+        new_cube = AggregateCube()
+        if not await db.backend.load_cube(new_cube):
+            # El backend no trae agregados precalculados: se arman desde las columnas
+            if new_snapshot is None:
+                new_snapshot = ColumnarSnapshot()
+                await db.backend.load_snapshot(new_snapshot)
+            new_cube.build_from_columns(
+                new_snapshot.species, new_snapshot.strata, new_snapshot.gender, new_snapshot.age, new_snapshot.age_null
+            )
+    return new_snapshot, new_cube
+
+def install_memory_engines(new_snapshot: Optional[ColumnarSnapshot], new_cube: Optional[AggregateCube]) -> None:
+    """Reemplaza los motores globales por los ya cargados, sin ceder el control al event loop."""
+    if new_snapshot is not None:
+        snapshot.replace(new_snapshot)
+    if new_cube is not None:
+        cube.replace(new_cube)
+
+async def load_memory_engines():
+    """Carga desde el backend el motor en memoria de /v1/stats elegido en STATS_ENGINE."""
+    install_memory_engines(*await build_memory_engines())
+
+async def reload_data():
+    """
+    Pasa a la nueva versión publicada por el backend. Primero se lee todo
+    (dimensiones y motores en instancias nuevas) y recién al final se
+    reemplaza sin ceder el control al event loop: ninguna petición ve
+    dimensiones de una versión y columnas o cubo de otra, y si algo falla
+    queda la versión anterior entera.
+    """
+    rows = await db.backend.dimension_rows()
+    engines = await build_memory_engines()
+    registry.set_rows(rows["species"], rows["strata"], rows["genders"])
+    install_memory_engines(*engines)
+    response_cache.invalidate("/v1/stats")
+
+def invalidate_dimension_responses():
+    """Las respuestas que llevan códigos o nombres de las dimensiones."""
+    response_cache.invalidate("/v1/info")
+    response_cache.invalidate("/v1/stats")
+
+# Validación en segundo plano del snapshot de arranque (ver check_warm_start)
+warm_start_task: Optional[asyncio.Task] = None
+
+async def reload_from_backend():
+    """Reemplaza lo cargado desde el snapshot de arranque por lo que hay en la BD."""
+    if feed.running:
+        # El feed necesita reiniciar su marca de agua junto con el cubo
+        await registry.load(db.backend)
+        await feed.rebuild(db.get_connection())
+        response_cache.invalidate("/v1/stats")
+    else:
+        await reload_data()
+
+async def check_warm_start(loaded: bool):
+    """
+    Valida contra la BD el snapshot con que se arrancó; si no coincide se
+    recarga desde la BD. En ambos casos sin snapshot válido se guarda uno
+    nuevo para el próximo arranque.
+    """
+    try:
+        if loaded:
+            if await warm_start.validate(db.backend, registry, snapshot, cube):
+                return
+            logger.warning("El snapshot de arranque %s no coincide con la BD; se recarga", warm_start.version)
+            await reload_from_backend()
+        await warm_start.save(registry, snapshot, cube, settings.warm_start_keep)
+    except Exception:
+        logger.exception("No se pudo validar o guardar el snapshot de arranque")
+
 @app.on_event("startup")
 async def on_startup():
-    """Inicializa el pool al arrancar la aplicación."""
+    """
+    Inicializa el pool (con las sentencias calientes preparadas) y los datos
+    en memoria; recién entonces /readyz responde 200.
+    """
+    global warm_start_task
     await db.connect()
+    # Si cambian códigos o nombres, las respuestas cacheadas dejan de ser válidas
+    registry.listeners.append(invalidate_dimension_responses)
+    warm = settings.warm_start_path and db.supports_sql
+    loaded = warm and await warm_start.load(db.stats_engine, registry, snapshot, cube)
+    if not loaded:
+        # Dimensiones en memoria: resuelven códigos y sirven /v1/info/* sin ir a la BD
+        await registry.load(db.backend)
+        await load_memory_engines()
+    registry.start_refresh(db.backend, settings.dimensions_refresh_seconds)
+    db.backend.listeners.append(reload_data)
+    db.backend.start_watch(settings.columnar_poll_seconds)
+    if settings.change_feed and db.stats_engine == "cube" and db.supports_sql:
+        # Deltas de `persons` sobre el cubo en vez de reconstruirlo
+        feed.listeners.append(lambda: response_cache.invalidate("/v1/stats"))
+        await feed.start(
+            db.backend, settings.change_feed,
+            settings.change_feed_interval, settings.change_feed_drift_seconds,
+        )
+    if warm:
+        warm_start_task = asyncio.create_task(check_warm_start(bool(loaded)))
+    readiness.set_ready()
 
 @app.on_event("shutdown")
 async def on_shutdown():
     """Cierra el pool al detener la aplicación."""
+    readiness.set_not_ready("deteniendo")
+    if warm_start_task is not None:
+        warm_start_task.cancel()
+    await registry.stop_refresh()
+    await feed.stop()
     await db.disconnect()
 
 # Monta tus routers SIN volver a poner prefix/tags aquí
+app.include_router(health_router)
 app.include_router(genders_router)
 app.include_router(species_router)
 app.include_router(strata_router)
 app.include_router(stats_router)
+app.include_router(persons_router)
+app.include_router(admin_router)
+app.include_router(metrics_router)
+
+if gates:
+    # Por dentro de la caché: los aciertos se responden sin ocupar lugar en la cola
+    app.add_middleware(AdmissionMiddleware, gates=gates, retry_after=settings.admission_queue_timeout)
+
+deadlines = parse_deadlines(settings.request_deadlines)
+if deadlines:
+    # Por fuera del control de admisión: la espera en cola también cuenta para el plazo
+    app.add_middleware(DeadlineMiddleware, deadlines=deadlines)
+
+if settings.response_cache_ttl > 0:
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        cache=response_cache,
+        prefixes=settings.response_cache_prefixes,
+    )
+
+if settings.metrics_enabled:
+    # Se agrega al final para quedar por fuera de la caché y medir también sus aciertos
+    app.add_middleware(MetricsMiddleware, routes=app.routes)
+
+if settings.profiling_enabled:
+    # Por fuera de todo lo demás: el perfil incluye la cola de admisión y el middleware de métricas
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=profiler,
+        authorize=is_admin,
+        prefixes=settings.profiling_prefixes,
+        interval=settings.profiling_interval,
+        explain=settings.profiling_explain,
+    )
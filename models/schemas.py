@@ -1,3 +1,4 @@
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel, Field
 
 class CodeInfo(BaseModel):
@@ -32,3 +33,70 @@ class ProblemDetail(BaseModel):
     instance: str = Field(..., example="https://example.com/")
     properties: dict = Field(default_factory=dict)
 
+class AgeBucket(BaseModel):
+    lower: int = Field(..., description="Edad inicial del intervalo (incluida)", example=30)
+    upper: int = Field(..., description="Edad final del intervalo (excluida)", example=40)
+    count: int = Field(..., description="Individuos con edad en el intervalo", example=1250)
+
+class AgeQuantile(BaseModel):
+    q: float = Field(..., description="Cuantil pedido, entre 0 y 1", example=0.5)
+    value: float = Field(..., description="Edad en ese cuantil (interpolada, como percentile_cont)", example=41.0)
+
+class AgeDistribution(BaseModel):
+    count: int = Field(..., description="Individuos con edad conocida", example=9192)
+    min: float = Field(..., description="Edad mínima", example=18.0)
+    max: float = Field(..., description="Edad máxima", example=99.0)
+    buckets: List[AgeBucket] = Field(..., description="Histograma por intervalos de `bucket` años")
+    quantiles: List[AgeQuantile] = Field(..., description="Cuantiles pedidos, en el mismo orden")
+
+class BatchItem(BaseModel):
+    speciesCode: Optional[str] = Field(None, description="Código de especie", example="HU")
+    strataCode: Optional[str] = Field(None, description="Código de estrato", example="0")
+    genderCode: Optional[str] = Field(None, description="Código de género", example="F")
+    metrics: List[Literal["count", "age"]] = Field(
+        default_factory=lambda: ["count", "age"],
+        min_length=1,
+        description="Estadísticas a calcular para esta combinación de filtros",
+        example=["count", "age"],
+    )
+
+    class Config:
+        # los códigos de estrato suelen llegar como números en el JSON
+        coerce_numbers_to_str = True
+
+class BatchResult(BaseModel):
+    status: int = Field(..., description="Estado HTTP de este elemento", example=200)
+    count: Optional[CountStat] = Field(None, description="Resultado de /v1/stats/count")
+    age: Optional[AgeStat] = Field(None, description="Resultado de /v1/stats/age")
+    error: Optional[ProblemDetail] = Field(None, description="Detalle del error si status != 200")
+
+class Person(BaseModel):
+    id: int = Field(..., description="Clave primaria del individuo (pk)", example=1024)
+    species: Optional[str] = Field(None, description="Código de especie", example="HU")
+    strata: Optional[str] = Field(None, description="Código de estrato", example="0")
+    gender: Optional[str] = Field(None, description="Código de género", example="F")
+    age: Optional[int] = Field(None, description="Edad en años", example=31)
+
+    class Config:
+        # strata_fl es numérico en la BD; se expone como texto igual que en /v1/info/strata
+        coerce_numbers_to_str = True
+
+class PersonPage(BaseModel):
+    items: List[Person] = Field(..., description="Individuos de la página, ordenados por id")
+    next_cursor: Optional[str] = Field(
+        None, description="Cursor opaco para pedir la página siguiente; null si no hay más", example="eyJhZnRlciI6IDEwMjR9"
+    )
+
+class CountGroup(CountStat):
+    group: Dict[str, Optional[str]] = Field(
+        ...,
+        description="Código de cada dimensión agrupada (null: filas sin esa dimensión)",
+        example={"species": "HU", "gender": "F"},
+    )
+
+class AgeGroup(AgeStat):
+    group: Dict[str, Optional[str]] = Field(
+        ...,
+        description="Código de cada dimensión agrupada (null: filas sin esa dimensión)",
+        example={"species": "HU", "gender": "F"},
+    )
@@ -0,0 +1,169 @@
+# queries.py
+
+from functools import lru_cache
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+from crud import FILTER_COLUMNS, pk_conditions
+
+# Edad en años, igual que en crud.get_all_persons
+AGE_EXPR = "date_part('year', age(birthdate))"
+
+# Un filtro por dimensión: pk o None si no se usa
+Filters = Tuple[Optional[int], Optional[int], Optional[int]]
+Shape = Tuple[bool, bool, bool]
+
+# -------------------- COMPILADOR DE /v1/stats --------------------
+#
+# Cada combinación de filtros usados (la "forma") produce siempre el mismo
+# texto SQL, de modo que asyncpg lo prepara una vez por conexión y lo reutiliza
+# desde su caché de sentencias. Los códigos ya llegan resueltos a pk (registro
+# en memoria o, si no está cargado, routers.stats.resolve_pks).
+
+def shape_of(filters: Filters) -> Shape:
+    return tuple(value is not None for value in filters)
+
+def _where(shape: Shape) -> str:
+    """Condiciones `columna = $n` de los filtros usados, numeradas en orden."""
+    columns = [column for column, used in zip(FILTER_COLUMNS, shape) if used]
+    return " AND ".join(f"{column} = ${i}" for i, column in enumerate(columns, 1))
+
+@lru_cache(maxsize=None)
+def count_statement(shape: Shape) -> str:
+    """Total global y conteo filtrado en una sola pasada (COUNT(*) FILTER)."""
+    where = _where(shape)
+    count = f"COUNT(*) FILTER (WHERE {where})" if where else "COUNT(*)"
+    return f"SELECT COUNT(*) AS total, {count} AS count FROM persons"
+
+@lru_cache(maxsize=None)
+def age_statement(shape: Shape) -> str:
+    """min, max, promedio y desviación estándar de la edad para los filtros."""
+    where = _where(shape)
+    sql = (
+        "SELECT "
+        f"MIN({AGE_EXPR})::float AS min, "
+        f"MAX({AGE_EXPR})::float AS max, "
+        f"AVG({AGE_EXPR})::float AS mean, "
+        f"STDDEV({AGE_EXPR})::float AS stddev "
+        "FROM persons"
+    )
+    if where:
+        sql += f" WHERE {where}"
+    return sql
+
+def count_query(filters: Filters) -> Tuple[str, list]:
+    return count_statement(shape_of(filters)), [v for v in filters if v is not None]
+
+def age_query(filters: Filters) -> Tuple[str, list]:
+    return age_statement(shape_of(filters)), [v for v in filters if v is not None]
+
+def hot_statements() -> List[str]:
+    """
+    Sentencias de /v1/stats/count y /v1/stats/age de todas las formas de filtro:
+    se preparan en cada conexión nueva del pool.
+    """
+    return [
+        build(shape)
+        for build in (count_statement, age_statement)
+        for shape in product((False, True), repeat=3)
+    ]
+
+# -------------------- DESGLOSES --------------------
+
+def count_by_query(columns: List[str], pks: Tuple) -> Tuple[str, list]:
+    """
+    Una pasada con GROUPING SETS: la fila del conjunto vacío trae el total
+    global y las agrupadas el conteo filtrado (FILTER) de cada grupo.
+    """
+    args: list = []
+    grouped = ", ".join(columns)
+    conditions = pk_conditions(pks, args)
+    where = f" FILTER (WHERE {' AND '.join(conditions)})" if conditions else ""
+    sql = (
+        f"SELECT {grouped}, GROUPING({grouped}) AS grouping, "
+        f"COUNT(*) AS total, COUNT(*){where} AS count "
+        f"FROM persons GROUP BY GROUPING SETS (({grouped}), ()) "
+        f"ORDER BY {grouped}"
+    )
+    return sql, args
+
+def age_by_query(columns: List[str], pks: Tuple) -> Tuple[str, list]:
+    args: list = []
+    grouped = ", ".join(columns)
+    conditions = pk_conditions(pks, args)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = (
+        f"SELECT {grouped}, "
+        f"MIN({AGE_EXPR})::float AS min, "
+        f"MAX({AGE_EXPR})::float AS max, "
+        f"AVG({AGE_EXPR})::float AS mean, "
+        f"STDDEV({AGE_EXPR})::float AS stddev "
+        f"FROM persons{where} GROUP BY {grouped} ORDER BY {grouped}"
+    )
+    return sql, args
+
+def age_histogram_query(pks: Tuple) -> Tuple[str, list]:
+    """Filas por edad (sin las de edad desconocida) para los filtros: a lo más unas miles de filas."""
+    args: list = []
+    conditions = pk_conditions(pks, args) + ["birthdate IS NOT NULL"]
+    sql = (
+        f"SELECT {AGE_EXPR}::int AS age, COUNT(*) AS count "
+        f"FROM persons WHERE {' AND '.join(conditions)} GROUP BY 1"
+    )
+    return sql, args
+
+# -------------------- PARTICIONES --------------------
+
+def partial_query(pks: Tuple, start: int, stop: int) -> Tuple[str, list]:
+    """
+    Agregados parciales del rango de pk [start, stop): filas del rango y, de
+    las que cumplen los filtros, count, n, Σedad, Σedad², min y max. Las sumas
+    son enteras para que la combinación de los rangos sea exacta.
+    """
+    args: list = [start, stop]
+    conditions = pk_conditions(pks, args)
+    where = f" FILTER (WHERE {' AND '.join(conditions)})" if conditions else ""
+    sql = (
+        "SELECT COUNT(*) AS total, "
+        f"COUNT(*){where} AS count, "
+        f"COUNT(age){where} AS n, "
+        f"COALESCE(SUM(age){where}, 0)::bigint AS sum, "
+        f"COALESCE(SUM(age * age){where}, 0)::bigint AS sumsq, "
+        f"MIN(age){where} AS min, "
+        f"MAX(age){where} AS max "
+        "FROM (SELECT species_fk, strata_fk, gender_fk, "
+        f"{AGE_EXPR}::bigint AS age FROM persons WHERE pk >= $1 AND pk < $2) p"
+    )
+    return sql, args
+
+# -------------------- LOTES --------------------
+
+def batch_query(combos: List[Tuple]) -> Tuple[str, list]:
+    """
+    Arma una sola consulta con agregados condicionales (FILTER) para cada
+    combinación de pks distinta. Los pks repetidos comparten parámetro.
+    """
+    args: list = []
+    params: Dict[Tuple[str, int], str] = {}
+    selects = ["COUNT(*) AS total"]
+    for i, pks in enumerate(combos):
+        conditions = []
+        for column, pk in zip(FILTER_COLUMNS, pks):
+            if pk is None:
+                continue
+            if (column, pk) not in params:
+                args.append(pk)
+                params[(column, pk)] = f"${len(args)}"
+            conditions.append(f"{column} = {params[(column, pk)]}")
+        where = f" FILTER (WHERE {' AND '.join(conditions)})" if conditions else ""
+        selects += [
+            f"COUNT(*){where} AS count_{i}",
+            f"MIN(age){where}::float AS min_{i}",
+            f"MAX(age){where}::float AS max_{i}",
+            f"AVG(age){where}::float AS mean_{i}",
+            f"STDDEV(age){where}::float AS stddev_{i}",
+        ]
+    sql = (
+        f"SELECT {', '.join(selects)} "
+        f"FROM (SELECT species_fk, strata_fk, gender_fk, {AGE_EXPR} AS age FROM persons) p"
+    )
+    return sql, args
@@ -0,0 +1,147 @@
+# routers/admin.py
+
+import hmac
+from typing import Literal, Optional
+from fastapi import APIRouter, Header, Query, status
+from fastapi.responses import PlainTextResponse
+from config import settings
+from database import db
+from engine.changes import feed
+from engine.columnar import snapshot
+from engine.cube import cube
+from engine.dimensions import registry
+from utils.admission import gates
+from utils.cache import response_cache
+from utils.coalesce import stats_flight
+from utils.errors import forbidden, internal_error, problem_response, profile_not_found
+from utils.profiling import profiler
+
+router = APIRouter(
+    prefix="/v1/admin",
+    tags=["Administración"],
+    include_in_schema=False,
+)
+
+def is_admin(token: Optional[str]) -> bool:
+    """Valida el token de administración; sin ADMIN_TOKEN configurado nadie es admin."""
+    if not settings.admin_token or token is None:
+        return False
+    return hmac.compare_digest(token, settings.admin_token)
+
+@router.post("/cube/rebuild", summary="Reconstruir el cubo de agregados")
+async def rebuild_cube(x_admin_token: Optional[str] = Header(None)):
+    """
+    Reconstruye el cubo species × strata × gender. Con SQL la fuente es
+    siempre la BD (primario): el snapshot columnar puede ser anterior a los
+    cambios que ya aplicó el feed. Si el feed corre, la reconstrucción pasa
+    por él para pausarlo y reiniciar su posición. Sin SQL (STORAGE_BACKEND=
+    columnar) la fuente es el snapshot, que ahí es la versión publicada.
+    """
+    if not is_admin(x_admin_token):
+        return problem_response(status.HTTP_403_FORBIDDEN, forbidden)
+    try:
+        if feed.running:
+            await feed.rebuild(db.get_connection())
+            source = "database"
+        elif db.supports_sql:
+            await cube.load(db.get_connection())
+            source = "database"
+        else:
+            cube.build_from_columns(
+                snapshot.species, snapshot.strata, snapshot.gender,
+                snapshot.age, snapshot.age_null,
+            )
+            source = "snapshot"
+        response_cache.invalidate("/v1/stats")
+        return {"source": source, "cells": len(cube.cells), "total": cube.total}
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
+
+@router.post("/dimensions/refresh", summary="Recargar tablas de dimensión")
+async def refresh_dimensions(x_admin_token: Optional[str] = Header(None)):
+    """Recarga species, strata y genders en el registro en memoria."""
+    if not is_admin(x_admin_token):
+        return problem_response(status.HTTP_403_FORBIDDEN, forbidden)
+    try:
+        await registry.load(db.backend)
+        return {
+            "species": len(registry.species.items),
+            "strata": len(registry.strata.items),
+            "genders": len(registry.genders.items),
+        }
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
+
+@router.post("/cache/invalidate", summary="Invalidar la caché HTTP de respuestas")
+async def invalidate_cache(prefix: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """Elimina las respuestas cacheadas bajo `prefix` (todas si no se indica)."""
+    if not is_admin(x_admin_token):
+        return problem_response(status.HTTP_403_FORBIDDEN, forbidden)
+    return {"invalidated": response_cache.invalidate(prefix)}
+
+@router.get("/pool", summary="Indicadores del pool de conexiones")
+async def pool_stats(x_admin_token: Optional[str] = Header(None)):
+    """Conexiones en uso, ociosas, en espera y tiempo de espera por `acquire`, y estado de las réplicas."""
+    if not is_admin(x_admin_token):
+        return problem_response(status.HTTP_403_FORBIDDEN, forbidden)
+    try:
+        stats = db.get_connection().stats()
+        if getattr(db.backend, "replicas", None):
+            stats["primary_reads"] = db.backend.primary_reads
+            stats["replicas"] = db.backend.replica_stats()
+        return stats
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
+
+@router.get("/coalescing", summary="Contadores de agrupación de consultas")
+async def coalescing_stats(x_admin_token: Optional[str] = Header(None)):
+    """Aciertos (peticiones que esperaron una consulta ya en curso), fallos y consultas en vuelo."""
+    if not is_admin(x_admin_token):
+        return problem_response(status.HTTP_403_FORBIDDEN, forbidden)
+    return stats_flight.stats()
+
+@router.get("/admission", summary="Estado del control de admisión")
+async def admission_stats(x_admin_token: Optional[str] = Header(None)):
+    """Concurrencia activa, peticiones en cola, admitidas y rechazadas por prefijo."""
+    if not is_admin(x_admin_token):
+        return problem_response(status.HTTP_403_FORBIDDEN, forbidden)
+    return {gate.name: gate.stats() for gate in gates}
+
+@router.get("/changes", summary="Estado del seguimiento de cambios de persons")
+async def changes_stats(x_admin_token: Optional[str] = Header(None)):
+    """Modo, día de las edades, marca de agua y cantidad de deltas, pasos de edad y reconstrucciones."""
+    if not is_admin(x_admin_token):
+        return problem_response(status.HTTP_403_FORBIDDEN, forbidden)
+    return feed.stats()
+
+@router.get("/profiles", summary="Perfiles de peticiones recientes")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """
+    Perfiles capturados con PROFILING=1 (cabecera X-Profile: 1 o PROFILING_PREFIXES),
+    del más reciente al más antiguo: duración, muestras y tiempo en la BD.
+    """
+    if not is_admin(x_admin_token):
+        return problem_response(status.HTTP_403_FORBIDDEN, forbidden)
+    return profiler.stats()
+
+@router.get("/profiles/{profile_id}", summary="Perfil de una petición")
+async def get_profile(
+    profile_id: int,
+    format: Literal["speedscope", "collapsed", "queries"] = Query(
+        "speedscope",
+        description="speedscope: JSON para speedscope.app; collapsed: pilas colapsadas para "
+                    "flamegraph.pl/inferno; queries: consultas con su plan EXPLAIN (ANALYZE, BUFFERS)",
+    ),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """El id viene en la cabecera X-Profile-Id de la respuesta perfilada."""
+    if not is_admin(x_admin_token):
+        return problem_response(status.HTTP_403_FORBIDDEN, forbidden)
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return problem_response(status.HTTP_404_NOT_FOUND, profile_not_found)
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    if format == "queries":
+        return {**profile.summary(), "queries": profile.queries}
+    return profile.speedscope()
@@ -0,0 +1,33 @@
+# routers/health.py
+
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from config import settings
+from engine.warmstart import warm_start
+from utils.errors import not_ready
+from utils.health import readiness
+
+router = APIRouter(
+    tags=["Observabilidad"],
+    include_in_schema=False,
+)
+
+@router.get("/healthz")
+async def liveness():
+    """El proceso está vivo y atiende el event loop; no consulta dependencias."""
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readiness_probe():
+    """200 una vez terminado el arranque (el balanceador puede enviar tráfico); 503 antes o al detenerse."""
+    state = readiness.stats()
+    if settings.warm_start_path:
+        state["warm_start"] = warm_start.stats()
+    if not readiness.ready:
+        problem = not_ready["content"]["application/problem+json"]["example"]
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={**problem, "properties": state},
+            media_type="application/problem+json",
+        )
+    return {"status": "ready", **state}
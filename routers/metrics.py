@@ -0,0 +1,55 @@
+# routers/metrics.py
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from database import db
+from utils import metrics
+from utils.admission import gates
+from utils.cache import response_cache
+from utils.coalesce import stats_flight
+
+router = APIRouter(
+    tags=["Observabilidad"],
+    include_in_schema=False,
+)
+
+metrics.registry.register(metrics.Gauges(
+    "db_pool_state",
+    "Estado del pool de conexiones (size, in_use, idle, waiters, ...)",
+    lambda: db.get_connection().stats(),
+))
+metrics.registry.register(metrics.Gauges(
+    "response_cache_state",
+    "Aciertos, fallos y entradas de la caché HTTP de respuestas",
+    lambda: {
+        "hits": response_cache.hits,
+        "misses": response_cache.misses,
+        "entries": len(response_cache._entries),
+    },
+))
+metrics.registry.register(metrics.Gauges(
+    "stats_coalescing_state",
+    "Aciertos, fallos y consultas en vuelo del agrupador de /v1/stats",
+    stats_flight.stats,
+))
+
+metrics.registry.register(metrics.Gauges(
+    "admission_state",
+    "Concurrencia activa, en espera, admitidas y rechazadas por prefijo del control de admisión",
+    lambda: {f"{gate.name}:{key}": value for gate in gates for key, value in gate.stats().items()},
+))
+metrics.registry.register(metrics.Gauges(
+    "db_replica_state",
+    "Salud, retraso, fallos, expulsiones, lecturas y reintentos en el primario por réplica (host:puerto:campo)",
+    lambda: {
+        f"{replica.name}:{key}": float(value)
+        for replica in getattr(db.backend, "replicas", ())
+        for key, value in replica.stats().items()
+        if isinstance(value, (bool, int, float))
+    },
+))
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Métricas en formato de texto de Prometheus."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
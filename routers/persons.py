@@ -0,0 +1,307 @@
+# routers/persons.py
+
+import asyncio
+import base64
+import csv
+import io
+import json
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Header, status, Query
+from fastapi.responses import StreamingResponse
+from config import settings
+from crud import PERSONS_COLUMNS, PERSONS_FIELDS, get_by_ids, get_page, pk_conditions, stream_persons
+from database import db
+from engine.columnar import snapshot
+from engine.dimensions import registry
+from models.schemas import PersonPage
+from routers.stats import resolve_pks
+from utils.errors import (
+    not_found, internal_error, gateway_timeout, not_acceptable, not_implemented, problem_response,
+)
+from utils.formats import ARROW, CSV, MSGPACK, NDJSON, ArrowStream, available, msgpack_rows, negotiate
+
+router = APIRouter(
+    prefix="/v1/persons",
+    tags=["Personas"],
+)
+
+TABLE = "persons"
+# `persons` usa `pk` como clave primaria (no `id` como asume crud.get_all)
+KEY = "pk"
+LIST_COLUMNS = f"{KEY} AS id, {PERSONS_COLUMNS}"
+
+MEDIA_TYPES = {
+    "ndjson": NDJSON,
+    "csv": CSV,
+    "arrow": ARROW,
+    "msgpack": MSGPACK,
+}
+FORMATS = {media_type: format for format, media_type in MEDIA_TYPES.items()}
+
+# Esquema Arrow de la exportación, en el orden de PERSONS_FIELDS
+ARROW_FIELDS = (("species", "str"), ("strata", "int"), ("gender", "str"), ("age", "int"))
+
+def ndjson_chunk(rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(PERSONS_FIELDS, row)), ensure_ascii=False) + "\n" for row in rows
+    ).encode()
+
+def csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+def msgpack_chunk(rows) -> bytes:
+    return msgpack_rows(PERSONS_FIELDS, rows)
+
+def snapshot_rows(species, strata, gender, age) -> list:
+    """Filas (species, strata, gender, age) de un bloque del snapshot, con los códigos del registro."""
+    null = snapshot.age_null
+    return [
+        (
+            registry.species.codes.get(s),
+            registry.strata.codes.get(st),
+            registry.genders.codes.get(g),
+            None if a == null else a,
+        )
+        for s, st, g, a in zip(species.tolist(), strata.tolist(), gender.tolist(), age.tolist())
+    ]
+
+async def export_body(pks, format: str):
+    """
+    Serializa cada bloque del cursor apenas llega; la memoria no crece con la
+    tabla. En Arrow cada bloque es un record batch armado desde los asyncpg.Record.
+    """
+    stream = None
+    if format == "csv":
+        yield csv_chunk([PERSONS_FIELDS])
+        encode = csv_chunk
+    elif format == "arrow":
+        stream = ArrowStream(ARROW_FIELDS)
+        encode = stream.write
+    elif format == "msgpack":
+        encode = msgpack_chunk
+    else:
+        encode = ndjson_chunk
+    if not db.supports_sql:
+        # Backend sin SQL: mismas filas desde el snapshot columnar mapeado en memoria
+        for chunk in snapshot.chunks(pks, settings.export_chunk_size):
+            yield encode(snapshot_rows(*chunk))
+    else:
+        async for rows in stream_persons(db.get_read_connection(), TABLE, pks, settings.export_chunk_size):
+            yield encode(rows)
+    if stream is not None:
+        yield stream.close()
+
+@router.get(
+    "/export",
+    summary="Exportar individuos en streaming",
+    description=(
+        "Exporta species, strata, gender y age de `persons` en NDJSON, CSV, Arrow IPC o "
+        "MessagePack, enviando los datos por bloques a medida que se leen de la base de datos. "
+        "Sin `format` el formato se elige según la cabecera Accept (NDJSON por defecto)"
+    ),
+    responses={
+        200: {
+            "description": "Exportación en curso",
+            "content": {
+                "application/x-ndjson": {
+                    "example": '{"species": "HU", "strata": 0, "gender": "F", "age": 31}\n'
+                },
+                "text/csv": {
+                    "example": "species,strata,gender,age\nHU,0,F,31\n"
+                },
+                ARROW: {
+                    "schema": {"type": "string", "format": "binary"}
+                },
+                MSGPACK: {
+                    "schema": {"type": "string", "format": "binary"}
+                },
+            }
+        },
+        400: {
+            "description": "Parámetros inválidos",
+            "content": {
+                "application/problem+json": {
+                    "example": not_found["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        406: {
+            "description": "El formato pedido en `format` no está disponible en este servidor",
+            "content": {
+                "application/problem+json": {
+                    "example": not_acceptable["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        500: {
+            "description": "Error interno no manejado",
+            "content": {
+                "application/problem+json": {
+                    "example": internal_error["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+    },
+)
+async def export_persons(
+    format: Optional[Literal["ndjson", "csv", "arrow", "msgpack"]] = Query(
+        None, description="Formato de salida; tiene prioridad sobre Accept", example="csv"
+    ),
+    speciesCode: Optional[str] = Query(None, alias="speciesCode", description="Código de especie", example="HU"),
+    strataCode:  Optional[str] = Query(None, alias="strataCode",  description="Código de estrato", example=0),
+    genderCode:  Optional[str] = Query(None, alias="genderCode",  description="Código de género", example="F"),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    Recorre `persons` con un cursor del servidor y entrega cada bloque por
+    StreamingResponse, que espera a que el cliente lo consuma antes de pedir el siguiente.
+    """
+    if format is None:
+        format = FORMATS[negotiate(accept, (NDJSON, CSV, ARROW, MSGPACK))]
+    elif not available(MEDIA_TYPES[format]):
+        return problem_response(status.HTTP_406_NOT_ACCEPTABLE, not_acceptable)
+    try:
+        pks = await resolve_pks(speciesCode, strataCode, genderCode)
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
+    if pks is None:
+        return problem_response(status.HTTP_400_BAD_REQUEST)
+
+    headers = {"Vary": "Accept"}
+    if format == "csv":
+        headers["Content-Disposition"] = 'attachment; filename="persons.csv"'
+    return StreamingResponse(export_body(pks, format), media_type=MEDIA_TYPES[format], headers=headers)
+
+# -------------------- LISTADO PAGINADO --------------------
+
+def encode_cursor(after: int) -> str:
+    """Cursor opaco con el último id entregado."""
+    return base64.urlsafe_b64encode(json.dumps({"after": after}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Optional[int]:
+    """Id contenido en el cursor; None si el cursor no es válido."""
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["after"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return after if type(after) is int else None
+
+def parse_ids(ids: List[str]) -> Optional[List[int]]:
+    """Acepta `ids` repetido o separado por comas, sin duplicados; None si alguno no es entero."""
+    try:
+        values = [int(value) for item in ids for value in item.split(",") if value.strip()]
+    except ValueError:
+        return None
+    return list(dict.fromkeys(values)) or None
+
+@router.get(
+    "",
+    response_model=PersonPage,
+    summary="Listar individuos paginados",
+    description=(
+        "Retorna individuos ordenados por id, de a `limit` por página, con los filtros dados. "
+        "Para seguir, se envía `cursor` con el `next_cursor` de la respuesta anterior. "
+        "Con `ids` se buscan esos individuos en una sola consulta"
+    ),
+    responses={
+        200: {
+            "description": "Página obtenida exitosamente",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "items": [{"id": 1024, "species": "HU", "strata": "0", "gender": "F", "age": 31}],
+                        "next_cursor": "eyJhZnRlciI6IDEwMjR9",
+                    }
+                }
+            }
+        },
+        400: {
+            "description": "Parámetros, cursor o ids inválidos",
+            "content": {
+                "application/problem+json": {
+                    "example": not_found["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        500: {
+            "description": "Error interno no manejado",
+            "content": {
+                "application/problem+json": {
+                    "example": internal_error["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        501: {
+            "description": "El backend de almacenamiento no tiene SQL (STORAGE_BACKEND=columnar)",
+            "content": {
+                "application/problem+json": {
+                    "example": not_implemented["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        504: {
+            "description": "La consulta excedió el plazo de la petición",
+            "content": {
+                "application/problem+json": {
+                    "example": gateway_timeout["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+    },
+)
+async def list_persons(
+    limit: int = Query(
+        min(settings.persons_page_size, settings.persons_max_page_size),
+        ge=1,
+        le=settings.persons_max_page_size,
+        description="Individuos por página",
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    ids: List[str] = Query([], description="Ids a buscar; se puede repetir o separar por comas", example=["1", "2"]),
+    speciesCode: Optional[str] = Query(None, alias="speciesCode", description="Código de especie", example="HU"),
+    strataCode:  Optional[str] = Query(None, alias="strataCode",  description="Código de estrato", example=0),
+    genderCode:  Optional[str] = Query(None, alias="genderCode",  description="Código de género", example="F"),
+):
+    """
+    Paginación por keyset sobre `pk` (WHERE pk > último ORDER BY pk LIMIT n):
+    cada página cuesta lo mismo sin importar cuán profundo se haya llegado.
+    Se pide una fila de más para saber si hay página siguiente.
+    """
+    if not db.supports_sql:
+        # El snapshot columnar no guarda `pk`: no hay ids ni cursores que entregar
+        return problem_response(status.HTTP_501_NOT_IMPLEMENTED, not_implemented)
+    after = None
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        if after is None:
+            return problem_response(status.HTTP_400_BAD_REQUEST)
+    wanted = None
+    if ids:
+        wanted = parse_ids(ids)
+        if wanted is None or len(wanted) > settings.persons_max_page_size:
+            return problem_response(status.HTTP_400_BAD_REQUEST)
+
+    try:
+        pks = await resolve_pks(speciesCode, strataCode, genderCode)
+        if pks is None:
+            return problem_response(status.HTTP_400_BAD_REQUEST)
+        pool = db.get_read_connection()
+        args: list = []
+        conditions = pk_conditions(pks, args)
+
+        if wanted is not None:
+            items = await get_by_ids(pool, TABLE, wanted, key=KEY, columns=LIST_COLUMNS, conditions=conditions, args=args)
+            return {"items": items, "next_cursor": None}
+
+        rows = await get_page(
+            pool, TABLE, limit + 1, after, key=KEY, columns=LIST_COLUMNS, conditions=conditions, args=args
+        )
+        next_cursor = encode_cursor(rows[limit - 1]["id"]) if len(rows) > limit else None
+        return {"items": rows[:limit], "next_cursor": next_cursor}
+
+    except asyncio.TimeoutError:
+        return problem_response(status.HTTP_504_GATEWAY_TIMEOUT, gateway_timeout)
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
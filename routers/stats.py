@@ -1,11 +1,23 @@
 # routers/stats.py
 
-from fastapi import APIRouter, status, Query
-from fastapi.responses import JSONResponse
-from typing import Optional
+import asyncio
+from fastapi import APIRouter, Body, Header, status, Query
+from typing import Dict, List, Optional, Tuple
+from config import settings
 from database import db
-from models.schemas import CountStat, AgeStat
-from utils.errors import not_found, internal_error
+from engine.columnar import snapshot
+from engine.cube import Cell, cube
+from engine.dimensions import registry
+from engine.partitioned import aggregate_snapshot, aggregate_sql
+from engine.histogram import distribution
+from models.schemas import CountStat, AgeStat, AgeDistribution, BatchItem, BatchResult, CountGroup, AgeGroup
+from queries import (
+    age_by_query, age_histogram_query, age_query, batch_query, count_by_query, count_query,
+)
+from utils.coalesce import stats_flight
+from utils.errors import not_found, internal_error, gateway_timeout, problem_response
+from utils.formats import ARROW, JSON, MSGPACK, arrow_response, msgpack_response, negotiate
+from utils.responses import fast_response
 
 router = APIRouter(
     prefix="/v1/stats",
@@ -14,12 +26,16 @@ router = APIRouter(
 
 async def get_species_pk(code: str) -> Optional[int]:
     """Obtiene el pk de una especie por su código."""
-    pool = db.get_connection()
+    if registry.ready:
+        return registry.species.pk(code)
+    pool = db.get_read_connection()
     return await pool.fetchval("SELECT pk FROM species WHERE code = $1", code)
 
 async def get_strata_pk(code: str) -> Optional[int]:
     """Obtiene el pk de un estrato por su código."""
-    pool = db.get_connection()
+    if registry.ready:
+        return registry.strata.pk(code)
+    pool = db.get_read_connection()
     # Convertir a int si es posible, ya que los códigos de estrato son numéricos
     try:
         code_int = int(code)
@@ -29,9 +45,130 @@ async def get_strata_pk(code: str) -> Optional[int]:
 
 async def get_gender_pk(code: str) -> Optional[int]:
     """Obtiene el pk de un género por su código."""
-    pool = db.get_connection()
+    if registry.ready:
+        return registry.genders.pk(code)
+    pool = db.get_read_connection()
     return await pool.fetchval("SELECT pk FROM genders WHERE code = $1", code)
 
+async def resolve_pks(speciesCode, strataCode, genderCode) -> Optional[Tuple]:
+    """
+    Retorna la tupla (species_pk, strata_pk, gender_pk), con None en los
+    filtros no usados, o None si algún código no existe.
+    """
+    if registry.ready:
+        return registry.resolve(speciesCode, strataCode, genderCode)
+    pks = []
+    for code, resolve in (
+        (speciesCode, get_species_pk),
+        (strataCode, get_strata_pk),
+        (genderCode, get_gender_pk),
+    ):
+        if code is None:
+            pks.append(None)
+            continue
+        pk = await resolve(code)
+        if pk is None:
+            return None
+        pks.append(pk)
+    return tuple(pks)
+
+async def fetch_coalesced(method, sql: str, args: list):
+    """
+    Ejecuta `method(sql, *args)` compartiendo el resultado con las peticiones
+    idénticas que ya estén en curso (la sentencia compilada ya viene normalizada).
+    """
+    if not settings.stats_coalescing:
+        return await method(sql, *args)
+    return await stats_flight.do((method.__name__, sql, tuple(args)), lambda: method(sql, *args))
+
+def memory_engine():
+    """
+    Motor en memoria que debe responder /v1/stats según STATS_ENGINE
+    (snapshot columnar o cubo precalculado), o None para usar SQL.
+    """
+    engine = db.stats_engine
+    if engine == "columnar" and snapshot.ready:
+        return snapshot
+    if engine == "cube" and cube.ready:
+        return cube
+    return None
+
+def age_payload(min_age, max_age, mean, stddev) -> dict:
+    """Redondea a 4 decimales para coincidir con la API del profesor."""
+    return {
+        "min": round(min_age, 4),
+        "max": round(max_age, 4),
+        "mean": round(mean, 4),
+        "stddev": round(stddev, 4) if stddev is not None else 0.0,
+    }
+
+def count_from_memory(engine, speciesCode, strataCode, genderCode):
+    """Versión en memoria de count_stats, con la misma semántica 404/400."""
+    if engine.total == 0:
+        return problem_response(status.HTTP_404_NOT_FOUND)
+    pks = registry.resolve(speciesCode, strataCode, genderCode)
+    if pks is None:
+        return problem_response(status.HTTP_400_BAD_REQUEST)
+    count, total = engine.count(*pks)
+    if count == 0:
+        return problem_response(status.HTTP_404_NOT_FOUND)
+    return {"count": count, "percentage": round(count / total, 6)}
+
+def age_from_memory(engine, speciesCode, strataCode, genderCode):
+    """Versión en memoria de age_stats, con la misma semántica 404/400."""
+    pks = registry.resolve(speciesCode, strataCode, genderCode)
+    if pks is None:
+        return problem_response(status.HTTP_400_BAD_REQUEST)
+    stats = engine.age_stats(*pks)
+    if stats is None:
+        return problem_response(status.HTTP_404_NOT_FOUND)
+    return age_payload(stats["min"], stats["max"], stats["mean"], stats["stddev"])
+
+def partitioned_pks(engine, speciesCode, strataCode, genderCode) -> Optional[Tuple]:
+    """
+    pks a agregar por particiones (STATS_PARTITIONS > 1), o None para seguir el
+    camino de una sola pasada: con el cubo (ya es una búsqueda), sin registro
+    cargado o con algún código inexistente (ese camino distingue 400 de 404).
+    """
+    if settings.stats_partitions <= 1 or engine is cube or not registry.ready:
+        return None
+    return registry.resolve(speciesCode, strataCode, genderCode)
+
+async def partitioned_stats(engine, pks: Tuple) -> Tuple[int, Cell]:
+    """Total de filas y momentos filtrados, agregando los rangos en paralelo (ver engine/partitioned.py)."""
+    partitions = settings.stats_partitions
+    if engine is snapshot:
+        call = lambda: aggregate_snapshot(snapshot, pks, partitions)
+    else:
+        pool = db.get_read_connection()
+        call = lambda: aggregate_sql(pool, pks, partitions)
+    if not settings.stats_coalescing:
+        return await call()
+    return await stats_flight.do(("partitioned", engine is snapshot, pks), call)
+
+async def count_partitioned(engine, pks: Tuple):
+    try:
+        total, cell = await partitioned_stats(engine, pks)
+    except asyncio.TimeoutError:
+        return problem_response(status.HTTP_504_GATEWAY_TIMEOUT, gateway_timeout)
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
+    if total == 0 or cell.count == 0:
+        return problem_response(status.HTTP_404_NOT_FOUND)
+    return fast_response({"count": cell.count, "percentage": round(cell.count / total, 6)})
+
+async def age_partitioned(engine, pks: Tuple):
+    try:
+        _, cell = await partitioned_stats(engine, pks)
+    except asyncio.TimeoutError:
+        return problem_response(status.HTTP_504_GATEWAY_TIMEOUT, gateway_timeout)
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
+    stats = cell.age_stats()
+    if stats is None:
+        return problem_response(status.HTTP_404_NOT_FOUND)
+    return fast_response(age_payload(stats["min"], stats["max"], stats["mean"], stats["stddev"]))
+
 @router.get(
     "/count",
     response_model=CountStat,
@@ -62,6 +199,14 @@ async def get_gender_pk(code: str) -> Optional[int]:
                 }
             }
         },
+        504: {
+            "description": "La consulta excedió el plazo de la petición",
+            "content": {
+                "application/problem+json": {
+                    "example": gateway_timeout["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
     },
 )
 async def count_stats(
@@ -72,84 +217,40 @@ async def count_stats(
     """
     Calcula el conteo total y filtrado de la tabla `persons` usando SQL.
     """
-    pool = db.get_connection()
+    engine = memory_engine()
+    pks = partitioned_pks(engine, speciesCode, strataCode, genderCode)
+    if pks is not None:
+        return await count_partitioned(engine, pks)
     try:
-        # 1) Total global
-        total = await pool.fetchval("SELECT COUNT(*) FROM persons")
+        if engine is not None:
+            return fast_response(count_from_memory(engine, speciesCode, strataCode, genderCode))
+
+        pool = db.get_read_connection()
+        # Una sola sentencia: total global y conteo filtrado juntos. Con un
+        # código inexistente igual se consulta el total (tabla vacía -> 404)
+        pks = await resolve_pks(speciesCode, strataCode, genderCode)
+        sql, args = count_query(pks if pks is not None else (None, None, None))
+        row = await fetch_coalesced(pool.fetchrow, sql, args)
+
+        total = row["total"]
         if total == 0:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content=not_found["content"]["application/problem+json"]["example"],
-                media_type="application/problem+json",
-            )
-
-        # 2) Construir WHERE dinámico con conversión de códigos a IDs
-        conditions = []
-        args = []
-        arg_count = 0
-        
-        if speciesCode is not None:
-            species_pk = await get_species_pk(speciesCode)
-            if species_pk is None:
-                return JSONResponse(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    content=not_found["content"]["application/problem+json"]["example"],
-                    media_type="application/problem+json",
-                )
-            arg_count += 1
-            conditions.append(f"species_fk = ${arg_count}")
-            args.append(species_pk)
-            
-        if strataCode is not None:
-            strata_pk = await get_strata_pk(strataCode)
-            if strata_pk is None:
-                return JSONResponse(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    content=not_found["content"]["application/problem+json"]["example"],
-                    media_type="application/problem+json",
-                )
-            arg_count += 1
-            conditions.append(f"strata_fk = ${arg_count}")
-            args.append(strata_pk)
-            
-        if genderCode is not None:
-            gender_pk = await get_gender_pk(genderCode)
-            if gender_pk is None:
-                return JSONResponse(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    content=not_found["content"]["application/problem+json"]["example"],
-                    media_type="application/problem+json",
-                )
-            arg_count += 1
-            conditions.append(f"gender_fk = ${arg_count}")
-            args.append(gender_pk)
-
-        # 3) Conteo filtrado
-        if conditions:
-            where_clause = " AND ".join(conditions)
-            sql = f"SELECT COUNT(*) FROM persons WHERE {where_clause}"
-            count = await pool.fetchval(sql, *args)
-        else:
-            count = total
+            return problem_response(status.HTTP_404_NOT_FOUND)
+        if pks is None:
+            return problem_response(status.HTTP_400_BAD_REQUEST)
 
+        count = row["count"]
         if count == 0:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content=not_found["content"]["application/problem+json"]["example"],
-                media_type="application/problem+json",
-            )
+            return problem_response(status.HTTP_404_NOT_FOUND)
 
         # Porcentaje como valor entre 0 y 1, redondeado a 6 decimales
         percentage = round(count / total, 6)
 
-        return {"count": count, "percentage": percentage}
+        return fast_response({"count": count, "percentage": percentage})
 
+    except asyncio.TimeoutError:
+        return problem_response(status.HTTP_504_GATEWAY_TIMEOUT, gateway_timeout)
     except Exception:
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content=internal_error["content"]["application/problem+json"]["example"],
-            media_type="application/problem+json",
-        )
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
 
 
 @router.get(
@@ -182,6 +283,14 @@ async def count_stats(
                 }
             }
         },
+        504: {
+            "description": "La consulta excedió el plazo de la petición",
+            "content": {
+                "application/problem+json": {
+                    "example": gateway_timeout["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
     },
 )
 async def age_stats(
@@ -192,83 +301,509 @@ async def age_stats(
     """
     Calcula mínimo, máximo, promedio y desviación estándar de edad directamente en la base de datos.
     """
-    pool = db.get_connection()
+    engine = memory_engine()
+    pks = partitioned_pks(engine, speciesCode, strataCode, genderCode)
+    if pks is not None:
+        return await age_partitioned(engine, pks)
+    try:
+        if engine is not None:
+            return fast_response(age_from_memory(engine, speciesCode, strataCode, genderCode))
+
+        pool = db.get_read_connection()
+        pks = await resolve_pks(speciesCode, strataCode, genderCode)
+        if pks is None:
+            return problem_response(status.HTTP_400_BAD_REQUEST)
+        sql, args = age_query(pks)
+        row = await fetch_coalesced(pool.fetchrow, sql, args)
+
+        if row["min"] is None:
+            return problem_response(status.HTTP_404_NOT_FOUND)
+
+        return fast_response(age_payload(row["min"], row["max"], row["mean"], row["stddev"]))
+
+    except asyncio.TimeoutError:
+        return problem_response(status.HTTP_504_GATEWAY_TIMEOUT, gateway_timeout)
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
+
+# -------------------- DESGLOSES --------------------
+
+# Dimensión de agrupación -> (columna fk, tabla de dimensión)
+DIMENSIONS = {
+    "species": ("species_fk", "species"),
+    "strata": ("strata_fk", "strata"),
+    "gender": ("gender_fk", "genders"),
+}
+DIMENSION_NAMES = tuple(DIMENSIONS)
+
+def parse_dimensions(by: List[str]) -> Optional[List[str]]:
+    """Acepta `by` repetido o separado por comas; None si hay dimensiones inválidas o repetidas."""
+    dims = [name.strip() for value in by for name in value.split(",") if name.strip()]
+    if not dims or len(set(dims)) != len(dims) or any(name not in DIMENSIONS for name in dims):
+        return None
+    return dims
+
+def group_codes(dims: List[str], fks) -> Dict[str, Optional[str]]:
+    """Traduce los pks de un grupo a códigos usando el registro de dimensiones."""
+    group = {}
+    for name, pk in zip(dims, fks):
+        code = registry.get(DIMENSIONS[name][1]).codes.get(pk)
+        group[name] = str(code) if code is not None else None
+    return group
+
+# Métricas de cada desglose como columnas Arrow, en el orden de CountGroup y AgeGroup
+COUNT_FIELDS = (("count", "int"), ("percentage", "float"))
+AGE_FIELDS = (("min", "float"), ("max", "float"), ("mean", "float"), ("stddev", "float"))
+
+# Formatos binarios de los desgloses, según la cabecera Accept
+BINARY_CONTENT = {
+    ARROW: {"schema": {"type": "string", "format": "binary"}},
+    MSGPACK: {"schema": {"type": "string", "format": "binary"}},
+}
+
+def grouped_response(results: List[dict], dims: List[str], metrics, accept: Optional[str]):
+    """
+    Desglose en el formato pedido por Accept: JSON (por defecto), MessagePack
+    con la misma estructura o Arrow IPC como tabla plana, con una columna por
+    dimensión agrupada y una por métrica.
+    """
+    media_type = negotiate(accept, (JSON, ARROW, MSGPACK))
+    if media_type == ARROW:
+        fields = [(name, "str") for name in dims] + list(metrics)
+        rows = [
+            [result["group"][name] for name in dims] + [result[metric] for metric, _ in metrics]
+            for result in results
+        ]
+        return arrow_response(fields, rows)
+    if media_type == MSGPACK:
+        return msgpack_response(results)
+    return fast_response(results)
+
+BY_QUERY = Query(
+    ...,
+    description="Dimensiones de agrupación (species, strata, gender); se puede repetir o separar por comas",
+    example=["species", "gender"],
+)
+
+@router.get(
+    "/count/by",
+    response_model=list[CountGroup],
+    summary="Obtener conteos desglosados por dimensión",
+    description=(
+        "Retorna la cantidad y porcentaje de individuos de cada grupo de las dimensiones "
+        "indicadas (p. ej. species × gender), aplicando los filtros dados"
+    ),
+    responses={
+        200: {
+            "description": "Desglose de conteo obtenido exitosamente",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {"group": {"species": "HU", "gender": "F"}, "count": 9192, "percentage": 0.009192},
+                        {"group": {"species": "HU", "gender": "M"}, "count": 9011, "percentage": 0.009011},
+                    ]
+                },
+                **BINARY_CONTENT,
+            }
+        },
+        404: {
+            "description": "No hay datos disponibles para los filtros proporcionados",
+            "content": {
+                "application/problem+json": {
+                    "example": not_found["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        400: {
+            "description": "Parámetros inválidos",
+            "content": {
+                "application/problem+json": {
+                    "example": not_found["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        504: {
+            "description": "La consulta excedió el plazo de la petición",
+            "content": {
+                "application/problem+json": {
+                    "example": gateway_timeout["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+    },
+)
+async def count_by_stats(
+    by: List[str] = BY_QUERY,
+    speciesCode: Optional[str] = Query(None, alias="speciesCode", description="Código de especie", example="HU"),
+    strataCode:  Optional[str] = Query(None, alias="strataCode",  description="Código de estrato", example=0),
+    genderCode:  Optional[str] = Query(None, alias="genderCode",  description="Código de género", example="F"),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    Conteo por grupo con una sola consulta GROUP BY sobre `persons`
+    (o desde el motor en memoria si está activo).
+    """
+    dims = parse_dimensions(by)
+    if dims is None:
+        return problem_response(status.HTTP_400_BAD_REQUEST)
+    try:
+        pks = await resolve_pks(speciesCode, strataCode, genderCode)
+        engine = memory_engine()
+
+        if engine is not None:
+            total = engine.total
+            positions = [DIMENSION_NAMES.index(name) for name in dims]
+            groups = []
+            if pks is not None:
+                for key, cell in engine.breakdown(positions, pks):
+                    groups.append(([key[p] for p in positions], cell.count))
+        else:
+            groups, total = [], 0
+            if pks is not None:
+                sql, args = count_by_query([DIMENSIONS[name][0] for name in dims], pks)
+                rows = await fetch_coalesced(db.get_read_connection().fetch, sql, args)
+                for row in rows:
+                    if row["grouping"]:
+                        total = row["total"]
+                    elif row["count"]:
+                        groups.append(([row[DIMENSIONS[name][0]] for name in dims], row["count"]))
+            else:
+                total = await db.get_read_connection().fetchval("SELECT COUNT(*) FROM persons")
+
+        # Misma precedencia que count_stats: sin datos (404), código inválido (400), grupo vacío (404)
+        if total == 0:
+            return problem_response(status.HTTP_404_NOT_FOUND)
+        if pks is None:
+            return problem_response(status.HTTP_400_BAD_REQUEST)
+        if not groups:
+            return problem_response(status.HTTP_404_NOT_FOUND)
+        # Mismo orden de campos que CountGroup, por si la respuesta no pasa por response_model
+        return grouped_response([
+            {"count": count, "percentage": round(count / total, 6), "group": group_codes(dims, fks)}
+            for fks, count in groups
+        ], dims, COUNT_FIELDS, accept)
+
+    except asyncio.TimeoutError:
+        return problem_response(status.HTTP_504_GATEWAY_TIMEOUT, gateway_timeout)
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
+
+
+@router.get(
+    "/age/by",
+    response_model=list[AgeGroup],
+    summary="Obtener estadísticas de edad desglosadas por dimensión",
+    description=(
+        "Retorna mínimo, máximo, promedio y desviación estándar de edad de cada grupo "
+        "de las dimensiones indicadas, aplicando los filtros dados"
+    ),
+    responses={
+        200: {
+            "description": "Desglose de edad obtenido exitosamente",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {"group": {"species": "HU"}, "min": 18.0, "max": 99.0, "mean": 45.35, "stddev": 12.75},
+                        {"group": {"species": "EL"}, "min": 20.0, "max": 870.0, "mean": 402.1, "stddev": 210.4},
+                    ]
+                },
+                **BINARY_CONTENT,
+            }
+        },
+        404: {
+            "description": "No hay datos disponibles para los filtros proporcionados",
+            "content": {
+                "application/problem+json": {
+                    "example": not_found["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        400: {
+            "description": "Parámetros inválidos",
+            "content": {
+                "application/problem+json": {
+                    "example": not_found["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        504: {
+            "description": "La consulta excedió el plazo de la petición",
+            "content": {
+                "application/problem+json": {
+                    "example": gateway_timeout["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+    },
+)
+async def age_by_stats(
+    by: List[str] = BY_QUERY,
+    speciesCode: Optional[str] = Query(None, alias="speciesCode", description="Código de especie", example="HU"),
+    strataCode:  Optional[str] = Query(None, alias="strataCode",  description="Código de estrato", example=5),
+    genderCode:  Optional[str] = Query(None, alias="genderCode",  description="Código de género", example="M"),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+):
+    """
+    Estadísticas de edad por grupo con una sola consulta GROUP BY sobre
+    `persons` (o desde el motor en memoria si está activo).
+    """
+    dims = parse_dimensions(by)
+    if dims is None:
+        return problem_response(status.HTTP_400_BAD_REQUEST)
     try:
-        # Construir SELECT dinámico con conversión de códigos a IDs
-        base_sql = (
-            "SELECT "
-            "MIN(date_part('year', age(birthdate)))::float AS min, "
-            "MAX(date_part('year', age(birthdate)))::float AS max, "
-            "AVG(date_part('year', age(birthdate)))::float AS mean, "
-            "STDDEV(date_part('year', age(birthdate)))::float AS stddev "
-            "FROM persons"
-        )
-
-        conditions = []
-        args = []
-        arg_count = 0
-        
-        if speciesCode is not None:
-            species_pk = await get_species_pk(speciesCode)
-            if species_pk is None:
-                return JSONResponse(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    content=not_found["content"]["application/problem+json"]["example"],
-                    media_type="application/problem+json",
-                )
-            arg_count += 1
-            conditions.append(f"species_fk = ${arg_count}")
-            args.append(species_pk)
-            
-        if strataCode is not None:
-            strata_pk = await get_strata_pk(strataCode)
-            if strata_pk is None:
-                return JSONResponse(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    content=not_found["content"]["application/problem+json"]["example"],
-                    media_type="application/problem+json",
-                )
-            arg_count += 1
-            conditions.append(f"strata_fk = ${arg_count}")
-            args.append(strata_pk)
-            
-        if genderCode is not None:
-            gender_pk = await get_gender_pk(genderCode)
-            if gender_pk is None:
-                return JSONResponse(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    content=not_found["content"]["application/problem+json"]["example"],
-                    media_type="application/problem+json",
-                )
-            arg_count += 1
-            conditions.append(f"gender_fk = ${arg_count}")
-            args.append(gender_pk)
-
-        if conditions:
-            where_clause = " AND ".join(conditions)
-            sql = f"{base_sql} WHERE {where_clause}"
-            row = await pool.fetchrow(sql, *args)
+        pks = await resolve_pks(speciesCode, strataCode, genderCode)
+        if pks is None:
+            return problem_response(status.HTTP_400_BAD_REQUEST)
+
+        groups = []
+        engine = memory_engine()
+        if engine is not None:
+            positions = [DIMENSION_NAMES.index(name) for name in dims]
+            for key, cell in engine.breakdown(positions, pks):
+                stats = cell.age_stats()
+                if stats is not None:
+                    groups.append(([key[p] for p in positions], stats))
         else:
-            row = await pool.fetchrow(base_sql)
-
-        if not row or row["min"] is None:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content=not_found["content"]["application/problem+json"]["example"],
-                media_type="application/problem+json",
-            )
-
-        # Redondeamos a 4 decimales para coincidir con la API del profesor
-        return {
-            "min": round(row["min"], 4),
-            "max": round(row["max"], 4),
-            "mean": round(row["mean"], 4),
-            "stddev": round(row["stddev"], 4) if row["stddev"] is not None else 0.0,
-        }
+            sql, args = age_by_query([DIMENSIONS[name][0] for name in dims], pks)
+            rows = await fetch_coalesced(db.get_read_connection().fetch, sql, args)
+            for row in rows:
+                if row["min"] is not None:
+                    groups.append(([row[DIMENSIONS[name][0]] for name in dims], row))
+
+        if not groups:
+            return problem_response(status.HTTP_404_NOT_FOUND)
+        return grouped_response([
+            {**age_payload(stats["min"], stats["max"], stats["mean"], stats["stddev"]), "group": group_codes(dims, fks)}
+            for fks, stats in groups
+        ], dims, AGE_FIELDS, accept)
+
+    except asyncio.TimeoutError:
+        return problem_response(status.HTTP_504_GATEWAY_TIMEOUT, gateway_timeout)
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
+
+
+# -------------------- DISTRIBUCIÓN --------------------
+
+DEFAULT_QUANTILES = ["0.25", "0.5", "0.75", "0.9", "0.99"]
+MAX_QUANTILES = 20
+
+def parse_quantiles(values: List[str]) -> Optional[List[float]]:
+    """Acepta `q` repetido o separado por comas; None si algún valor no está entre 0 y 1."""
+    try:
+        qs = [float(q) for value in values for q in value.split(",") if q.strip()]
+    except ValueError:
+        return None
+    if not qs or len(qs) > MAX_QUANTILES or any(not 0.0 <= q <= 1.0 for q in qs):
+        return None
+    return qs
+
+async def age_histogram(pks: Tuple) -> Dict[int, int]:
+    """
+    Histograma edad -> filas para los filtros: del cubo (histogramas ya
+    combinados en cada celda, sin recorrer filas), del snapshot columnar o,
+    si no hay motor en memoria, con un GROUP BY edad en la BD.
+    """
+    engine = memory_engine()
+    if engine is not None:
+        histogram = engine.age_histogram(*pks)
+        if histogram is not None:
+            return histogram
+    if snapshot.ready:
+        return snapshot.age_histogram(*pks)
+    sql, args = age_histogram_query(pks)
+    rows = await fetch_coalesced(db.get_read_connection().fetch, sql, args)
+    return {row["age"]: row["count"] for row in rows}
+
+@router.get(
+    "/age/distribution",
+    response_model=AgeDistribution,
+    summary="Obtener la distribución de edad",
+    description=(
+        "Retorna el histograma de edad por intervalos de `bucket` años y los cuantiles "
+        "pedidos en `q` (p. ej. la mediana con q=0.5) para los filtros dados"
+    ),
+    responses={
+        200: {
+            "description": "Distribución de edad obtenida exitosamente",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "count": 9192,
+                        "min": 18.0,
+                        "max": 99.0,
+                        "buckets": [{"lower": 10, "upper": 20, "count": 310}, {"lower": 20, "upper": 30, "count": 1420}],
+                        "quantiles": [{"q": 0.5, "value": 41.0}, {"q": 0.9, "value": 72.0}],
+                    }
+                }
+            }
+        },
+        404: {
+            "description": "No hay datos disponibles para los filtros proporcionados",
+            "content": {
+                "application/problem+json": {
+                    "example": not_found["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        400: {
+            "description": "Parámetros inválidos",
+            "content": {
+                "application/problem+json": {
+                    "example": not_found["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        504: {
+            "description": "La consulta excedió el plazo de la petición",
+            "content": {
+                "application/problem+json": {
+                    "example": gateway_timeout["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+    },
+)
+async def age_distribution_stats(
+    speciesCode: Optional[str] = Query(None, alias="speciesCode", description="Código de especie", example="HU"),
+    strataCode:  Optional[str] = Query(None, alias="strataCode",  description="Código de estrato", example=5),
+    genderCode:  Optional[str] = Query(None, alias="genderCode",  description="Código de género", example="M"),
+    bucket: int = Query(10, ge=1, le=1000, description="Ancho de los intervalos del histograma, en años"),
+    q: List[str] = Query(
+        DEFAULT_QUANTILES,
+        description="Cuantiles entre 0 y 1; se puede repetir o separar por comas",
+        example=["0.5", "0.9"],
+    ),
+):
+    """
+    Histograma y cuantiles exactos de la edad, calculados desde un histograma
+    edad -> filas (a lo más unas miles de entradas) en vez de traer las filas.
+    """
+    qs = parse_quantiles(q)
+    if qs is None:
+        return problem_response(status.HTTP_400_BAD_REQUEST)
+    try:
+        pks = await resolve_pks(speciesCode, strataCode, genderCode)
+        if pks is None:
+            return problem_response(status.HTTP_400_BAD_REQUEST)
+
+        result = distribution(await age_histogram(pks), bucket, qs)
+        if result is None:
+            return problem_response(status.HTTP_404_NOT_FOUND)
+        return fast_response(result)
+
+    except asyncio.TimeoutError:
+        return problem_response(status.HTTP_504_GATEWAY_TIMEOUT, gateway_timeout)
+    except Exception:
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
+
+
+# -------------------- LOTES --------------------
+
+def batch_error(status_code: int) -> dict:
+    example = not_found["content"]["application/problem+json"]["example"]
+    return {"status": status_code, "error": {**example, "status": status_code}}
+
+def batch_result(item: BatchItem, pks: Optional[Tuple], total: int, count: int, age: Optional[dict]) -> dict:
+    """Aplica a un elemento del lote la misma semántica 404/400 que los endpoints individuales."""
+    if "count" in item.metrics and total == 0:
+        return batch_error(status.HTTP_404_NOT_FOUND)
+    if pks is None:
+        return batch_error(status.HTTP_400_BAD_REQUEST)
+    result = {"status": status.HTTP_200_OK}
+    if "count" in item.metrics:
+        if count == 0:
+            return batch_error(status.HTTP_404_NOT_FOUND)
+        result["count"] = {"count": count, "percentage": round(count / total, 6)}
+    if "age" in item.metrics:
+        if age is None:
+            return batch_error(status.HTTP_404_NOT_FOUND)
+        result["age"] = age_payload(age["min"], age["max"], age["mean"], age["stddev"])
+    return result
+
+@router.post(
+    "/batch",
+    response_model=list[BatchResult],
+    summary="Obtener varias estadísticas en una sola petición",
+    description=(
+        "Evalúa una lista de combinaciones de filtros en una sola pasada sobre `persons` "
+        "y retorna los resultados en el mismo orden, cada uno con su propio estado"
+    ),
+    responses={
+        200: {
+            "description": "Lote evaluado; revisar `status` de cada elemento",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {"status": 200, "count": {"count": 9192, "percentage": 0.009192},
+                         "age": {"min": 18.0, "max": 99.0, "mean": 45.35, "stddev": 12.75}},
+                        {"status": 400, "error": not_found["content"]["application/problem+json"]["example"]},
+                    ]
+                }
+            }
+        },
+        400: {
+            "description": "Lote vacío o con demasiados elementos",
+            "content": {
+                "application/problem+json": {
+                    "example": not_found["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        500: {
+            "description": "Error interno no manejado",
+            "content": {
+                "application/problem+json": {
+                    "example": internal_error["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+        504: {
+            "description": "La consulta excedió el plazo de la petición",
+            "content": {
+                "application/problem+json": {
+                    "example": gateway_timeout["content"]["application/problem+json"]["example"]
+                }
+            }
+        },
+    },
+)
+async def batch_stats(items: List[BatchItem] = Body(...)):
+    """
+    Calcula count y/o age para cada elemento con una única consulta de
+    agregados condicionales (o desde el motor en memoria si está activo).
+    """
+    if not items or len(items) > settings.batch_max_items:
+        return problem_response(status.HTTP_400_BAD_REQUEST)
+    try:
+        resolved = [await resolve_pks(i.speciesCode, i.strataCode, i.genderCode) for i in items]
+
+        engine = memory_engine()
+        if engine is not None:
+            results = []
+            for item, pks in zip(items, resolved):
+                count, total = engine.count(*pks) if pks is not None else (0, engine.total)
+                age = engine.age_stats(*pks) if pks is not None else None
+                results.append(batch_result(item, pks, total, count, age))
+            return results
+
+        combos = list(dict.fromkeys(pks for pks in resolved if pks is not None))
+        sql, args = batch_query(combos)
+        row = await db.get_read_connection().fetchrow(sql, *args)
+        index = {pks: i for i, pks in enumerate(combos)}
+
+        results = []
+        for item, pks in zip(items, resolved):
+            count, age = 0, None
+            if pks is not None:
+                i = index[pks]
+                count = row[f"count_{i}"]
+                if row[f"min_{i}"] is not None:
+                    age = {key: row[f"{key}_{i}"] for key in ("min", "max", "mean", "stddev")}
+            results.append(batch_result(item, pks, row["total"], count, age))
+        return results
 
+    except asyncio.TimeoutError:
+        return problem_response(status.HTTP_504_GATEWAY_TIMEOUT, gateway_timeout)
     except Exception:
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content=internal_error["content"]["application/problem+json"]["example"],
-            media_type="application/problem+json",
-        )
+        return problem_response(status.HTTP_500_INTERNAL_SERVER_ERROR, internal_error)
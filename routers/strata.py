@@ -2,9 +2,12 @@
 
 from fastapi import APIRouter, status
 from fastapi.responses import JSONResponse
+from config import settings
 from database import db
+from engine.dimensions import registry
 from models.schemas import CodeInfo
 from utils.errors import not_found, internal_error
+from utils.responses import EncodedJSONResponse
 
 router = APIRouter(
     prefix="/v1/info",
@@ -52,7 +55,20 @@ async def list_strata():
     Retorna la lista de estratos sociales (code, name) desde la tabla `strata`.
     Si no hay filas, devuelve 404; ante errores internos, devuelve 500.
     """
-    conn = db.get_connection()
+    if registry.ready:
+        # Servido desde el registro de dimensiones en memoria
+        dimension = registry.get(TABLE)
+        if not dimension.items:
+            return JSONResponse(
+                status_code=status.HTTP_404_NOT_FOUND,
+                content=not_found["content"]["application/problem+json"]["example"],
+                media_type="application/problem+json",
+            )
+        if settings.fast_responses:
+            return EncodedJSONResponse(dimension.body)
+        return dimension.items
+
+    conn = db.get_read_connection()
     try:
         rows = await conn.fetch(f"SELECT code, name FROM {TABLE} ORDER BY code")
         if not rows:
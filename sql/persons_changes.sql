@@ -0,0 +1,32 @@
+-- sql/persons_changes.sql
+--
+-- Notifica cada cambio de `persons` en el canal `persons_changes`, para que la
+-- API actualice sus agregados en memoria sin releer la tabla (CHANGE_FEED=listen,
+-- ver engine/changes.py). El payload lleva solo las columnas que usan los agregados.
+
+CREATE OR REPLACE FUNCTION notify_persons_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('persons_changes', json_build_object(
+        'op', TG_OP,
+        'old', CASE WHEN TG_OP IN ('UPDATE', 'DELETE') THEN json_build_object(
+            'species_fk', OLD.species_fk,
+            'strata_fk', OLD.strata_fk,
+            'gender_fk', OLD.gender_fk,
+            'birthdate', OLD.birthdate
+        ) END,
+        'new', CASE WHEN TG_OP IN ('INSERT', 'UPDATE') THEN json_build_object(
+            'species_fk', NEW.species_fk,
+            'strata_fk', NEW.strata_fk,
+            'gender_fk', NEW.gender_fk,
+            'birthdate', NEW.birthdate
+        ) END
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS persons_changes ON persons;
+
+CREATE TRIGGER persons_changes
+    AFTER INSERT OR UPDATE OF species_fk, strata_fk, gender_fk, birthdate OR DELETE ON persons
+    FOR EACH ROW EXECUTE FUNCTION notify_persons_change();
@@ -0,0 +1,137 @@
+# tests/fakes.py
+
+import asyncio
+import datetime
+from typing import Any, Callable, List, Optional
+from engine.changes import DRIFT_QUERY
+from engine.cube import CUBE_QUERY
+
+
+class FakeConnection:
+    """Conexión con la interfaz de asyncpg que usa InstrumentedPool; responde con `pool.handler`."""
+
+    def __init__(self, pool: "FakePool"):
+        self.pool = pool
+
+    async def _run(self, query: str, args: tuple, timeout: Optional[float]):
+        self.pool.queries.append(query)
+        return await self.pool.handler(query, args, timeout)
+
+    async def fetch(self, query, *args, timeout=None):
+        return await self._run(query, args, timeout)
+
+    async def fetchrow(self, query, *args, timeout=None):
+        return await self._run(query, args, timeout)
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        return await self._run(query, args, timeout)
+
+    async def execute(self, query, *args, timeout=None):
+        return await self._run(query, args, timeout)
+
+
+class FakePool:
+    """
+    asyncpg.Pool en memoria. `handler(query, args, timeout)` decide la
+    respuesta de cada consulta (puede demorar o lanzar); `acquire_error` hace
+    fallar la obtención de conexiones. Registra consultas y conexiones en uso.
+    """
+
+    def __init__(self, name: str = "pool", handler: Optional[Callable] = None, max_size: int = 4):
+        self.name = name
+        self.handler = handler or self.answer
+        self.acquire_error: Optional[BaseException] = None
+        self.queries: List[str] = []
+        self.in_use = 0
+        self.max_size = max_size
+
+    async def answer(self, query: str, args: tuple, timeout: Optional[float]) -> Any:
+        return self.name
+
+    async def acquire(self, timeout: Optional[float] = None) -> FakeConnection:
+        if self.acquire_error is not None:
+            raise self.acquire_error
+        self.in_use += 1
+        return FakeConnection(self)
+
+    async def release(self, conn: FakeConnection) -> None:
+        self.in_use -= 1
+
+    def get_size(self) -> int:
+        return self.in_use
+
+    def get_idle_size(self) -> int:
+        return 0
+
+    def get_min_size(self) -> int:
+        return 0
+
+    def get_max_size(self) -> int:
+        return self.max_size
+
+    async def close(self) -> None:
+        pass
+
+
+def raising(exc: BaseException) -> Callable:
+    """Handler de FakePool que lanza `exc` en cada consulta."""
+    async def handler(query, args, timeout):
+        raise exc
+    return handler
+
+
+def sleeping(seconds: float, result: Any = None) -> Callable:
+    """Handler de FakePool que tarda `seconds` (lo corta el timeout, como asyncpg)."""
+    async def handler(query, args, timeout):
+        await asyncio.wait_for(asyncio.sleep(seconds), timeout)
+        return result
+    return handler
+
+
+class FakePersons:
+    """
+    Tabla `persons` en memoria que responde las consultas del cubo, del feed
+    de cambios y del arranque en caliente. Cada fila es
+    (pk, species_fk, strata_fk, gender_fk, edad), con None = NULL.
+    """
+
+    def __init__(self, rows: List[tuple]):
+        self.rows = list(rows)
+
+    def update(self, pk: int, **values) -> None:
+        columns = ("pk", "species_fk", "strata_fk", "gender_fk", "age")
+        for i, row in enumerate(self.rows):
+            if row[0] == pk:
+                self.rows[i] = tuple(values.get(name, value) for name, value in zip(columns, row))
+
+    def _groups(self) -> dict:
+        groups = {}
+        for _, species, strata, gender, age in self.rows:
+            groups.setdefault((species, strata, gender), []).append(age)
+        return groups
+
+    async def handler(self, query: str, args: tuple, timeout: Optional[float]) -> Any:
+        if query == CUBE_QUERY:
+            counts = {}
+            for _, species, strata, gender, age in self.rows:
+                key = (species, strata, gender, age)
+                counts[key] = counts.get(key, 0) + 1
+            return [
+                {"species_fk": s, "strata_fk": t, "gender_fk": g, "age": a, "count": c}
+                for (s, t, g, a), c in counts.items()
+            ]
+        if query == DRIFT_QUERY:
+            return [
+                {
+                    "species_fk": s, "strata_fk": t, "gender_fk": g, "count": len(ages),
+                    "n": sum(age is not None for age in ages), "sum": sum(age for age in ages if age is not None),
+                }
+                for (s, t, g), ages in self._groups().items()
+            ]
+        if query == "SELECT current_date":
+            return datetime.date.today()
+        if query == "SELECT COUNT(*) FROM persons":
+            return len(self.rows)
+        if query == "SELECT COALESCE(MAX(pk), 0) FROM persons":
+            return max((row[0] for row in self.rows), default=0)
+        raise AssertionError(f"consulta inesperada: {query}")
@@ -0,0 +1,78 @@
+# tests/test_admission.py
+
+import asyncio
+from utils.admission import AdmissionMiddleware, Gate, parse_limits
+
+
+def test_parse_limits_longest_prefix_first():
+    assert parse_limits({"/v1": "8", "/v1/stats": "2:4"}) == [("/v1/stats", 2, 4), ("/v1", 8, 0)]
+
+
+def test_gate_queues_then_sheds():
+    gate = Gate("/v1/stats", limit=1, queue=1, timeout=1.0)
+
+    async def run():
+        assert await gate.acquire()
+        queued = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        # Cola llena: se rechaza sin esperar
+        assert await gate.acquire() is False
+        gate.release()
+        assert await queued
+        gate.release()
+
+    asyncio.run(run())
+    assert gate.stats() == {"limit": 1, "active": 0, "waiting": 0, "admitted": 2, "shed": 1}
+
+
+def test_queue_timeout_sheds():
+    gate = Gate("/v1/stats", limit=1, queue=1, timeout=0.01)
+
+    async def run():
+        assert await gate.acquire()
+        assert await gate.acquire() is False
+
+    asyncio.run(run())
+    assert gate.shed == 1
+
+
+def test_cancelled_waiter_hands_slot_to_next():
+    gate = Gate("/v1/stats", limit=1, queue=2, timeout=1.0)
+
+    async def run():
+        assert await gate.acquire()
+        first = asyncio.ensure_future(gate.acquire())
+        second = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        first.cancel()
+        gate.release()
+        assert await second
+        gate.release()
+
+    asyncio.run(run())
+    assert gate.active == 0
+
+
+def test_middleware_rejects_with_503_and_retry_after():
+    gate = Gate("/v1/stats", limit=0, queue=0, timeout=1.0)
+    called = []
+
+    async def app(scope, receive, send):
+        called.append(scope["path"])
+
+    middleware = AdmissionMiddleware(app, [gate], retry_after=2.5)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        scope = {"type": "http", "method": "GET", "query_string": b"", "headers": []}
+        await middleware({**scope, "path": "/v1/stats/count"}, None, send)
+        # Fuera de los prefijos configurados no hay espera ni rechazo
+        await middleware({**scope, "path": "/v1/info/species"}, None, send)
+
+    asyncio.run(run())
+    assert sent[0]["status"] == 503
+    assert (b"retry-after", b"3") in sent[0]["headers"]
+    assert called == ["/v1/info/species"]
@@ -0,0 +1,73 @@
+# tests/test_cache.py
+
+import asyncio
+from engine.dimensions import DimensionRegistry
+from utils.cache import ResponseCache, ResponseCacheMiddleware
+
+SPECIES = [{"pk": 1, "code": "HU", "name": "Humano"}]
+STRATA = [{"pk": 1, "code": 0, "name": "Bajo"}]
+GENDERS = [{"pk": 1, "code": "F", "name": "Femenino"}]
+
+
+def scope(path: str = "/v1/stats/count") -> dict:
+    return {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+
+
+def app_returning(body: bytes, during=None):
+    async def app(scope, receive, send):
+        if during is not None:
+            during()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+def request(middleware) -> list:
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope(), None, send))
+    return sent
+
+
+def test_response_computed_before_invalidation_is_sent_but_not_stored():
+    cache = ResponseCache(10, 30)
+    # Los datos se recargan mientras el handler calcula la respuesta
+    middleware = ResponseCacheMiddleware(
+        app_returning(b"vieja", during=lambda: cache.invalidate("/v1/stats")), cache, ("/v1/stats",)
+    )
+
+    assert request(middleware)[-1]["body"] == b"vieja"
+    assert len(cache._entries) == 0
+
+    middleware.app = app_returning(b"nueva")
+    request(middleware)
+    middleware.app = app_returning(b"no se llama")
+    assert request(middleware)[-1]["body"] == b"nueva"
+
+
+def test_explicit_put_from_old_generation_is_dropped():
+    cache = ResponseCache(10, 30)
+    generation = cache.generation
+    cache.invalidate()
+
+    cache.put("/v1/stats/count", 200, [], b"{}", generation)
+    assert cache.get("/v1/stats/count") is None
+    cache.put("/v1/stats/count", 200, [], b"{}", cache.generation)
+    assert cache.get("/v1/stats/count") is not None
+
+
+def test_dimension_refresh_only_notifies_on_changes():
+    registry = DimensionRegistry()
+    calls = []
+    registry.listeners.append(lambda: calls.append(1))
+
+    registry.set_rows(SPECIES, STRATA, GENDERS)
+    assert len(calls) == 1
+    # Refresco periódico sin cambios (filas nuevas, mismos valores)
+    registry.set_rows([dict(row) for row in SPECIES], list(STRATA), list(GENDERS))
+    assert len(calls) == 1
+    registry.set_rows([{"pk": 1, "code": "HU", "name": "Humana"}], STRATA, GENDERS)
+    assert len(calls) == 2
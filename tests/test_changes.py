@@ -0,0 +1,48 @@
+# tests/test_changes.py
+
+import asyncio
+from backends.postgres import InstrumentedPool
+from engine.changes import ChangeFeed
+from engine.cube import AggregateCube
+from tests.fakes import FakePersons, FakePool
+
+ROWS = [
+    (1, 1, 1, 1, 20),
+    (2, 1, 2, 1, 30),
+    (3, 2, 1, 2, 40),
+    (4, None, 1, 1, None),
+]
+
+
+def loaded_feed(persons: FakePersons):
+    pool = InstrumentedPool(FakePool(handler=persons.handler))
+    feed = ChangeFeed(AggregateCube())
+    feed.mode = "poll"
+
+    async def load():
+        await feed.cube.load(pool)
+        feed.day = await pool.fetchval("SELECT current_date")
+
+    asyncio.run(load())
+    return feed, pool
+
+
+def test_no_drift_keeps_cube():
+    persons = FakePersons(ROWS)
+    feed, pool = loaded_feed(persons)
+
+    assert asyncio.run(feed.check_drift(pool)) is False
+    assert feed.rebuilds == 0
+
+
+def test_update_moving_row_between_cells_is_drift():
+    persons = FakePersons(ROWS)
+    feed, pool = loaded_feed(persons)
+    # Mismo count, n y Σedad en la raíz: solo cambian dos celdas finas
+    persons.update(1, species_fk=2)
+
+    assert asyncio.run(feed.check_drift(pool)) is True
+    assert feed.rebuilds == 1
+    assert feed.cube.count(1, None, None)[0] == 1
+    assert feed.cube.count(2, None, None)[0] == 2
+    assert asyncio.run(feed.check_drift(pool)) is False
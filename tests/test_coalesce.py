@@ -0,0 +1,60 @@
+# tests/test_coalesce.py
+
+import asyncio
+from utils.coalesce import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def run():
+        return await asyncio.gather(*(flight.do("clave", compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == [42] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"hits": 4, "misses": 1, "in_flight": 0}
+
+
+def test_cancelling_one_caller_keeps_shared_computation():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "fila"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("clave", compute))
+        second = asyncio.ensure_future(flight.do("clave", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "fila"
+
+
+def test_last_caller_leaving_cancels_computation():
+    flight = SingleFlight()
+    state = {}
+
+    async def compute():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def run():
+        caller = asyncio.ensure_future(flight.do("clave", compute))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert state == {"cancelled": True}
+    assert flight.in_flight == 0
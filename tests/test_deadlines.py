@@ -0,0 +1,113 @@
+# tests/test_deadlines.py
+
+import asyncio
+import pytest
+from backends.postgres import InstrumentedPool
+from tests.fakes import FakePool, sleeping
+from utils.deadlines import DeadlineMiddleware, _deadline
+from utils.metrics import http_requests_cancelled
+
+
+def cancelled() -> float:
+    return http_requests_cancelled._values.get(("deadline",), 0.0)
+
+
+def test_query_timeout_under_deadline_counts_as_cancelled():
+    failures = []
+    pool = InstrumentedPool(FakePool(handler=sleeping(1.0)), on_connection_error=lambda: failures.append(1))
+    before = cancelled()
+
+    async def request():
+        # El plazo llega al pool como timeout de la consulta
+        _deadline.set(asyncio.get_running_loop().time() + 0.05)
+        await pool.fetchval("SELECT pg_sleep(1)")
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(request())
+    assert cancelled() == before + 1
+    assert failures == []
+
+
+def test_query_timeout_without_deadline_is_not_counted():
+    failures = []
+    pool = InstrumentedPool(FakePool(handler=sleeping(1.0)), on_connection_error=lambda: failures.append(1))
+    before = cancelled()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(pool.fetchval("SELECT pg_sleep(1)", timeout=0.05))
+    assert cancelled() == before
+    assert failures == []
+
+
+class Client:
+    """Lado del cliente de una petición ASGI: entrega el cuerpo y luego, a pedido, la desconexión."""
+
+    def __init__(self):
+        self.messages = asyncio.Queue()
+        self.messages.put_nowait({"type": "http.request", "body": b"", "more_body": False})
+        self.sent = []
+
+    async def receive(self):
+        return await self.messages.get()
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    def disconnect(self):
+        self.messages.put_nowait({"type": "http.disconnect"})
+
+
+def query_app(pool, outcome):
+    """Aplicación ASGI que lee el cuerpo y responde con una consulta lenta."""
+    async def app(scope, receive, send):
+        assert (await receive())["type"] == "http.request"
+        try:
+            outcome["result"] = await pool.fetchval("SELECT pg_sleep(5)")
+        except asyncio.CancelledError:
+            outcome["cancelled"] = True
+            raise
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+SCOPE = {"type": "http", "method": "GET", "path": "/v1/stats/age", "query_string": b"", "headers": []}
+
+
+def test_disconnect_cancels_query_and_releases_connection():
+    raw = FakePool(handler=sleeping(5.0, "fila"))
+    outcome = {}
+    middleware = DeadlineMiddleware(query_app(InstrumentedPool(raw), outcome), [("/v1/stats", 10.0)])
+    client = Client()
+    before = http_requests_cancelled._values.get(("disconnect",), 0.0)
+
+    async def request():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, client.disconnect)
+        start = loop.time()
+        await middleware(SCOPE, client.receive, client.send)
+        return loop.time() - start
+
+    elapsed = asyncio.run(request())
+    assert elapsed < 1.0
+    assert outcome == {"cancelled": True}
+    assert raw.in_use == 0
+    assert client.sent == []
+    assert http_requests_cancelled._values.get(("disconnect",), 0.0) == before + 1
+
+
+def test_watcher_only_runs_during_queries():
+    raw = FakePool(handler=sleeping(0.01, "fila"))
+    outcome = {}
+    middleware = DeadlineMiddleware(query_app(InstrumentedPool(raw), outcome), [("/v1/stats", 10.0)])
+    client = Client()
+
+    async def request():
+        await middleware(SCOPE, client.receive, client.send)
+        await asyncio.sleep(0)
+        # Sin consultas en curso no queda ninguna tarea leyendo `receive`
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task() and not task.done()]
+
+    assert asyncio.run(request()) == []
+    assert outcome == {"result": "fila"}
+    assert [message["type"] for message in client.sent] == ["http.response.start", "http.response.body"]
@@ -0,0 +1,37 @@
+# tests/test_partitioned.py
+
+import asyncio
+import pytest
+from backends.postgres import InstrumentedPool
+from engine.partitioned import PK_BOUNDS_QUERY, aggregate_sql
+from tests.fakes import FakePool
+
+
+def test_failed_partition_cancels_the_others_and_releases_connections():
+    state = {"partitions": 0, "cancelled": 0}
+
+    async def handler(query, args, timeout):
+        if query == PK_BOUNDS_QUERY:
+            return {"low": 1, "high": 1000}
+        state["partitions"] += 1
+        if state["partitions"] == 1:
+            await asyncio.sleep(0.01)
+            raise asyncio.TimeoutError()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state["cancelled"] += 1
+            raise
+
+    raw = FakePool(handler=handler, max_size=8)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(asyncio.TimeoutError):
+            await aggregate_sql(InstrumentedPool(raw), (None, None, None), 4)
+        return loop.time() - start
+
+    assert asyncio.run(run()) < 1.0
+    assert state == {"partitions": 4, "cancelled": 3}
+    assert raw.in_use == 0
@@ -0,0 +1,33 @@
+# tests/test_persons.py
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from database import db
+from routers.persons import router
+
+
+class NoSQLBackend:
+    """Backend como ColumnarFileBackend: sin SQL, get_pool() falla."""
+
+    supports_sql = False
+
+    def get_read_pool(self):
+        raise RuntimeError("El backend 'columnar' no admite consultas SQL")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(db, "backend", NoSQLBackend())
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("query", ["", "?ids=1,2", "?cursor=eyJhZnRlciI6IDF9&speciesCode=HU"])
+def test_list_without_sql_is_not_implemented(client, query):
+    response = client.get(f"/v1/persons{query}")
+
+    assert response.status_code == 501
+    assert response.headers["content-type"] == "application/problem+json"
+    assert response.json()["status"] == 501
@@ -0,0 +1,77 @@
+# tests/test_reload.py
+
+import asyncio
+import numpy as np
+import pytest
+import main
+from config import settings
+from database import db
+from engine.columnar import ColumnarSnapshot
+from engine.cube import AggregateCube
+from engine.dimensions import DimensionRegistry
+
+
+class VersionedBackend:
+    """Backend sin SQL (como ColumnarFileBackend) que publica `version` × 10 filas."""
+
+    supports_sql = False
+
+    def __init__(self):
+        self.version = 1
+        self.fail_cube = False
+
+    async def dimension_rows(self):
+        return {
+            "species": [{"pk": 1, "code": f"S{self.version}", "name": "Especie"}],
+            "strata": [{"pk": 1, "code": 0, "name": "Estrato"}],
+            "genders": [{"pk": 1, "code": "F", "name": "Género"}],
+        }
+
+    async def load_snapshot(self, snapshot):
+        rows = 10 * self.version
+        snapshot.set_columns(np.ones(rows), np.ones(rows), np.ones(rows), np.full(rows, 30))
+
+    async def load_cube(self, cube):
+        if self.fail_cube:
+            raise RuntimeError("archivo del cubo corrupto")
+        return False
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    backend = VersionedBackend()
+    monkeypatch.setattr(db, "backend", backend)
+    monkeypatch.setattr(settings, "stats_engine", "cube")
+    monkeypatch.setattr(main, "snapshot", ColumnarSnapshot())
+    monkeypatch.setattr(main, "cube", AggregateCube())
+    monkeypatch.setattr(main, "registry", DimensionRegistry())
+    asyncio.run(main.reload_data())
+    return backend
+
+
+def test_failed_reload_keeps_previous_version(engines):
+    engines.version = 2
+    engines.fail_cube = True
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main.reload_data())
+    assert main.snapshot.total == 10
+    assert main.cube.total == 10
+    assert main.registry.species.rows[0]["code"] == "S1"
+
+
+def test_reload_replaces_everything_together(engines):
+    engines.version = 2
+
+    asyncio.run(main.reload_data())
+    assert main.snapshot.total == 20
+    assert main.cube.total == 20
+    assert main.registry.species.rows[0]["code"] == "S2"
+
+
+def test_configured_engine_is_not_rewritten(engines, monkeypatch):
+    monkeypatch.setattr(settings, "stats_engine", "sql")
+
+    asyncio.run(main.reload_data())
+    assert db.stats_engine == "columnar"
+    assert settings.stats_engine == "sql"
@@ -0,0 +1,92 @@
+# tests/test_replicas.py
+
+import asyncio
+import asyncpg
+import pytest
+from backends.postgres import InstrumentedPool, PostgresBackend, Replica, ReplicaPool, is_connection_error
+from config import settings
+from tests.fakes import FakePool, raising
+from utils.deadlines import DeadlineExceeded
+
+
+def backend_with_replica():
+    """Backend con un primario y una réplica sana y al día, ambos en memoria."""
+    backend = PostgresBackend()
+    primary = FakePool("primary")
+    backend._pool = InstrumentedPool(primary)
+    replica = Replica("replica", 5432)
+    raw = FakePool("replica")
+    replica.pool = ReplicaPool(raw, replica, backend.get_pool)
+    replica.mark_success(0.0)
+    backend.replicas = [replica]
+    return backend, replica, raw, primary
+
+
+@pytest.mark.parametrize("exc", [asyncio.TimeoutError(), DeadlineExceeded()])
+def test_timeouts_are_not_connection_errors(exc):
+    assert isinstance(exc, OSError)
+    assert not is_connection_error(exc)
+
+
+@pytest.mark.parametrize(
+    "exc", [ConnectionResetError(), asyncpg.InterfaceError("cerrada"), asyncpg.PostgresConnectionError()]
+)
+def test_lost_connections_are_connection_errors(exc):
+    assert is_connection_error(exc)
+
+
+def test_lost_connection_ejects_replica_and_retries_on_primary():
+    backend, replica, raw, primary = backend_with_replica()
+    raw.handler = raising(ConnectionResetError("caída"))
+
+    assert asyncio.run(backend.get_read_pool().fetchval("SELECT 1")) == "primary"
+    assert not replica.healthy
+    assert replica.ejections == 1
+    assert replica.primary_retries == 1
+    assert backend.get_read_pool() is backend.get_pool()
+
+
+def test_replica_timeout_neither_ejects_nor_retries():
+    backend, replica, raw, primary = backend_with_replica()
+    raw.handler = raising(asyncio.TimeoutError())
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(backend.get_read_pool().fetchval("SELECT 1"))
+    assert replica.healthy
+    assert replica.failures == 0
+    assert replica.primary_retries == 0
+    assert primary.queries == []
+
+
+def test_pool_acquire_timeout_does_not_eject_replica():
+    backend, replica, raw, primary = backend_with_replica()
+    raw.acquire_error = asyncio.TimeoutError()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(backend.get_read_pool().fetch("SELECT 1"))
+    assert replica.healthy
+    assert primary.queries == []
+
+
+def test_replica_lagging_mid_query_retries_on_primary():
+    backend, replica, raw, primary = backend_with_replica()
+
+    async def lagging(query, args, timeout):
+        # La verificación periódica corre mientras la consulta está en vuelo
+        replica.mark_success(settings.db_replica_max_lag + 1)
+        return "replica"
+
+    raw.handler = lagging
+    assert asyncio.run(backend.get_read_pool().fetchrow("SELECT 1")) == "primary"
+    assert replica.healthy
+    assert replica.primary_retries == 1
+
+
+def test_execute_is_not_retried_on_primary():
+    backend, replica, raw, primary = backend_with_replica()
+    raw.handler = raising(ConnectionResetError("caída"))
+
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(replica.pool.execute("SELECT 1"))
+    assert not replica.healthy
+    assert primary.queries == []
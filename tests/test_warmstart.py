@@ -0,0 +1,84 @@
+# tests/test_warmstart.py
+
+import asyncio
+import datetime
+import numpy as np
+import pytest
+from backends.postgres import InstrumentedPool
+from engine.columnar import NULL_AGE, ColumnarSnapshot
+from engine.cube import AggregateCube
+from engine.dimensions import DimensionRegistry
+from engine.warmstart import WarmStart
+from tests.fakes import FakePersons, FakePool
+
+DIMENSIONS = {
+    "species": [{"pk": 1, "code": "HU", "name": "Humano"}, {"pk": 2, "code": "EL", "name": "Elfo"}],
+    "strata": [{"pk": 1, "code": 0, "name": "Bajo"}, {"pk": 2, "code": 1, "name": "Alto"}],
+    "genders": [{"pk": 1, "code": "F", "name": "Femenino"}, {"pk": 2, "code": "M", "name": "Masculino"}],
+}
+
+ROWS = [
+    (1, 1, 1, 1, 20),
+    (2, 1, 2, 1, 30),
+    (3, 2, 1, 2, 40),
+    (4, None, 1, 1, None),
+]
+
+
+class FakeBackend:
+    def __init__(self, persons: FakePersons):
+        self.pool = InstrumentedPool(FakePool(handler=persons.handler))
+
+    async def dimension_rows(self):
+        return DIMENSIONS
+
+    def get_read_pool(self):
+        return self.pool
+
+
+def warm_loaded(engine: str):
+    """Registro y motores como quedan tras WarmStart.load con las filas de ROWS."""
+    registry = DimensionRegistry()
+    registry.set_rows(DIMENSIONS["species"], DIMENSIONS["strata"], DIMENSIONS["genders"])
+    snapshot, cube = ColumnarSnapshot(), AggregateCube()
+    columns = list(zip(*ROWS))
+    snapshot.set_columns(
+        *(np.array([-1 if fk is None else fk for fk in column]) for column in columns[1:4]),
+        np.array([NULL_AGE if age is None else age for age in columns[4]]),
+    )
+    if engine == "cube":
+        cube.build_from_columns(snapshot.species, snapshot.strata, snapshot.gender, snapshot.age, snapshot.age_null)
+    warm = WarmStart("/nonexistent")
+    warm.manifest = {"as_of": datetime.date.today().isoformat(), "rows": len(ROWS)}
+    return warm, registry, snapshot, cube
+
+
+@pytest.mark.parametrize("engine", ["cube", "columnar"])
+def test_unchanged_database_is_valid(engine):
+    warm, registry, snapshot, cube = warm_loaded(engine)
+    backend = FakeBackend(FakePersons(ROWS))
+
+    assert asyncio.run(warm.validate(backend, registry, snapshot, cube)) is True
+
+
+@pytest.mark.parametrize("engine", ["cube", "columnar"])
+def test_update_with_same_row_count_is_invalid(engine):
+    warm, registry, snapshot, cube = warm_loaded(engine)
+    persons = FakePersons(ROWS)
+    persons.update(2, gender_fk=2)
+
+    assert asyncio.run(warm.validate(FakeBackend(persons), registry, snapshot, cube)) is False
+
+
+def test_delete_plus_insert_is_invalid():
+    warm, registry, snapshot, cube = warm_loaded("cube")
+    persons = FakePersons(ROWS[1:] + [(5, 1, 1, 1, 21)])
+
+    assert asyncio.run(warm.validate(FakeBackend(persons), registry, snapshot, cube)) is False
+
+
+def test_snapshot_from_another_day_is_invalid():
+    warm, registry, snapshot, cube = warm_loaded("cube")
+    warm.manifest["as_of"] = "2000-01-01"
+
+    assert asyncio.run(warm.validate(FakeBackend(FakePersons(ROWS)), registry, snapshot, cube)) is False
@@ -0,0 +1,127 @@
+# utils/admission.py
+
+import asyncio
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from fastapi import status
+from config import settings
+from utils.errors import problem_response, service_unavailable
+from utils.metrics import http_requests_shed
+
+
+class Gate:
+    """
+    Límite de concurrencia con cola acotada y FIFO. Cuando la cola está llena,
+    o la espera supera `timeout`, la petición se rechaza en vez de quedarse
+    esperando una conexión del pool hasta que venza.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.admitted = 0
+        self.shed = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        """True si la petición puede pasar (debe llamar a release al terminar)."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait({waiter}, timeout=self.timeout)
+        except asyncio.CancelledError:
+            # El cliente se fue: si ya se le había cedido el lugar, se pasa al siguiente
+            if waiter.done():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        if not waiter.done():
+            waiter.cancel()
+            self.shed += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        # El lugar se cede directamente al primero en la cola que siga esperando
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": sum(not waiter.done() for waiter in self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+def parse_limits(limits: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    """{"/v1/stats": "4:32"} -> [("/v1/stats", 4, 32)], con los prefijos más largos primero."""
+    parsed = []
+    for prefix, value in limits.items():
+        limit, _, queue = value.partition(":")
+        parsed.append((prefix, int(limit), int(queue or 0)))
+    return sorted(parsed, key=lambda item: len(item[0]), reverse=True)
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI de control de admisión: cada prefijo configurado tiene su
+    propio Gate y las rutas que no coinciden con ninguno (p. ej. /v1/info/*)
+    pasan sin esperar, así que no quedan detrás de los agregados pesados.
+    Las peticiones rechazadas reciben 503 problem+json con Retry-After.
+    """
+
+    def __init__(self, app, gates: List[Gate], retry_after: float):
+        self.app = app
+        self.gates = gates
+        self.retry_after = str(max(1, math.ceil(retry_after)))
+
+    def gate_for(self, path: str) -> Optional[Gate]:
+        for gate in self.gates:
+            if path.startswith(gate.name):
+                return gate
+        return None
+
+    async def __call__(self, scope, receive, send):
+        gate = self.gate_for(scope["path"]) if scope["type"] == "http" else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await gate.acquire():
+            http_requests_shed.inc(gate.name)
+            response = problem_response(status.HTTP_503_SERVICE_UNAVAILABLE, service_unavailable)
+            response.headers["Retry-After"] = self.retry_after
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+
+# Un Gate por prefijo de ADMISSION_LIMITS; lista vacía = sin control de admisión
+gates = [
+    Gate(prefix, limit, queue, settings.admission_queue_timeout)
+    for prefix, limit, queue in parse_limits(settings.admission_limits)
+]
@@ -0,0 +1,173 @@
+# utils/cache.py
+
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+from config import settings
+from utils.formats import variant
+from utils.profiling import current_profile
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class CachedResponse:
+    """Respuesta ya serializada: cuerpo en bytes, cabeceras y ETag fuerte."""
+
+    __slots__ = ("status", "headers", "body", "etag", "expires")
+
+    def __init__(self, status: int, headers: Headers, body: bytes, etag: bytes, expires: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.expires = expires
+
+
+class ResponseCache:
+    """
+    LRU con TTL indexado por ruta + query normalizada. Cada invalidación
+    incrementa `generation`: una respuesta calculada antes (petición en vuelo
+    mientras se recargaban los datos) ya no se guarda.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    @staticmethod
+    def key(path: str, query_string: bytes, accept: Optional[bytes] = None) -> str:
+        # El orden de los parámetros no cambia la respuesta; los vacíos sí (dan 400)
+        params = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+        key = f"{path}?{urlencode(params)}" if params else path
+        # Arrow y MessagePack se guardan aparte de JSON (ver utils/formats.py)
+        media_type = variant(accept.decode("latin-1")) if accept else ""
+        return f"{key}#{media_type}" if media_type else key
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self, key: str, status: int, headers: Headers, body: bytes, generation: Optional[int] = None
+    ) -> CachedResponse:
+        """Retorna la entrada; no la guarda si se calculó en una generación anterior a la actual."""
+        etag = b'"' + hashlib.sha256(body).hexdigest()[:32].encode() + b'"'
+        entry = CachedResponse(status, headers, body, etag, time.monotonic() + self.ttl)
+        if generation is not None and generation != self.generation:
+            return entry
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, prefix: Optional[str] = None) -> int:
+        """Elimina las entradas cuyo path empieza con `prefix` (todas si es None)."""
+        self.generation += 1
+        if prefix is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        stale = [key for key in self._entries if key.startswith(prefix)]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110 §13.1.2)."""
+    for candidate in if_none_match.split(b","):
+        candidate = candidate.strip()
+        if candidate == b"*" or candidate.removeprefix(b"W/") == etag:
+            return True
+    return False
+
+
+class ResponseCacheMiddleware:
+    """
+    Middleware ASGI que guarda las respuestas 200 de los GET bajo `prefixes`
+    ya serializadas. Los aciertos no llegan al handler (ni a la BD) y se
+    responden con ETag, Cache-Control y 304 si el cliente ya tiene la versión.
+    """
+
+    def __init__(self, app, cache: ResponseCache, prefixes: Tuple[str, ...]):
+        self.app = app
+        self.cache = cache
+        self.prefixes = prefixes
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith(self.prefixes)
+            # Una petición perfilada mide el handler, no un acierto de la caché
+            or current_profile() is not None
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = self.cache.key(scope["path"], scope["query_string"], headers.get(b"accept"))
+        if_none_match = headers.get(b"if-none-match")
+        entry = self.cache.get(key)
+        if entry is not None:
+            await self._send(send, entry, if_none_match)
+            return
+
+        # Si los datos cambian mientras corre el handler, la respuesta se envía pero no se guarda
+        generation = self.cache.generation
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+
+        if start.get("status") != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers = [(name, value) for name, value in start.get("headers", []) if name != b"content-length"]
+        entry = self.cache.put(key, 200, headers, body, generation)
+        await self._send(send, entry, if_none_match)
+
+    async def _send(self, send, entry: CachedResponse, if_none_match: Optional[bytes]) -> None:
+        max_age = max(0, math.ceil(entry.expires - time.monotonic()))
+        cache_headers = [
+            (b"etag", entry.etag),
+            (b"cache-control", b"max-age=%d" % max_age),
+        ]
+        if not any(name == b"vary" for name, _ in entry.headers):
+            # La clave incluye el formato pedido en Accept
+            cache_headers.append((b"vary", b"accept"))
+        if if_none_match is not None and etag_matches(if_none_match, entry.etag):
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = entry.headers + cache_headers + [(b"content-length", str(len(entry.body)).encode())]
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
+
+
+# Instancia global; main.py la monta y los puntos de recarga la invalidan
+response_cache = ResponseCache(settings.response_cache_max_entries, settings.response_cache_ttl)
@@ -0,0 +1,70 @@
+# utils/coalesce.py
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes idénticas: mientras una computación con la
+    misma clave está en curso, las demás esperan el mismo resultado (o la
+    misma excepción) en vez de repetirla.
+
+    Cancelar a un solo cliente no cancela la computación compartida; solo se
+    cancela cuando ya no queda nadie esperándola, para liberar la conexión.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            self.misses += 1
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+        else:
+            self.hits += 1
+
+        call.waiters += 1
+        try:
+            # shield: la cancelación de este cliente no se propaga a la tarea compartida
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nadie más espera este resultado: se descarta y se cancela la consulta
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _finish(self, key: Hashable, call: _Call) -> None:
+        self._forget(key, call)
+        if not call.task.cancelled():
+            # Marca la excepción como recuperada aunque todos los clientes se hayan ido
+            call.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "in_flight": self.in_flight}
+
+
+# Instancia global para las consultas de /v1/stats
+stats_flight = SingleFlight()
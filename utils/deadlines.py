@@ -0,0 +1,141 @@
+# utils/deadlines.py
+
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+from utils.metrics import http_requests_cancelled
+
+# Instante (reloj del event loop) en que vence la petición en curso; None = sin plazo
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """El plazo de la petición venció antes de empezar la operación."""
+
+
+def remaining() -> Optional[float]:
+    """Segundos que le quedan a la petición en curso, o None si no tiene plazo."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    left = deadline - asyncio.get_running_loop().time()
+    if left <= 0:
+        http_requests_cancelled.inc("deadline")
+        raise DeadlineExceeded()
+    return left
+
+
+def has_deadline() -> bool:
+    return _deadline.get() is not None
+
+
+class DisconnectWatch:
+    """
+    Detecta que el cliente se fue mientras la petición espera una consulta y
+    cancela la tarea de la petición: asyncpg cancela la sentencia en el
+    servidor y la conexión vuelve al pool de inmediato. La tarea que lee
+    `receive` existe solo mientras hay consultas en curso (ver `query`); las
+    rutas que responden desde memoria no la crean.
+    """
+
+    def __init__(self, receive, task: asyncio.Task):
+        self._receive = receive
+        self.task = task
+        self.disconnected = False
+        # Mensajes que leyó el vigilante y que el handler todavía no pidió
+        self._pending: List[dict] = []
+        self._watcher: Optional[asyncio.Task] = None
+        self._active = 0
+
+    async def receive(self) -> dict:
+        """El `receive` que ve la aplicación."""
+        if self._pending:
+            return self._pending.pop(0)
+        return await self._receive()
+
+    async def _watch(self) -> None:
+        while True:
+            message = await self._receive()
+            self._pending.append(message)
+            if message["type"] == "http.disconnect":
+                self.disconnected = True
+                self.task.cancel()
+                return
+
+    @contextmanager
+    def query(self) -> Iterator[None]:
+        """Vigila la desconexión mientras dura el bloque (las consultas en paralelo comparten vigilante)."""
+        self._active += 1
+        if self._watcher is None and not self.disconnected:
+            self._watcher = asyncio.ensure_future(self._watch())
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if self._active == 0 and self._watcher is not None:
+                self._watcher.cancel()
+                self._watcher = None
+
+
+# Vigilancia de desconexión de la petición en curso; None fuera de las rutas con plazo
+_watch: ContextVar[Optional[DisconnectWatch]] = ContextVar("disconnect_watch", default=None)
+
+
+@contextmanager
+def watch_disconnect() -> Iterator[None]:
+    """Envuelve una consulta: si el cliente se desconecta mientras corre, se cancela la petición."""
+    watch = _watch.get()
+    if watch is None:
+        yield
+        return
+    with watch.query():
+        yield
+
+
+def parse_deadlines(deadlines: dict) -> List[Tuple[str, float]]:
+    """{"/v1/stats": "10"} -> [("/v1/stats", 10.0)], con los prefijos más largos primero; 0 = sin plazo."""
+    parsed = [(prefix, float(seconds)) for prefix, seconds in deadlines.items()]
+    return sorted(parsed, key=lambda item: len(item[0]), reverse=True)
+
+
+class DeadlineMiddleware:
+    """
+    Middleware ASGI que fija un plazo por prefijo de ruta. El plazo viaja en
+    una ContextVar y se aplica solo donde hay una consulta: el pool lo pasa
+    como timeout de asyncpg, que al vencer cancela la sentencia en el
+    servidor, y el handler responde 504. Mientras hay una consulta en curso
+    se vigila además la desconexión del cliente (ver DisconnectWatch). La
+    petición corre en línea: las rutas que responden desde memoria solo
+    pagan fijar las ContextVar.
+    """
+
+    def __init__(self, app, deadlines: List[Tuple[str, float]]):
+        self.app = app
+        self.deadlines = deadlines
+
+    def deadline_for(self, path: str) -> Optional[float]:
+        for prefix, seconds in self.deadlines:
+            if path.startswith(prefix):
+                return seconds or None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        seconds = self.deadline_for(scope["path"]) if scope["type"] == "http" else None
+        if seconds is None:
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        watch = DisconnectWatch(receive, task)
+        token = _deadline.set(asyncio.get_running_loop().time() + seconds)
+        watch_token = _watch.set(watch)
+        try:
+            await self.app(scope, watch.receive, send)
+        except asyncio.CancelledError:
+            if not watch.disconnected:
+                raise
+            # Cancelada por la desconexión, no por el servidor: no hay a quién responder
+            task.uncancel()
+            http_requests_cancelled.inc("disconnect")
+        finally:
+            _watch.reset(watch_token)
+            _deadline.reset(token)
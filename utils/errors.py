@@ -1,3 +1,6 @@
+from fastapi import status
+from fastapi.responses import JSONResponse
+
 not_found = {
     "content": {
         "application/problem+json": {
@@ -12,6 +15,20 @@ not_found = {
     }
 }
 
+profile_not_found = {
+    "content": {
+        "application/problem+json": {
+            "example": {
+                "type": "https://example.com/",
+                "title": "Error",
+                "status": 404,
+                "detail": "No hay un perfil con ese id (solo se conservan los más recientes)",
+                "instance": "https://example.com/",
+            }
+        }
+    }
+}
+
 internal_error = {
     "content": {
         "application/problem+json": {
@@ -25,3 +42,96 @@ internal_error = {
         }
     }
 }
+
+forbidden = {
+    "content": {
+        "application/problem+json": {
+            "example": {
+                "type": "https://example.com/",
+                "title": "Error",
+                "status": 403,
+                "detail": "Acceso restringido a administradores",
+                "instance": "https://example.com/",
+            }
+        }
+    }
+}
+
+not_acceptable = {
+    "content": {
+        "application/problem+json": {
+            "example": {
+                "type": "https://example.com/",
+                "title": "Error",
+                "status": 406,
+                "detail": "Formato no disponible en este servidor",
+                "instance": "https://example.com/",
+            }
+        }
+    }
+}
+
+not_implemented = {
+    "content": {
+        "application/problem+json": {
+            "example": {
+                "type": "https://example.com/",
+                "title": "Error",
+                "status": 501,
+                "detail": "El backend de almacenamiento no admite esta consulta (requiere SQL)",
+                "instance": "https://example.com/",
+            }
+        }
+    }
+}
+
+service_unavailable = {
+    "content": {
+        "application/problem+json": {
+            "example": {
+                "type": "https://example.com/",
+                "title": "Error",
+                "status": 503,
+                "detail": "Servicio sobrecargado, reintente más tarde",
+                "instance": "https://example.com/",
+            }
+        }
+    }
+}
+
+not_ready = {
+    "content": {
+        "application/problem+json": {
+            "example": {
+                "type": "https://example.com/",
+                "title": "Error",
+                "status": 503,
+                "detail": "El servicio todavía no está listo para recibir tráfico",
+                "instance": "https://example.com/",
+            }
+        }
+    }
+}
+
+gateway_timeout = {
+    "content": {
+        "application/problem+json": {
+            "example": {
+                "type": "https://example.com/",
+                "title": "Error",
+                "status": 504,
+                "detail": "La consulta excedió el tiempo límite",
+                "instance": "https://example.com/",
+            }
+        }
+    }
+}
+
+
+def problem_response(status_code: int = status.HTTP_404_NOT_FOUND, error: dict = not_found) -> JSONResponse:
+    """Construye la respuesta problem+json usando el ejemplo de `error`."""
+    return JSONResponse(
+        status_code=status_code,
+        content=error["content"]["application/problem+json"]["example"],
+        media_type="application/problem+json",
+    )
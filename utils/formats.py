@@ -0,0 +1,155 @@
+# utils/formats.py
+
+import io
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import Response
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow es opcional; sin él no se ofrece Arrow
+    pa = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional; sin él no se ofrece MessagePack
+    msgpack = None
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+ARROW = "application/vnd.apache.arrow.stream"
+MSGPACK = "application/msgpack"
+
+# Otros nombres con que los clientes piden MessagePack
+ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+
+# Columna de una tabla Arrow: (nombre, tipo) con tipo "str", "int" o "float"
+Field = Tuple[str, str]
+
+
+def available(media_type: str) -> bool:
+    """Los formatos binarios solo se ofrecen si su paquete está instalado."""
+    if media_type == ARROW:
+        return pa is not None
+    if media_type == MSGPACK:
+        return msgpack is not None
+    return True
+
+
+def parse_accept(accept: str) -> List[Tuple[str, float]]:
+    """Rangos (tipo, q) de la cabecera Accept, con los alias ya normalizados."""
+    ranges = []
+    for item in accept.split(","):
+        media_range, *params = [part.strip() for part in item.split(";")]
+        if not media_range:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_range = media_range.lower()
+        ranges.append((ALIASES.get(media_range, media_range), q))
+    return ranges
+
+
+def quality(ranges: List[Tuple[str, float]], media_type: str) -> float:
+    """q del rango más específico que cubre `media_type` (exacto > tipo/* > */*); 0 si ninguno."""
+    best, specificity = 0.0, -1
+    kind = media_type.split("/")[0]
+    for media_range, q in ranges:
+        if media_range == media_type:
+            level = 2
+        elif media_range == f"{kind}/*":
+            level = 1
+        elif media_range == "*/*":
+            level = 0
+        else:
+            continue
+        if level > specificity:
+            best, specificity = q, level
+    return best
+
+
+def negotiate(accept: Optional[str], offered: Sequence[str]) -> str:
+    """
+    Tipo de `offered` preferido según Accept (RFC 9110 §12.5.1). El primero
+    de `offered` (JSON) es el predeterminado: sin Accept, con empate o si
+    ninguno es aceptable se responde igualmente en ese formato.
+    """
+    offered = [media_type for media_type in offered if available(media_type)]
+    if not accept:
+        return offered[0]
+    ranges = parse_accept(accept)
+    best, best_q = offered[0], 0.0
+    for media_type in offered:
+        q = quality(ranges, media_type)
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def variant(accept: Optional[str]) -> str:
+    """Formato binario que pide Accept ("" para JSON), para separar las entradas de la caché HTTP."""
+    media_type = negotiate(accept, (JSON, ARROW, MSGPACK))
+    return "" if media_type == JSON else media_type
+
+
+# -------------------- ARROW --------------------
+
+def arrow_schema(fields: Sequence[Field]):
+    types = {"str": pa.string(), "int": pa.int64(), "float": pa.float64()}
+    return pa.schema([(name, types[kind]) for name, kind in fields])
+
+
+class ArrowStream:
+    """
+    Stream Arrow IPC escrito por lotes: cada write() retorna los bytes listos
+    para enviar, así el cuerpo sale a medida que llegan las filas.
+    """
+
+    def __init__(self, fields: Sequence[Field]):
+        self.schema = arrow_schema(fields)
+        self._sink = io.BytesIO()
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        """
+        Un record batch con las filas dadas (tuplas o asyncpg.Record): las
+        columnas se arman transponiendo las filas, sin pasar por dicts.
+        """
+        columns = zip(*rows) if rows else [()] * len(self.schema)
+        arrays = [pa.array(list(values), type=field.type) for values, field in zip(columns, self.schema)]
+        self._writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+        return self._drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._drain()
+
+
+def arrow_response(fields: Sequence[Field], rows: Sequence[Sequence[Any]]) -> Response:
+    stream = ArrowStream(fields)
+    body = stream.write(rows) + stream.close()
+    return Response(body, media_type=ARROW, headers={"Vary": "Accept"})
+
+
+# -------------------- MESSAGEPACK --------------------
+
+def msgpack_rows(fields: Sequence[str], rows: Sequence[Sequence[Any]]) -> bytes:
+    """Un mapa MessagePack por fila (como una línea de NDJSON), empaquetado sin armar dicts."""
+    packer = msgpack.Packer()
+    return b"".join(packer.pack_map_pairs(tuple(zip(fields, row))) for row in rows)
+
+
+def msgpack_response(content: Any) -> Response:
+    return Response(msgpack.packb(content), media_type=MSGPACK, headers={"Vary": "Accept"})
@@ -0,0 +1,33 @@
+# utils/health.py
+
+import time
+from typing import Any, Dict
+
+
+class Readiness:
+    """
+    Estado de /readyz: el proceso no recibe tráfico hasta terminar el arranque
+    (pool abierto, sentencias preparadas y datos en memoria) ni mientras se detiene.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.reason = "arrancando"
+        self._since = time.monotonic()
+
+    def set_ready(self) -> None:
+        self.ready, self.reason, self._since = True, "", time.monotonic()
+
+    def set_not_ready(self, reason: str) -> None:
+        self.ready, self.reason, self._since = False, reason, time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "reason": self.reason,
+            "seconds": round(time.monotonic() - self._since, 3),
+        }
+
+
+# Instancia global; main.py la marca lista al terminar el arranque
+readiness = Readiness()
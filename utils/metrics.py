@@ -0,0 +1,197 @@
+# utils/metrics.py
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Buckets por defecto de los clientes de Prometheus (segundos)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [conteo por bucket..., +Inf], suma
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _labels(self.label_names, labels, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {self._sums[labels]:g}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Gauges:
+    """Valores instantáneos que se leen al momento de exponer (pool, cachés, etc.)."""
+
+    def __init__(self, name: str, help: str, collect: Callable[[], Dict[str, float]], label: str = "name"):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.label = label
+
+    def render(self) -> List[str]:
+        try:
+            values = self.collect()
+        except Exception:
+            return []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels((self.label,), (key,))} {value:g}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta",
+    labels=("method", "route", "status"),
+))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds",
+    "Duración de las consultas ejecutadas a través del pool",
+    labels=("operation",),
+))
+db_rows_fetched = registry.register(Counter(
+    "db_rows_fetched_total",
+    "Filas retornadas por las consultas del pool",
+    labels=("operation",),
+))
+db_query_errors = registry.register(Counter(
+    "db_query_errors_total",
+    "Consultas del pool que terminaron con error",
+    labels=("operation",),
+))
+db_pool_acquire_wait = registry.register(Histogram(
+    "db_pool_acquire_wait_seconds",
+    "Tiempo de espera para obtener una conexión del pool",
+))
+http_requests_cancelled = registry.register(Counter(
+    "http_requests_cancelled_total",
+    "Consultas canceladas por vencer el plazo de la petición (deadline) o por desconexión del cliente (disconnect)",
+    labels=("reason",),
+))
+http_requests_shed = registry.register(Counter(
+    "http_requests_shed_total",
+    "Peticiones rechazadas con 503 por el control de admisión",
+    labels=("gate",),
+))
+
+
+def leaf_routes(routes) -> Iterable:
+    """Rutas finales de la app, entrando en los routers incluidos si la versión de FastAPI los agrupa."""
+    for route in routes:
+        nested = getattr(route, "original_router", None)
+        if nested is not None:
+            yield from leaf_routes(nested.routes)
+        else:
+            yield route
+
+
+def route_template(scope, routes) -> str:
+    """Plantilla de la ruta (p. ej. /v1/stats/count) para acotar la cardinalidad de las etiquetas."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Respuestas que no llegan al router (p. ej. aciertos de la caché HTTP)
+    for candidate in leaf_routes(routes):
+        match, _ = candidate.matches(scope)
+        if match.name == "FULL":
+            return getattr(candidate, "path", "unmatched")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que registra la latencia de cada petición en http_request_duration_seconds."""
+
+    def __init__(self, app, routes: Optional[list] = None):
+        self.app = app
+        self.routes = routes or []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route_template(scope, self.routes),
+                str(status_code[0]),
+            )
@@ -0,0 +1,240 @@
+# utils/profiling.py
+
+import itertools
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import settings
+
+# Un marco de la pila: (función, archivo, línea donde empieza la función)
+Frame = Tuple[str, str, int]
+
+
+class RequestProfile:
+    """
+    Perfil de una petición: muestras de la pila del event loop y, por cada
+    consulta al pool, su duración vista desde el cliente y el plan de
+    EXPLAIN (ANALYZE, BUFFERS). La diferencia entre ambas es red más
+    decodificación de asyncpg; las muestras en select() son el loop ocioso
+    esperando E/S.
+    """
+
+    def __init__(self, profile_id: int, method: str, path: str, query: str, interval: float, explain: bool):
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.query = query
+        self.interval = interval
+        self.explain = explain
+        self.started = time.time()
+        self.seconds: Optional[float] = None
+        # Pila -> segundos atribuidos (el tiempo real desde la muestra anterior: con el GIL
+        # ocupado las muestras se espacian más que `interval`)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.queries: List[Dict[str, Any]] = []
+        self.status: Optional[int] = None
+
+    def add_query(self, operation: str, sql: str, args: tuple, seconds: float) -> Dict[str, Any]:
+        entry = {"operation": operation, "query": sql, "args": list(args), "seconds": round(seconds, 6)}
+        self.queries.append(entry)
+        return entry
+
+    def collapsed(self) -> str:
+        """Pilas colapsadas ("raíz;...;hoja microsegundos"), el formato de flamegraph.pl e inferno."""
+        lines = [
+            ";".join(f"{name} ({filename}:{line})" for name, filename, line in stack) + f" {round(seconds * 1e6)}"
+            for stack, seconds in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> Dict[str, Any]:
+        """Perfil muestreado en el formato de archivo de https://www.speedscope.app."""
+        frames: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, seconds in self.stacks.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(round(seconds, 6))
+        name = f"{self.method} {self.path}" + (f"?{self.query}" if self.query else "")
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "shared": {"frames": [{"name": n, "file": f, "line": l} for n, f, l in frames]},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.seconds or 0,
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "started": self.started,
+            "seconds": self.seconds,
+            "samples": self.samples,
+            "queries": len(self.queries),
+            "db_seconds": round(sum(query["seconds"] for query in self.queries), 6),
+        }
+
+
+class Sampler(threading.Thread):
+    """
+    Profiler de muestreo: cada `interval` segundos copia la pila del hilo del
+    event loop. Solo corre mientras dura la petición perfilada; el resto del
+    tiempo no existe, así que no agrega costo.
+    """
+
+    def __init__(self, profile: RequestProfile, thread_id: int):
+        super().__init__(name="profiler", daemon=True)
+        self.profile = profile
+        self.thread_id = thread_id
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        profile = self.profile
+        last = time.perf_counter()
+        while not self._done.wait(profile.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            frame = sys._current_frames().get(self.thread_id)
+            stack: List[Frame] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                profile.stacks[tuple(reversed(stack))] += elapsed
+                profile.samples += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+class Profiler:
+    """
+    Guarda los últimos `keep` perfiles. Se perfila una petición a la vez: el
+    muestreo ve todo el event loop, así que con dos activas se mezclarían; las
+    que llegan mientras tanto pasan sin perfilar.
+    """
+
+    def __init__(self, keep: int = 20):
+        self.keep = keep
+        self.profiles: "OrderedDict[int, RequestProfile]" = OrderedDict()
+        self.active: Optional[RequestProfile] = None
+        self.skipped = 0
+        self._sampler: Optional[Sampler] = None
+        self._ids = itertools.count(1)
+
+    def start(self, method: str, path: str, query: str, interval: float, explain: bool) -> Optional[RequestProfile]:
+        """Empieza a muestrear desde el hilo actual (el del event loop); None si ya hay una petición perfilándose."""
+        if self.active is not None:
+            self.skipped += 1
+            return None
+        self.active = RequestProfile(next(self._ids), method, path, query, interval, explain)
+        self._sampler = Sampler(self.active, threading.get_ident())
+        self._sampler.start()
+        return self.active
+
+    def finish(self, profile: RequestProfile) -> None:
+        self._sampler.stop()
+        self._sampler = None
+        self.active = None
+        profile.seconds = round(time.time() - profile.started, 6)
+        self.profiles[profile.id] = profile
+        while len(self.profiles) > self.keep:
+            self.profiles.popitem(last=False)
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        return self.profiles.get(profile_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active.id if self.active is not None else None,
+            "skipped": self.skipped,
+            "profiles": [profile.summary() for profile in reversed(self.profiles.values())],
+        }
+
+
+# Perfil de la petición en curso; el pool lo consulta para adjuntar los planes (ver backends/postgres.py)
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar("profile", default=None)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _profile.get()
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila las peticiones con `X-Profile: 1` y un token
+    de administración válido (`authorize`), más todas las que empiezan con
+    alguno de `prefixes`. La respuesta lleva `X-Profile-Id`; el perfil se lee
+    en /v1/admin/profiles/{id}. Las demás peticiones solo pagan la revisión
+    de cabeceras.
+    """
+
+    def __init__(
+        self,
+        app,
+        profiler: Profiler,
+        authorize: Callable[[Optional[str]], bool],
+        prefixes: Tuple[str, ...] = (),
+        interval: float = 0.001,
+        explain: bool = True,
+    ):
+        self.app = app
+        self.profiler = profiler
+        self.authorize = authorize
+        self.prefixes = prefixes
+        self.interval = interval
+        self.explain = explain
+
+    def wanted(self, scope) -> bool:
+        if self.prefixes and scope["path"].startswith(self.prefixes):
+            return True
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile", b"").lower() not in (b"1", b"true"):
+            return False
+        token = headers.get(b"x-admin-token")
+        return self.authorize(token.decode("latin-1") if token is not None else None)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        profile = self.profiler.start(
+            scope["method"], scope["path"], scope["query_string"].decode("latin-1"), self.interval, self.explain
+        )
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                headers = [*message.get("headers", []), (b"x-profile-id", str(profile.id).encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _profile.reset(token)
+            self.profiler.finish(profile)
+
+
+# Instancia global, igual que `response_cache` en utils/cache.py
+profiler = Profiler(settings.profiling_keep)
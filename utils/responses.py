@@ -0,0 +1,45 @@
+# utils/responses.py
+
+import json
+from typing import Any
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa json de la biblioteca estándar
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """JSON compacto en UTF-8, igual al que produce JSONResponse."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada con orjson cuando está instalado."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedJSONResponse(Response):
+    """Respuesta con un cuerpo JSON ya serializado (p. ej. los listados de /v1/info)."""
+
+    media_type = "application/json"
+
+
+def fast_response(content: Any) -> Any:
+    """
+    Con FAST_RESPONSES=1 envuelve `content` en FastJSONResponse. Al retornar
+    una Response, FastAPI no vuelve a validar contra response_model ni a
+    serializar con jsonable_encoder; el handler garantiza el esquema. El
+    response_model declarado sigue documentando la respuesta en OpenAPI.
+    Las respuestas ya armadas (p. ej. problem+json) pasan sin cambios.
+    """
+    if not settings.fast_responses or isinstance(content, Response):
+        return content
+    return FastJSONResponse(content)